@@ -150,24 +150,27 @@ df_agentes = pd.DataFrame(
     }
 )
 
+# Colunas extraídas uma única vez como vetores NumPy
+rodadas_np = df_agentes["Rodadas"].to_numpy()
+caixa_a1 = df_agentes["Caixa_Agente1"].to_numpy()
+portfolio_a1 = df_agentes["Portfolio_Agente1"].to_numpy()
+caixa_a2 = df_agentes["Caixa_Agente2"].to_numpy()
+portfolio_a2 = df_agentes["Portfolio_Agente2"].to_numpy()
+
 # Gráficos
 fig, axes = plt.subplots(2, 2, figsize=(15, 10))
 
 # Caixa
-axes[0, 0].plot(df_agentes["Rodadas"], df_agentes["Caixa_Agente1"], label="Agente 1")
-axes[0, 0].plot(df_agentes["Rodadas"], df_agentes["Caixa_Agente2"], label="Agente 2")
+axes[0, 0].plot(rodadas_np, caixa_a1, label="Agente 1")
+axes[0, 0].plot(rodadas_np, caixa_a2, label="Agente 2")
 axes[0, 0].set_title("Evolução do Caixa")
 axes[0, 0].set_xlabel("Rodadas")
 axes[0, 0].set_ylabel("Caixa")
 axes[0, 0].legend()
 
 # Portfólio
-axes[0, 1].plot(
-    df_agentes["Rodadas"], df_agentes["Portfolio_Agente1"], label="Agente 1"
-)
-axes[0, 1].plot(
-    df_agentes["Rodadas"], df_agentes["Portfolio_Agente2"], label="Agente 2"
-)
+axes[0, 1].plot(rodadas_np, portfolio_a1, label="Agente 1")
+axes[0, 1].plot(rodadas_np, portfolio_a2, label="Agente 2")
 axes[0, 1].set_title("Evolução do Portfólio")
 axes[0, 1].set_xlabel("Rodadas")
 axes[0, 1].set_ylabel("Portfólio")
@@ -176,12 +179,12 @@ axes[0, 1].legend()
 # Comparação inicial e final do caixa
 axes[1, 0].bar(
     ["Inicial", "Final"],
-    [10000, df_agentes["Caixa_Agente1"].iloc[-1]],
+    [10000, caixa_a1[-1]],
     label="Agente 1",
 )
 axes[1, 0].bar(
     ["Inicial", "Final"],
-    [10000, df_agentes["Caixa_Agente2"].iloc[-1]],
+    [10000, caixa_a2[-1]],
     label="Agente 2",
 )
 axes[1, 0].set_title("Comparação Caixa Inicial vs Final")
@@ -189,16 +192,8 @@ axes[1, 0].set_ylabel("Caixa")
 axes[1, 0].legend()
 
 # Diferença de portfólio entre rodadas
-axes[1, 1].plot(
-    df_agentes["Rodadas"],
-    np.diff([0] + df_agentes["Portfolio_Agente1"].tolist()),
-    label="Agente 1",
-)
-axes[1, 1].plot(
-    df_agentes["Rodadas"],
-    np.diff([0] + df_agentes["Portfolio_Agente2"].tolist()),
-    label="Agente 2",
-)
+axes[1, 1].plot(rodadas_np, np.diff(portfolio_a1, prepend=0), label="Agente 1")
+axes[1, 1].plot(rodadas_np, np.diff(portfolio_a2, prepend=0), label="Agente 2")
 axes[1, 1].set_title("Variação no Portfólio por Rodada")
 axes[1, 1].set_xlabel("Rodadas")
 axes[1, 1].set_ylabel("Δ Portfólio")
@@ -1,174 +1,320 @@
-import random
-import math
-from typing import List
+import logging
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+
+    NUMBA_DISPONIVEL = True
+except ImportError:  # numba é opcional: sem ele usa-se o caminho vetorizado
+    NUMBA_DISPONIVEL = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        return lambda funcao: funcao
+
+
+# l_privada compara o patrimônio atual com o de 22 períodos atrás, então o
+# histórico só precisa guardar as últimas 23 rodadas (buffer circular).
+PERIODOS_L_PRIVADA = 22
+TAMANHO_BUFFER_PATRIMONIO = PERIODOS_L_PRIVADA + 1
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def atualiza_rodada(
+    caixa: np.ndarray,
+    portfolio: np.ndarray,
+    sentimento: np.ndarray,
+    preco_expectativa: np.ndarray,
+    patrimonio: np.ndarray,
+    vizinhos: np.ndarray,
+    news: np.ndarray,
+    preco_mercado: float,
+    rodada: int,
+) -> None:
+    """
+    Kernel de uma rodada: calcula l_privada, l_social e o sentimento, executa
+    as ordens e registra o patrimônio, alterando os vetores no lugar.
+    Equivale a `atualiza_sentimento` seguido de `executa_ordens`.
+    """
+    num_agentes = caixa.shape[0]
+    l_privada = np.zeros(num_agentes)
+    if rodada > PERIODOS_L_PRIVADA:
+        patrimonio_t = patrimonio[(rodada - 1) % TAMANHO_BUFFER_PATRIMONIO]
+        patrimonio_t_22 = patrimonio[
+            (rodada - PERIODOS_L_PRIVADA) % TAMANHO_BUFFER_PATRIMONIO
+        ]
+        for i in prange(num_agentes):
+            l_privada[i] = patrimonio_t[i] / patrimonio_t_22[i] - 1
+
+    patrimonio_rodada = patrimonio[rodada % TAMANHO_BUFFER_PATRIMONIO]
+    num_vizinhos = vizinhos.shape[1]
+    for i in prange(num_agentes):
+        l_social = 0.0
+        for v in range(num_vizinhos):
+            l_social += l_privada[vizinhos[i, v]]
+        l_social /= num_vizinhos
+
+        s = 0.2 * l_privada[i] + 0.3 * l_social + 0.05 * news[i]
+        s = min(max(s, -1.0), 1.0)
+        sentimento[i] = s
+
+        x = s * 0.1
+        preco = preco_mercado * (1.0 + x + 0.5 * x * x)
+        preco_expectativa[i] = preco
+        if s > 0:
+            if caixa[i] >= preco:
+                caixa[i] -= preco
+                portfolio[i] += 1
+        elif portfolio[i] > 0:
+            caixa[i] += preco
+            portfolio[i] -= 1
+        patrimonio_rodada[i] = caixa[i] + portfolio[i] * preco_mercado
 
 
 class Agente:
     """
     Representa um agente participante do mercado.
+
+    Durante a simulação o estado numérico do agente vive nos vetores do
+    `Simulador`; os atributos abaixo guardam o estado inicial e são
+    sincronizados ao final de `Simulador.run`.
     """
 
     def __init__(self, nome: str, caixa: float = 10000.0):
         self.nome: str = nome
         self.caixa: float = caixa
         self.portfolio: int = 0
-        self.patrimonio: List[float] = [caixa]  # Histórico do patrimônio
-        self.vizinhos: List["Agente"] = []
         self.sentimento: float = 0.0
 
-    def calcula_l_privada(self) -> float:
-        """
-        Calcula l_privada como a variação percentual do patrimônio em 22 períodos.
-        """
-        if len(self.patrimonio) > 22:
-            patrimonio_t = self.patrimonio[-1]
-            patrimonio_t_22 = self.patrimonio[-22]
-            return (patrimonio_t / patrimonio_t_22) - 1
-        return 0.0
 
-    def calcula_l_social(self) -> float:
-        """
-        Calcula l_social como a média aritmética do l_privada dos vizinhos.
-        """
-        if self.vizinhos:
-            return sum(vizinho.calcula_l_privada() for vizinho in self.vizinhos) / len(
-                self.vizinhos
-            )
-        return 0.0
+class Simulador:
+    """
+    Simulador do mercado com agentes e rodadas.
 
-    def sorteia_news(self) -> float:
-        """
-        Sorteia um valor da distribuição normal com média 0 e desvio padrão 1.
-        """
-        return random.gauss(0, 1)
+    O estado dos agentes é mantido como estrutura de vetores (SoA): cada
+    atributo é um `np.ndarray` indexado pela posição do agente em `agentes`,
+    e cada rodada é processada com expressões vetorizadas.
+    """
 
-    def atualiza_sentimento(self) -> None:
+    def __init__(
+        self,
+        agentes: List[Agente],
+        rodadas: int = 30,
+        preco_inicial: float = 50.0,
+        max_vizinhos: int = 3,
+        seed: Optional[int] = None,
+        usar_numba: bool = NUMBA_DISPONIVEL,
+    ):
+        self.agentes = agentes
+        self.rodadas = rodadas
+        self.max_vizinhos = max_vizinhos
+        self.usar_numba = usar_numba
+        self.preco_mercado = preco_inicial  # Preço inicial da ação
+        # Histórico do preço do mercado: posição t = preço ao fim da rodada t
+        self.historico_preco = np.empty(rodadas + 1)
+        self.historico_preco[0] = preco_inicial
+        # Fluxo único de números aleatórios, sorteados em lote a cada rodada
+        self.rng = np.random.default_rng(seed)
+        self.log = logging.getLogger(__name__)
+
+        num_agentes = len(agentes)
+        self.caixa = np.array([agente.caixa for agente in agentes], dtype=np.float64)
+        self.portfolio = np.array(
+            [agente.portfolio for agente in agentes], dtype=np.int32
+        )
+        self.sentimento = np.zeros(num_agentes)
+        self.preco_expectativa = np.zeros(num_agentes)
+        # Linha i: índices dos vizinhos do agente i, sorteados a cada rodada
+        self.vizinhos = np.empty(
+            (num_agentes, min(num_agentes, max_vizinhos)), dtype=np.int32
+        )
+        # Linha t % 23: patrimônio dos agentes ao fim da rodada t (t = 0: inicial)
+        self.patrimonio = np.zeros((TAMANHO_BUFFER_PATRIMONIO, num_agentes))
+        self.patrimonio[0] = self.caixa + self.portfolio * preco_inicial
+
+    def atualiza_vizinhos(self) -> None:
         """
-        Atualiza o sentimento com base em l_privada, l_social e news.
+        Sorteia, para cada agente, os índices de seus vizinhos (com reposição).
         """
-        l_privada = self.calcula_l_privada()
-        l_social = self.calcula_l_social()
-        news = self.sorteia_news()
-        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
-        self.sentimento = max(
-            -1, min(1, sentimento_bruto)
-        )  # Garante que o sentimento está entre -1 e 1
+        num_agentes = len(self.agentes)
+        self.vizinhos[:] = self.rng.integers(0, num_agentes, size=self.vizinhos.shape)
 
-    def calcula_preco_expectativa(self, preco_mercado: float) -> float:
+    def calcula_l_privada(self, rodada: int) -> np.ndarray:
         """
-        Calcula o preço de expectativa do agente com base no sentimento.
+        Calcula l_privada de todos os agentes como a variação percentual do
+        patrimônio em 22 períodos.
         """
-        return preco_mercado * math.exp(self.sentimento / 10)
+        if rodada > PERIODOS_L_PRIVADA:
+            patrimonio_t = self.patrimonio[(rodada - 1) % TAMANHO_BUFFER_PATRIMONIO]
+            patrimonio_t_22 = self.patrimonio[
+                (rodada - PERIODOS_L_PRIVADA) % TAMANHO_BUFFER_PATRIMONIO
+            ]
+            return patrimonio_t / patrimonio_t_22 - 1
+        return np.zeros(len(self.agentes))
 
-    def gera_ordem(self, preco_mercado: float) -> "Ordem":
+    def calcula_l_social(self, l_privada: np.ndarray) -> np.ndarray:
         """
-        Gera uma ordem de compra ou venda com base no sentimento.
+        Calcula l_social como a média aritmética do l_privada dos vizinhos.
         """
-        self.atualiza_sentimento()
-        preco_expectativa = self.calcula_preco_expectativa(preco_mercado)
-        quantidade = 1  # Quantidade fixa conforme regra
-        tipo_ordem = "compra" if self.sentimento > 0 else "venda"
-        return Ordem(tipo_ordem, quantidade, preco_expectativa, self)
+        return l_privada[self.vizinhos].mean(axis=1)
 
-    def atualiza_vizinhos(self, agentes: List["Agente"], max_vizinhos: int = 3) -> None:
+    def atualiza_sentimento(self, rodada: int) -> None:
         """
-        Seleciona vizinhos aleatórios.
+        Atualiza o sentimento de todos os agentes com base em l_privada,
+        l_social e news.
         """
-        self.vizinhos = random.sample(agentes, min(len(agentes), max_vizinhos))
+        self.atualiza_vizinhos()
+        l_privada = self.calcula_l_privada(rodada)
+        l_social = self.calcula_l_social(l_privada)
+        news = self.rng.standard_normal(len(self.agentes))
+        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
+        # Garante que o sentimento está entre -1 e 1
+        np.clip(sentimento_bruto, -1, 1, out=self.sentimento)
 
-    def atualiza_patrimonio(self, ordem: "Ordem", preco_mercado: float) -> None:
+    def executa_ordens(self, rodada: int) -> np.ndarray:
         """
-        Atualiza o patrimônio e o portfólio com base na ordem executada.
+        Gera e executa a ordem de cada agente (quantidade fixa de 1 ação) e
+        registra o patrimônio resultante. Retorna os preços de expectativa.
         """
-        if ordem.tipo == "compra" and self.caixa >= ordem.preco:
-            self.caixa -= ordem.preco
-            self.portfolio += ordem.quantidade
-        elif ordem.tipo == "venda" and self.portfolio > 0:
-            self.caixa += ordem.preco
-            self.portfolio -= ordem.quantidade
-        # Atualiza o histórico do patrimônio
-        self.patrimonio.append(self.caixa + self.portfolio * preco_mercado)
-
-
-class Ordem:
-    """
-    Representa uma ordem de compra ou venda.
-    """
+        # exp(x) por Taylor de 2ª ordem: |x| = |sentimento| / 10 <= 0.1, então
+        # o erro relativo fica abaixo de 2e-4
+        x = self.sentimento * 0.1
+        preco_expectativa = self.preco_mercado * (1.0 + x + 0.5 * x * x)
+        compra = self.sentimento > 0
+        executa_compra = compra & (self.caixa >= preco_expectativa)
+        executa_venda = ~compra & (self.portfolio > 0)
 
-    def __init__(self, tipo: str, quantidade: int, preco: float, agente: Agente):
-        self.tipo: str = tipo
-        self.quantidade: int = quantidade
-        self.preco: float = preco
-        self.agente: Agente = agente
+        self.caixa[executa_compra] -= preco_expectativa[executa_compra]
+        self.portfolio[executa_compra] += 1
+        self.caixa[executa_venda] += preco_expectativa[executa_venda]
+        self.portfolio[executa_venda] -= 1
 
+        self.patrimonio[rodada % TAMANHO_BUFFER_PATRIMONIO] = (
+            self.caixa + self.portfolio * self.preco_mercado
+        )
+        return preco_expectativa
 
-class Simulador:
-    """
-    Simulador do mercado com agentes e rodadas.
-    """
+    def executa_rodada(self, rodada: int) -> np.ndarray:
+        """
+        Atualiza o sentimento e executa as ordens de todos os agentes,
+        usando o kernel compilado quando `usar_numba` está ativo.
+        Retorna os preços de expectativa.
+        """
+        if not self.usar_numba:
+            self.atualiza_sentimento(rodada)
+            return self.executa_ordens(rodada)
 
-    def __init__(
-        self, agentes: List[Agente], rodadas: int = 30, preco_inicial: float = 50.0
-    ):
-        self.agentes = agentes
-        self.rodadas = rodadas
-        self.preco_mercado = preco_inicial  # Preço inicial da ação
-        self.historico_preco = [preco_inicial]  # Histórico do preço do mercado
+        self.atualiza_vizinhos()
+        news = self.rng.standard_normal(len(self.agentes))
+        atualiza_rodada(
+            self.caixa,
+            self.portfolio,
+            self.sentimento,
+            self.preco_expectativa,
+            self.patrimonio,
+            self.vizinhos,
+            news,
+            self.preco_mercado,
+            rodada,
+        )
+        return self.preco_expectativa
 
-    def atualiza_preco(self):
+    def atualiza_preco(self, rodada: int) -> None:
         """
         Atualiza o preço das ações com base na oferta e demanda.
         """
-        compras = sum(1 for agente in self.agentes if agente.sentimento > 0)
-        vendas = len(self.agentes) - compras
+        num_agentes = len(self.agentes)
+        compras = int(np.count_nonzero(self.sentimento > 0))
 
         # Preço sobe com mais compras, cai com mais vendas, e inclui um ruído aleatório
-        variacao = (compras - vendas) / len(self.agentes) + random.uniform(-0.01, 0.01)
+        variacao = (2 * compras - num_agentes) / num_agentes + self.rng.uniform(
+            -0.01, 0.01
+        )
         self.preco_mercado *= 1 + variacao  # Atualiza o preço proporcionalmente
-        self.historico_preco.append(self.preco_mercado)
+        self.historico_preco[rodada] = self.preco_mercado
+
+    def sincroniza_agentes(self) -> None:
+        """
+        Copia o estado final dos vetores para os objetos `Agente`.
+        """
+        for i, agente in enumerate(self.agentes):
+            agente.caixa = float(self.caixa[i])
+            agente.portfolio = int(self.portfolio[i])
+            agente.sentimento = float(self.sentimento[i])
 
-    def run(self) -> None:
+    def registra_rodada(self, rodada: int, preco_expectativa: np.ndarray) -> None:
         """
-        Executa a simulação.
+        Registra o resumo da rodada no log, em nível DEBUG, como uma única mensagem.
+        """
+        linhas = [f"\n--- Rodada {rodada} ---"]
+        for agente, sentimento, preco, caixa, portfolio in zip(
+            self.agentes,
+            self.sentimento.tolist(),
+            preco_expectativa.tolist(),
+            self.caixa.tolist(),
+            self.portfolio.tolist(),
+        ):
+            tipo_ordem = "compra" if sentimento > 0 else "venda"
+            linhas.append(
+                f"Agente: {agente.nome} | Ordem: {tipo_ordem} | Preço: {preco:.2f} | "
+                f"Caixa: {caixa:.2f} | Portfólio: {portfolio} | Sentimento: {sentimento:.2f}"
+            )
+        linhas.append(f"Preço de mercado atualizado: {self.preco_mercado:.2f}")
+        self.log.debug("\n".join(linhas))
+
+    def run(self, imprimir_a_cada: int = 1) -> None:
+        """
+        Executa a simulação. O resumo de cada `imprimir_a_cada` rodadas vai
+        para o log em nível DEBUG; fora desse nível nada é formatado.
         """
         for rodada in range(1, self.rodadas + 1):
-            print(f"\n--- Rodada {rodada} ---")
-
-            # Cada agente toma decisões e gera uma ordem
-            for agente in self.agentes:
-                agente.atualiza_vizinhos(self.agentes)  # Atualiza a rede de vizinhos
-                ordem = agente.gera_ordem(
-                    self.preco_mercado
-                )  # Gera ordem baseada no sentimento
-                agente.atualiza_patrimonio(
-                    ordem, self.preco_mercado
-                )  # Atualiza o patrimônio
-
-                print(
-                    f"Agente: {agente.nome} | Ordem: {ordem.tipo} | Preço: {ordem.preco:.2f} | "
-                    f"Caixa: {agente.caixa:.2f} | Portfólio: {agente.portfolio} | Sentimento: {agente.sentimento:.2f}"
-                )
+            # Todos os agentes decidem e executam suas ordens de uma só vez
+            preco_expectativa = self.executa_rodada(rodada)
 
             # Atualiza o preço do mercado ao final de cada rodada
-            self.atualiza_preco()
-            print(f"Preço de mercado atualizado: {self.preco_mercado:.2f}")
+            self.atualiza_preco(rodada)
 
+            if rodada % imprimir_a_cada == 0 and self.log.isEnabledFor(logging.DEBUG):
+                self.registra_rodada(rodada, preco_expectativa)
 
-if __name__ == "__main__":
-    # Inicializa agentes e simulador
-    agentes = [Agente(f"Agente {i+1}") for i in range(10)]
-    # simulador = Simulador(agentes)
-    # simulador.run()
+        self.sincroniza_agentes()
+
+
+def plotar_preco(historico_preco: np.ndarray, arquivo: Optional[str] = None) -> None:
+    """
+    Plota a evolução do preço do mercado. Com `arquivo`, salva a figura
+    usando o backend Agg (sem janela); caso contrário, exibe na tela.
+    """
+    # Importado só aqui para não pesar na inicialização da simulação
     import matplotlib.pyplot as plt
 
-    # Após executar a simulação:
-    simulador = Simulador(agentes, rodadas=30)
-    simulador.run()
+    if arquivo is not None:
+        plt.switch_backend("Agg")
 
-    # Gráfico do preço do mercado ao longo das rodadas
-    plt.plot(range(1, len(simulador.historico_preco) + 1), simulador.historico_preco)
+    plt.plot(range(1, len(historico_preco) + 1), historico_preco)
     plt.title("Evolução do Preço do Mercado")
     plt.xlabel("Rodadas")
     plt.ylabel("Preço")
     plt.grid()
-    plt.show()
+    if arquivo is not None:
+        plt.savefig(arquivo)
+        plt.close()
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    # Exibe o resumo das rodadas no stdout
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+    # Inicializa agentes e simulador
+    agentes = [Agente(f"Agente {i+1}") for i in range(10)]
+    simulador = Simulador(agentes, rodadas=30)
+    simulador.run()
+
+    # Gráfico do preço do mercado ao longo das rodadas
+    plotar_preco(simulador.historico_preco)
@@ -0,0 +1,247 @@
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+import numpy as np
+
+from vetorizacao import NUMBA_DISPONIVEL, njit
+
+# Abaixo deste total de ordens o laço de `casar_ordens`, mesmo sem JIT, é mais
+# rápido que o cruzamento vetorizado, que paga o custo fixo das chamadas NumPy
+MIN_ORDENS_CRUZAMENTO = 64
+
+
+# nogil: os livros de ativos diferentes podem ser casados em threads paralelas
+@njit(cache=True, nogil=True)
+def casar_ordens(
+    precos_compra: np.ndarray,
+    quantidades_compra: np.ndarray,
+    precos_venda: np.ndarray,
+    quantidades_venda: np.ndarray,
+):
+    """
+    Casa as ordens de compra (em ordem decrescente de preço) com as de venda
+    (em ordem crescente), consumindo as quantidades no lugar. Cada negócio é
+    fechado pela média dos dois preços limite.
+
+    Retorna o número de negócios; as posições das ordens de compra e de venda,
+    a quantidade e o preço de cada negócio; e as posições das primeiras ordens
+    ainda abertas de cada lado.
+
+    As quantidades devem ser positivas: uma ordem zerada dentro do cruzamento
+    geraria aqui um negócio de quantidade zero, que `cruzar_ordens` não
+    registra. O `OrderBook` descarta essas ordens ao recebê-las.
+    """
+    n_compra = len(precos_compra)
+    n_venda = len(precos_venda)
+    # Cada negócio esgota ao menos uma ordem
+    maximo = n_compra + n_venda
+    posicoes_compra = np.empty(maximo, dtype=np.int64)
+    posicoes_venda = np.empty(maximo, dtype=np.int64)
+    quantidades = np.empty(maximo, dtype=np.int64)
+    precos = np.empty(maximo, dtype=np.float64)
+
+    i = j = n = 0
+    while i < n_compra and j < n_venda and precos_compra[i] >= precos_venda[j]:
+        quantidade = min(quantidades_compra[i], quantidades_venda[j])
+        posicoes_compra[n] = i
+        posicoes_venda[n] = j
+        quantidades[n] = quantidade
+        precos[n] = (precos_compra[i] + precos_venda[j]) / 2
+        n += 1
+
+        quantidades_compra[i] -= quantidade
+        quantidades_venda[j] -= quantidade
+        if quantidades_compra[i] == 0:
+            i += 1
+        if quantidades_venda[j] == 0:
+            j += 1
+    return n, posicoes_compra, posicoes_venda, quantidades, precos, i, j
+
+
+def cruzar_ordens(
+    precos_compra: np.ndarray,
+    quantidades_compra: np.ndarray,
+    precos_venda: np.ndarray,
+    quantidades_venda: np.ndarray,
+):
+    """
+    Versão vetorizada de `casar_ordens`, com o mesmo contrato, para quando o
+    numba não está disponível. Cada negócio corresponde a um trecho entre
+    fronteiras consecutivas das quantidades acumuladas dos dois lados; os
+    preços só pioram ao longo do livro, então os negócios param no primeiro
+    trecho em que a compra não cobre a venda.
+    """
+    acumulado_compra = np.cumsum(quantidades_compra)
+    acumulado_venda = np.cumsum(quantidades_venda)
+    total = min(acumulado_compra[-1], acumulado_venda[-1])
+    # Os dois acumulados já estão em ordem: a ordenação estável (timsort)
+    # só intercala as duas sequências, sem o custo de um sort completo
+    fronteiras = np.sort(
+        np.concatenate((acumulado_compra, acumulado_venda)), kind="stable"
+    )
+    fronteiras = fronteiras[fronteiras <= total]
+    distintas = np.ones(len(fronteiras), dtype=bool)
+    np.not_equal(fronteiras[1:], fronteiras[:-1], out=distintas[1:])
+    fronteiras = fronteiras[distintas]
+    inicios = np.concatenate(([0], fronteiras[:-1]))
+
+    posicoes_compra = np.searchsorted(acumulado_compra, inicios, "right")
+    posicoes_venda = np.searchsorted(acumulado_venda, inicios, "right")
+    cruzam = precos_compra[posicoes_compra] >= precos_venda[posicoes_venda]
+    n = len(cruzam) if cruzam.all() else int(np.argmin(cruzam))
+
+    quantidades = fronteiras[:n] - inicios[:n]
+    precos = (precos_compra[posicoes_compra[:n]] + precos_venda[posicoes_venda[:n]]) / 2
+
+    # Consome as quantidades no lugar: cada ordem perde a parte do volume
+    # executado que cai dentro do seu trecho acumulado
+    executado = fronteiras[n - 1] if n else 0
+    posicoes = []
+    for quantidades_lado, acumulado in (
+        (quantidades_compra, acumulado_compra),
+        (quantidades_venda, acumulado_venda),
+    ):
+        quantidades_lado -= np.clip(
+            executado - (acumulado - quantidades_lado), 0, quantidades_lado
+        )
+        posicoes.append(int(np.searchsorted(acumulado, executado, "right")))
+    return n, posicoes_compra, posicoes_venda, quantidades, precos, *posicoes
+
+
+@dataclass(slots=True)
+class LadoLivro:
+    """
+    Um lado (compra ou venda) do livro de ordens de um ativo, guardado como
+    vetores paralelos de preço, quantidade e índice do agente. A capacidade
+    dobra quando o buffer enche; apenas as `tamanho` primeiras posições são válidas.
+    """
+
+    precos: np.ndarray = field(default_factory=lambda: np.empty(16))
+    quantidades: np.ndarray = field(
+        default_factory=lambda: np.empty(16, dtype=np.int64)
+    )
+    agentes: np.ndarray = field(default_factory=lambda: np.empty(16, dtype=np.int64))
+    tamanho: int = 0
+    ordenados: int = 0  # Prefixo já em ordem de prioridade
+
+    def _garantir_capacidade(self, tamanho: int) -> None:
+        capacidade = len(self.precos)
+        if tamanho > capacidade:
+            while capacidade < tamanho:
+                capacidade *= 2
+            self.precos = np.resize(self.precos, capacidade)
+            self.quantidades = np.resize(self.quantidades, capacidade)
+            self.agentes = np.resize(self.agentes, capacidade)
+
+    def adicionar_lote(
+        self, precos: np.ndarray, quantidades: np.ndarray, agentes: np.ndarray
+    ) -> None:
+        fim = self.tamanho + len(precos)
+        self._garantir_capacidade(fim)
+        self.precos[self.tamanho : fim] = precos
+        self.quantidades[self.tamanho : fim] = quantidades
+        self.agentes[self.tamanho : fim] = agentes
+        self.tamanho = fim
+
+    def ordenar(self, decrescente: bool) -> None:
+        # As `ordenados` primeiras ordens já estão em prioridade (sobraram do
+        # casamento anterior): ordena só as novas e intercala. Ordenação
+        # estável e empates após as antigas preservam a ordem de chegada.
+        precos = self.precos[: self.tamanho]
+        chaves = -precos if decrescente else precos
+        inicio = self.ordenados
+        if inicio < self.tamanho:
+            novas = inicio + np.argsort(chaves[inicio:], kind="stable")
+            if inicio:
+                posicoes = np.searchsorted(chaves[:inicio], chaves[novas], "right")
+                posicoes += np.arange(len(novas))
+                indices = np.empty(self.tamanho, dtype=np.intp)
+                antigas = np.ones(self.tamanho, dtype=bool)
+                antigas[posicoes] = False
+                indices[posicoes] = novas
+                indices[antigas] = np.arange(inicio)
+            else:
+                indices = novas
+            self._reordenar(indices)
+        self.ordenados = self.tamanho
+
+    def compactar(self, inicio: int) -> None:
+        # Descarta as ordens já consumidas antes de `inicio` e as zeradas;
+        # as restantes continuam em ordem de prioridade
+        quantidades = self.quantidades[inicio : self.tamanho]
+        self._reordenar(np.flatnonzero(quantidades > 0) + inicio)
+        self.ordenados = self.tamanho
+
+    def _reordenar(self, indices: np.ndarray) -> None:
+        tamanho = len(indices)
+        self.precos[:tamanho] = self.precos[indices]
+        self.quantidades[:tamanho] = self.quantidades[indices]
+        self.agentes[:tamanho] = self.agentes[indices]
+        self.tamanho = tamanho
+
+
+@dataclass(slots=True)
+class OrderBook:
+    ordens_compra: Dict[str, LadoLivro] = field(default_factory=dict)
+    ordens_venda: Dict[str, LadoLivro] = field(default_factory=dict)
+    # Sem numba, livros grandes usam o cruzamento vetorizado em vez do laço
+    # de casar_ordens em Python puro
+    usar_numba: bool = NUMBA_DISPONIVEL
+
+    def adicionar_lote(
+        self,
+        ativo: str,
+        compra: np.ndarray,
+        precos: np.ndarray,
+        quantidades: np.ndarray,
+    ) -> None:
+        """
+        Adiciona uma ordem por agente (o agente i na posição i), separando as
+        de compra das de venda pela máscara `compra`. Ordens de quantidade
+        zero são descartadas.
+        """
+        agentes = np.arange(len(compra))
+        positivas = quantidades > 0
+        for mascara, ordens in (
+            (compra & positivas, self.ordens_compra),
+            (~compra & positivas, self.ordens_venda),
+        ):
+            ordens.setdefault(ativo, LadoLivro()).adicionar_lote(
+                precos[mascara], quantidades[mascara], agentes[mascara]
+            )
+
+    def executar_ordens(
+        self, ativo: str
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Casa as ordens de compra e venda de um ativo e retorna os negócios, na
+        ordem em que ocorreram, sem aplicá-los aos agentes.
+
+        :return: Índices dos compradores e dos vendedores, quantidades e preços.
+        """
+        compras = self.ordens_compra.get(ativo)
+        vendas = self.ordens_venda.get(ativo)
+        # Sem ordens de um dos lados não há negócio: nem ordena nem casa
+        if compras is None or vendas is None or not compras.tamanho * vendas.tamanho:
+            vazio = np.empty(0, dtype=np.int64)
+            return vazio, vazio, vazio, np.empty(0)
+
+        # `ordenar` só trabalha se entraram ordens desde o último casamento
+        compras.ordenar(decrescente=True)
+        vendas.ordenar(decrescente=False)
+
+        pequeno = compras.tamanho + vendas.tamanho < MIN_ORDENS_CRUZAMENTO
+        casar = casar_ordens if self.usar_numba or pequeno else cruzar_ordens
+        n, pos_compra, pos_venda, quantidades, precos, i, j = casar(
+            compras.precos[: compras.tamanho],
+            compras.quantidades[: compras.tamanho],
+            vendas.precos[: vendas.tamanho],
+            vendas.quantidades[: vendas.tamanho],
+        )
+        compradores = compras.agentes[pos_compra[:n]]
+        vendedores = vendas.agentes[pos_venda[:n]]
+
+        # Remove as ordens executadas, mantendo as restantes já ordenadas
+        compras.compactar(i)
+        vendas.compactar(j)
+        return compradores, vendedores, quantidades[:n], precos[:n]
@@ -1,154 +1,193 @@
-import random
-from typing import List
+import logging
+import sys
+from typing import List, Optional
+
+import numpy as np
 
 
 class Agente:
     """
     Representa um agente participante do mercado.
+
+    Durante a simulação o estado numérico do agente vive nos vetores do
+    `Simulador`; os atributos abaixo guardam o estado inicial e são
+    sincronizados ao final de `Simulador.run`.
     """
 
     def __init__(self, nome: str, caixa: float = 10000.0):
         self.nome: str = nome
         self.caixa: float = caixa
         self.portfolio: int = 0
-        self.historico_caixa: List[float] = [caixa]  # Histórico de caixa
         self.risco: float = 0.0  # Inicializa risco do agente
-        self.vizinhos: List["Agente"] = []
-        self.sentimento_atual: float = random.uniform(0, 1)
+        # Sorteado pelo `Simulador`, do seu gerador, ao criar a simulação
+        self.sentimento_atual: Optional[float] = None
+
+
+class Simulador:
+    """
+    Simulador do mercado B3.
+
+    O estado dos agentes é mantido como estrutura de vetores (SoA), indexada
+    pela posição do agente em `agentes`, e cada rodada é processada com
+    expressões vetorizadas.
+    """
+
+    def __init__(
+        self,
+        agentes: List[Agente],
+        rodadas: int = 30,
+        max_vizinhos: int = 3,
+        seed: Optional[int] = None,
+    ):
+        self.agentes: List[Agente] = agentes
+        self.rodadas: int = rodadas
+        self.max_vizinhos: int = max_vizinhos
+        self.preco: float = 50.0
+        # Fluxo único de números aleatórios, sorteados em lote a cada rodada
+        self.rng = np.random.default_rng(seed)
+        self.log = logging.getLogger(__name__)
+
+        num_agentes = len(agentes)
+        self.caixa = np.array([agente.caixa for agente in agentes], dtype=np.float64)
+        self.portfolio = np.array(
+            [agente.portfolio for agente in agentes], dtype=np.int32
+        )
+        self.risco = np.array([agente.risco for agente in agentes])
+        # Sentimento inicial sorteado em lote do gerador da simulação
+        self.sentimento = self.rng.uniform(0, 1, num_agentes)
+        # Linha t: caixa de cada agente ao fim da rodada t (linha 0 = inicial)
+        self.historico_caixa = np.empty((rodadas + 1, num_agentes))
+        self.historico_caixa[0] = self.caixa
+
+    def atualiza_vizinhos(self) -> np.ndarray:
+        """
+        Sorteia, para cada agente, os índices de seus vizinhos, excluindo o próprio agente.
 
-    def calcula_risco(self) -> float:
+        Usa o algoritmo de Floyd, vetorizado sobre os agentes: são feitos só
+        k sorteios por agente, sem montar a lista de candidatos.
+        """
+        num_agentes = len(self.agentes)
+        k = min(num_agentes - 1, self.max_vizinhos)
+        candidatos = num_agentes - 1  # todos menos o próprio agente
+        vizinhos = np.empty((num_agentes, k), dtype=np.int64)
+        for coluna, j in enumerate(range(candidatos - k, candidatos)):
+            sorteio = self.rng.integers(0, j + 1, size=num_agentes)
+            repetido = (vizinhos[:, :coluna] == sorteio[:, None]).any(axis=1)
+            vizinhos[:, coluna] = np.where(repetido, j, sorteio)
+        # Pula o índice do próprio agente
+        vizinhos += vizinhos >= np.arange(num_agentes)[:, None]
+        return vizinhos
+
+    def calcula_risco(self, caixa_anterior: np.ndarray) -> np.ndarray:
         """
-        Calcula o risco do agente com base na variação de caixa e no portfolio.
+        Calcula o risco dos agentes com base na variação de caixa e no portfolio.
         Risco maior se houve grandes variações ou muitas compras.
         """
-        variacao_caixa = (
-            abs(self.caixa - self.historico_caixa[-1]) / self.historico_caixa[-1]
-        )
-        risco_portfolio = min(
-            self.portfolio / 10, 1
-        )  # Normaliza risco do portfolio entre 0 e 1
+        variacao_caixa = np.abs(self.caixa - caixa_anterior) / caixa_anterior
+        # Normaliza risco do portfolio entre 0 e 1
+        risco_portfolio = np.minimum(self.portfolio / 10, 1)
         self.risco = (variacao_caixa + risco_portfolio) / 2  # Média dos dois riscos
         return self.risco
 
-    def atualiza_sentimento(self) -> float:
+    def atualiza_sentimento(self, rodada: int) -> None:
         """
-        Atualiza o sentimento do agente com base em risco, vizinhos e histórico.
+        Atualiza o sentimento dos agentes com base em risco, vizinhos e histórico.
         """
+        caixa_anterior = self.historico_caixa[rodada - 1]
+
         # Histórico do agente
-        variacao_caixa = (self.caixa - self.historico_caixa[-1]) / self.historico_caixa[
-            -1
-        ]
-        impacto_historico = max(0, min(1, 0.5 + variacao_caixa))
+        variacao_caixa = (self.caixa - caixa_anterior) / caixa_anterior
+        impacto_historico = np.clip(0.5 + variacao_caixa, 0, 1)
 
         # Sentimento dos vizinhos
-        if self.vizinhos:
-            sentimento_vizinhos = sum(
-                vizinho.sentimento_atual for vizinho in self.vizinhos
-            ) / len(self.vizinhos)
+        vizinhos = self.atualiza_vizinhos()
+        if vizinhos.shape[1]:
+            sentimento_vizinhos = self.sentimento[vizinhos].mean(axis=1)
         else:
-            sentimento_vizinhos = random.uniform(0, 1)
+            sentimento_vizinhos = self.rng.random(len(self.agentes))
 
         # Fator aleatório e risco
-        fator_aleatorio = random.uniform(0, 1)
-        risco_atual = (
-            1 - self.calcula_risco()
-        )  # Inverso do risco (quanto menor o risco, maior o impacto positivo)
+        fator_aleatorio = self.rng.random(len(self.agentes))
+        # Inverso do risco (quanto menor o risco, maior o impacto positivo)
+        risco_atual = 1 - self.calcula_risco(caixa_anterior)
 
         # Combinação com peso no risco
-        self.sentimento_atual = (
+        self.sentimento = (
             impacto_historico + sentimento_vizinhos + fator_aleatorio + risco_atual
         ) / 4
-        return self.sentimento_atual
 
-    def atualiza_vizinhos(self, agentes: List["Agente"], max_vizinhos: int = 3) -> None:
+    def executa_ordens(self) -> np.ndarray:
         """
-        Seleciona vizinhos aleatórios, excluindo o próprio agente.
+        Gera e executa as ordens de todos os agentes com base no sentimento e
+        no risco atual. Retorna as quantidades das ordens.
         """
-        agentes_disponiveis = [agente for agente in agentes if agente != self]
-        self.vizinhos = random.sample(
-            agentes_disponiveis, min(len(agentes_disponiveis), max_vizinhos)
-        )
+        compra = self.sentimento > 0.5
+        # Menor quantidade se o risco for alto
+        quantidade = (self.sentimento * 10 * (1 - self.risco)).astype(np.int32)
+        valor_total = quantidade * self.preco
 
-    def gera_ordem(self, preco: float) -> "Ordem":
-        """
-        Gera uma ordem com base no sentimento e no risco atual.
-        """
-        sentimento = self.atualiza_sentimento()
-        tipo_ordem = "compra" if sentimento > 0.5 else "venda"
-        quantidade = int(
-            sentimento * 10 * (1 - self.risco)
-        )  # Menor quantidade se o risco for alto
-        return Ordem(tipo_ordem, quantidade, preco, self)
-
-    def executa_ordem(self, ordem: "Ordem") -> None:
+        executa_compra = compra & (self.caixa >= valor_total)
+        executa_venda = ~compra & (self.portfolio >= quantidade)
+
+        self.caixa[executa_compra] -= valor_total[executa_compra]
+        self.portfolio[executa_compra] += quantidade[executa_compra]
+        self.caixa[executa_venda] += valor_total[executa_venda]
+        self.portfolio[executa_venda] -= quantidade[executa_venda]
+        return quantidade
+
+    def sincroniza_agentes(self) -> None:
         """
-        Executa a ordem e atualiza o caixa e o portfolio do agente.
+        Copia o estado final dos vetores para os objetos `Agente`.
         """
-        if ordem.tipo == "compra":
-            custo_total = ordem.quantidade * ordem.preco
-            if self.caixa >= custo_total:
-                self.caixa -= custo_total
-                self.portfolio += ordem.quantidade
-        elif ordem.tipo == "venda" and self.portfolio >= ordem.quantidade:
-            receita_total = ordem.quantidade * ordem.preco
-            self.caixa += receita_total
-            self.portfolio -= ordem.quantidade
-
-    def registra_historico(self) -> None:
+        for i, agente in enumerate(self.agentes):
+            agente.caixa = float(self.caixa[i])
+            agente.portfolio = int(self.portfolio[i])
+            agente.risco = float(self.risco[i])
+            agente.sentimento_atual = float(self.sentimento[i])
+
+    def registra_rodada(self, rodada: int, quantidade: np.ndarray) -> None:
         """
-        Registra o estado atual do caixa no histórico.
+        Registra o resumo da rodada no log, em nível DEBUG, como uma única mensagem.
         """
-        self.historico_caixa.append(self.caixa)
-
-
-class Ordem:
-    """
-    Representa uma ordem de compra ou venda.
-    """
-
-    def __init__(self, tipo: str, quantidade: int, preco: float, agente: Agente):
-        self.tipo: str = tipo
-        self.quantidade: int = quantidade
-        self.preco: float = preco
-        self.agente: Agente = agente
-
-
-class Simulador:
-    """
-    Simulador do mercado B3.
-    """
-
-    def __init__(self, agentes: List[Agente], rodadas: int = 30):
-        self.agentes: List[Agente] = agentes
-        self.rodadas: int = rodadas
-        self.preco: float = 50.0
-
-    def run(self) -> None:
+        linhas = [f"\n--- Rodada {rodada} ---"]
+        for agente, sentimento, qtd, caixa, portfolio, risco in zip(
+            self.agentes,
+            self.sentimento.tolist(),
+            quantidade.tolist(),
+            self.caixa.tolist(),
+            self.portfolio.tolist(),
+            self.risco.tolist(),
+        ):
+            tipo_ordem = "compra" if sentimento > 0.5 else "venda"
+            linhas.append(
+                f"Agente: {agente.nome} | Ordem: {tipo_ordem} {qtd} ações | Caixa: {caixa:.2f} | "
+                f"Portfolio: {portfolio} | Risco: {risco:.2f}"
+            )
+        self.log.debug("\n".join(linhas))
+
+    def run(self, imprimir_a_cada: int = 1) -> None:
         """
-        Executa a simulação.
+        Executa a simulação. O resumo de cada `imprimir_a_cada` rodadas vai
+        para o log em nível DEBUG; fora desse nível nada é formatado.
         """
         for rodada in range(1, self.rodadas + 1):
-            print(f"\n--- Rodada {rodada} ---")
-
-            # Atualiza vizinhos
-            for agente in self.agentes:
-                agente.atualiza_vizinhos(self.agentes)
-
             # Gera e executa ordens
-            for agente in self.agentes:
-                ordem = agente.gera_ordem(self.preco)
-                agente.executa_ordem(ordem)
-                print(
-                    f"Agente: {agente.nome} | Ordem: {ordem.tipo} {ordem.quantidade} ações | Caixa: {agente.caixa:.2f} | "
-                    f"Portfolio: {agente.portfolio} | Risco: {agente.risco:.2f}"
-                )
+            self.atualiza_sentimento(rodada)
+            quantidade = self.executa_ordens()
+            if rodada % imprimir_a_cada == 0 and self.log.isEnabledFor(logging.DEBUG):
+                self.registra_rodada(rodada, quantidade)
 
             # Registra histórico
-            for agente in self.agentes:
-                agente.registra_historico()
+            self.historico_caixa[rodada] = self.caixa
+
+        self.sincroniza_agentes()
 
 
 if __name__ == "__main__":
+    # Exibe o resumo das rodadas no stdout
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    logging.getLogger(__name__).setLevel(logging.DEBUG)
+
     # Criação de agentes
     agentes = [Agente(f"Agente {i+1}") for i in range(10)]
 
@@ -1,11 +1,18 @@
-import random
-import matplotlib.pyplot as plt
+import logging
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from livro_ordens import OrderBook
+
+log = logging.getLogger(__name__)
 
 
 # Classes Atualizadas
-@dataclass
+@dataclass(slots=True)
 class Ativo:
     nome: str
     preco_atual: float
@@ -23,47 +30,22 @@ class Ativo:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Agente:
     nome: str
     saldo: float
-    carteira: Dict[str, int]
+    carteira: np.ndarray  # Quantidade de cada ativo, indexada pelo id do ativo
     sentimento: str
     expectativa: List[float]  # [min, esperada, max]
     conhecimento: str
+    indice: int = 0  # Posição do agente na lista de agentes da simulação
 
-    def tomar_decisao(self, mercado, order_book):
-        for ativo, preco in mercado.ativos.items():
-            prob_compra = random.uniform(0, 1)
-            if prob_compra > 0.5:  # Compra
-                quantidade = random.randint(1, 10)
-                preco_limite = preco * random.uniform(0.98, 1.02)
-                ordem = Ordem("compra", self, ativo, preco_limite, quantidade)
-                print(f"[COMPRA] {self.nome} deseja comprar {quantidade} de {ativo} por até {preco_limite:.2f}")
-            else:  # Venda
-                quantidade_maxima = self.carteira.get(ativo, 0)
-                if quantidade_maxima > 0:  # Só vende se tiver ativos na carteira
-                    quantidade = random.randint(1, quantidade_maxima)
-                    preco_limite = preco * random.uniform(0.98, 1.02)
-                    ordem = Ordem("venda", self, ativo, preco_limite, quantidade)
-                    print(f"[VENDA] {self.nome} deseja vender {quantidade} de {ativo} por pelo menos {preco_limite:.2f}")
-                    order_book.adicionar_ordem(ordem)
-
-
-@dataclass
-class Ordem:
-    tipo: str
-    agente: Agente
-    ativo: str
-    preco_limite: float
-    quantidade: int
 
-
-@dataclass
+@dataclass(slots=True)
 class Transacao:
     comprador: Agente
     vendedor: Agente
-    ativo: str
+    ativo: int  # Id do ativo (posição nas carteiras)
     quantidade: int
     preco_execucao: float
 
@@ -71,149 +53,249 @@ class Transacao:
         valor_total = self.quantidade * self.preco_execucao
         self.comprador.saldo -= valor_total
         self.vendedor.saldo += valor_total
-        self.comprador.carteira[self.ativo] = (
-            self.comprador.carteira.get(self.ativo, 0) + self.quantidade
-        )
+        self.comprador.carteira[self.ativo] += self.quantidade
         self.vendedor.carteira[self.ativo] -= self.quantidade
 
 
-@dataclass
-class OrderBook:
-    ordens_compra: Dict[str, List[Ordem]] = field(default_factory=dict)
-    ordens_venda: Dict[str, List[Ordem]] = field(default_factory=dict)
-
-    def adicionar_ordem(self, ordem: Ordem):
-        if ordem.tipo == "compra":
-            self.ordens_compra.setdefault(ordem.ativo, []).append(ordem)
-        elif ordem.tipo == "venda":
-            self.ordens_venda.setdefault(ordem.ativo, []).append(ordem)
+@dataclass(slots=True)
+class Mercado:
+    ativos: Dict[str, float]
 
+    def atualizar_preco(self, ativo, novo_preco):
+        self.ativos[ativo] = novo_preco
 
-    def executar_ordens(self, ativo, mercado):
-        if ativo in self.ordens_compra and ativo in self.ordens_venda:
-            self.ordens_compra[ativo].sort(key=lambda x: x.preco_limite, reverse=True)
-            self.ordens_venda[ativo].sort(key=lambda x: x.preco_limite)
 
-            while self.ordens_compra[ativo] and self.ordens_venda[ativo]:
-                ordem_compra = self.ordens_compra[ativo][0]
-                ordem_venda = self.ordens_venda[ativo][0]
+def executar_ordens(
+    order_book: OrderBook,
+    mercado: Mercado,
+    agentes: List[Agente],
+    executor: Executor,
+) -> None:
+    """
+    Casa o livro de cada ativo e aplica as transações aos agentes,
+    atualizando o preço a cada negócio.
 
-                print(
-                    f"Melhor ordem de compra: {ordem_compra.preco_limite} | Quantidade: {ordem_compra.quantidade}"
-                )
-                print(
-                    f"Melhor ordem de venda: {ordem_venda.preco_limite} | Quantidade: {ordem_venda.quantidade}"
+    Os livros dos ativos são casados em paralelo no `executor` (cada
+    casamento só altera o livro do próprio ativo, e `casar_ordens` solta o
+    GIL); as transações são aplicadas depois, na ordem dos ativos.
+    """
+    depurar = log.isEnabledFor(logging.DEBUG)
+    ativos = list(mercado.ativos)
+    execucoes = executor.map(order_book.executar_ordens, ativos)
+
+    # Ponto de sincronização: só aqui saldos, carteiras e preços são alterados
+    for id_ativo, (ativo, negocios) in enumerate(zip(ativos, execucoes)):
+        for comprador, vendedor, quantidade, preco in zip(
+            *(coluna.tolist() for coluna in negocios)
+        ):
+            transacao = Transacao(
+                comprador=agentes[comprador],
+                vendedor=agentes[vendedor],
+                ativo=id_ativo,
+                quantidade=quantidade,
+                preco_execucao=preco,
+            )
+            transacao.executar()
+            mercado.atualizar_preco(ativo, transacao.preco_execucao)
+            if depurar:
+                log.debug(
+                    f"Preço do ativo {ativo} atualizado para: "
+                    f"{transacao.preco_execucao:.2f}"
                 )
 
-                if ordem_compra.preco_limite >= ordem_venda.preco_limite:
-                    preco_execucao = (
-                        ordem_compra.preco_limite + ordem_venda.preco_limite
-                    ) / 2
-                    quantidade_exec = min(ordem_compra.quantidade, ordem_venda.quantidade)
-
-                    transacao = Transacao(
-                        comprador=ordem_compra.agente,
-                        vendedor=ordem_venda.agente,
-                        ativo=ativo,
-                        quantidade=quantidade_exec,
-                        preco_execucao=preco_execucao,
-                    )
-                    transacao.executar()
 
-                    mercado.ativos[ativo] = preco_execucao
-                    print(f"Preço do ativo {ativo} atualizado para: {preco_execucao:.2f}")
+MENSAGENS_ORDEM = {
+    "compra": "[COMPRA] {} deseja comprar {} de {} por até {:.2f}",
+    "venda": "[VENDA] {} deseja vender {} de {} por pelo menos {:.2f}",
+}
 
-                    ordem_compra.quantidade -= quantidade_exec
-                    ordem_venda.quantidade -= quantidade_exec
 
-                    if ordem_compra.quantidade == 0:
-                        self.ordens_compra[ativo].pop(0)
-                    if ordem_venda.quantidade == 0:
-                        self.ordens_venda[ativo].pop(0)
-                else:
-                    print(f"Sem execução: preços não compatíveis para {ativo}.")
-                    break
+def gerar_ordens(
+    agentes: List[Agente],
+    mercado: Mercado,
+    order_book: OrderBook,
+    carteiras: np.ndarray,
+    rng: np.random.Generator,
+) -> None:
+    """
+    Gera as ordens de todos os agentes para todos os ativos em lote.
 
-            # Remover ordens vazias como precaução
-            self.ordens_compra[ativo] = [
-                o for o in self.ordens_compra[ativo] if o.quantidade > 0
-            ]
-            self.ordens_venda[ativo] = [
-                o for o in self.ordens_venda[ativo] if o.quantidade > 0
-            ]
+    Cada agente compra um ativo com probabilidade 1/2 (de 1 a 10 unidades,
+    limitadas ao que o caixa livre paga) e, caso contrário, vende de 1 até a
+    quantidade que possui. O preço limite varia até 2% em torno do preço
+    atual. `carteiras` é a matriz agentes x ativos com as quantidades em
+    carteira.
+    """
+    ativos = list(mercado.ativos.keys())
+    formato = (len(agentes), len(ativos))
+    precos = np.array([mercado.ativos[ativo] for ativo in ativos])
+
+    # Todos os sorteios da rodada em três chamadas
+    compra = rng.random(formato) > 0.5
+    quantidades = np.where(
+        compra,
+        rng.integers(1, 11, size=formato),
+        rng.integers(1, np.maximum(carteiras, 1) + 1, size=formato),
+    )
+    precos_limite = precos * rng.uniform(0.98, 1.02, size=formato)
+    venda = ~compra & (carteiras > 0)  # Só vende se tiver ativos na carteira
+
+    # Caixa livre: o saldo menos o valor das compras ainda abertas no livro,
+    # que executam no máximo pelo preço limite. Cada compra é reduzida ao que
+    # o caixa livre paga e o reserva; as que não cabem em nenhuma unidade caem.
+    caixa = np.array([agente.saldo for agente in agentes])
+    for lado in order_book.ordens_compra.values():
+        n = lado.tamanho
+        caixa -= np.bincount(
+            lado.agentes[:n],
+            lado.precos[:n] * lado.quantidades[:n],
+            minlength=len(agentes),
+        )
+    for k in range(len(ativos)):
+        acessivel = np.floor(np.maximum(caixa, 0) / precos_limite[:, k])
+        quantidades[:, k] = np.where(
+            compra[:, k],
+            np.minimum(quantidades[:, k], acessivel),
+            quantidades[:, k],
+        )
+        caixa -= np.where(compra[:, k], quantidades[:, k] * precos_limite[:, k], 0)
+    compra &= quantidades > 0
+    # Quem não compra nem vende fica com quantidade zero, que o livro descarta
+    quantidades[~(compra | venda)] = 0
+
+    depurar = log.isEnabledFor(logging.DEBUG)
+    linhas = []
+    for k, ativo in enumerate(ativos):
+        order_book.adicionar_lote(
+            ativo, compra[:, k], precos_limite[:, k], quantidades[:, k]
+        )
+        if depurar:
+            for tipo, mascara in (("compra", compra[:, k]), ("venda", venda[:, k])):
+                indices = np.flatnonzero(mascara)
+                modelo = MENSAGENS_ORDEM[tipo]
+                linhas.extend(
+                    modelo.format(agentes[i].nome, q, ativo, p)
+                    for i, q, p in zip(
+                        indices.tolist(),
+                        quantidades[indices, k].tolist(),
+                        precos_limite[indices, k].tolist(),
+                    )
+                )
+    if linhas:
+        log.debug("\n".join(linhas))
 
 
-@dataclass
-class Mercado:
-    ativos: Dict[str, float]
+def plotar_precos(
+    ativos: List[str],
+    historico_precos: np.ndarray,
+    arquivo: Optional[str] = None,
+) -> None:
+    """
+    Plota a evolução dos preços dos ativos (linha k de `historico_precos`
+    corresponde a `ativos[k]`). Com `arquivo`, salva a figura
+    usando o backend Agg (sem janela); caso contrário, exibe na tela.
+    """
+    # Importado só aqui para não pesar na inicialização da simulação
+    import matplotlib.pyplot as plt
 
-    def atualizar_preco(self, ativo, novo_preco):
-        self.ativos[ativo] = novo_preco
+    if arquivo is not None:
+        plt.switch_backend("Agg")
+
+    plt.figure(figsize=(12, 8))
+    for ativo, precos in zip(ativos, historico_precos):
+        plt.plot(np.arange(len(precos)), precos, label=ativo)
+    plt.xlabel("Rodadas")
+    plt.ylabel("Preços")
+    plt.title("Evolução dos Preços dos Ativos")
+    plt.legend()
+    plt.grid(True)
+    if arquivo is not None:
+        plt.savefig(arquivo)
+        plt.close()
+    else:
+        plt.show()
 
 
 # Função Principal
-def main() -> None:
+def main(
+    imprimir_a_cada: int = 1,
+    seed: Optional[int] = None,
+    arquivo_grafico: Optional[str] = None,
+) -> None:
     """
-    Executa a simulação.
+    Executa a simulação. As mensagens vão para o log em nível DEBUG, com o
+    resumo a cada `imprimir_a_cada` rodadas; com `arquivo_grafico`, salva o
+    gráfico em vez de exibi-lo.
     """
     num_agentes = 10
     num_rodadas = 20
 
     # Inicializa o mercado e o livro de ordens
     mercado = Mercado(ativos={"PETR4": 50.0, "VALE3": 45.0})
-    order_book = OrderBook()
+    rng = np.random.default_rng(seed)
 
-    # Cria os agentes
+    # Carteiras de todos os agentes (linha = agente, coluna = id do ativo, na
+    # ordem de mercado.ativos); cada agente guarda uma visão da sua linha
+    carteiras = rng.integers(0, 51, (num_agentes, len(mercado.ativos)), dtype=np.int32)
+
+    # Cria os agentes, com os perfis sorteados em lote do mesmo gerador
+    saldos = rng.uniform(1000, 5000, num_agentes).tolist()
+    sentimentos = rng.choice(["positivo", "negativo", "neutro"], num_agentes).tolist()
+    conhecimentos = rng.choice(["alto", "médio", "baixo"], num_agentes).tolist()
     agentes = [
         Agente(
             nome=f"Agente {i+1}",
-            saldo=random.uniform(1000, 5000),
-            carteira={"PETR4": random.randint(0, 50), "VALE3": random.randint(0, 50)},
-            sentimento=random.choice(["positivo", "negativo", "neutro"]),
+            saldo=saldos[i],
+            carteira=carteiras[i],
+            sentimento=sentimentos[i],
             expectativa=[40.0, 50.0, 60.0],
-            conhecimento=random.choice(["alto", "médio", "baixo"]),
+            conhecimento=conhecimentos[i],
+            indice=i,
         )
         for i in range(num_agentes)
     ]
+    order_book = OrderBook()
 
-    historico_precos = {ativo: [] for ativo in mercado.ativos.keys()}
-
-    for rodada in range(num_rodadas):
-        print(f"\n--- Rodada {rodada + 1} ---")
-
-        # Processa decisões dos agentes
-        for agente in agentes:
-            agente.tomar_decisao(mercado, order_book)
-
-        # Executa as ordens no livro de ordens
-        for ativo in mercado.ativos.keys():
-            order_book.executar_ordens(ativo, mercado)
-            historico_precos[ativo].append(mercado.ativos[ativo])
-
-        # Resumo da rodada
-        print("\nResumo após a rodada:")
-        for agente in agentes:
-            print(
-                f"Agente: {agente.nome} | Caixa: {agente.saldo:.2f} | "
-                f"Carteira: {agente.carteira} | Sentimento: {agente.sentimento} | "
-                f"Expectativa: {agente.expectativa} | Conhecimento: {agente.conhecimento}"
-            )
-
-        # Exibe o preço atualizado de cada ativo
-        for ativo, preco in mercado.ativos.items():
-            print(f"Ativo: {ativo} | Preço Atual: {preco:.2f}")
+    # Linha = id do ativo, coluna = rodada
+    historico_precos = np.empty((len(mercado.ativos), num_rodadas))
+
+    # Os livros de cada ativo são casados em paralelo, um por thread
+    with ThreadPoolExecutor(max_workers=len(mercado.ativos)) as executor:
+        for rodada in range(num_rodadas):
+            depurar = log.isEnabledFor(logging.DEBUG)
+            if depurar:
+                log.debug(f"\n--- Rodada {rodada + 1} ---")
+
+            # Processa decisões dos agentes
+            gerar_ordens(agentes, mercado, order_book, carteiras, rng)
+
+            # Executa as ordens no livro de ordens
+            executar_ordens(order_book, mercado, agentes, executor)
+            historico_precos[:, rodada] = list(mercado.ativos.values())
+
+            # Resumo da rodada, registrado como uma única mensagem
+            if depurar and (rodada + 1) % imprimir_a_cada == 0:
+                linhas = ["\nResumo após a rodada:"]
+                linhas.extend(
+                    f"Agente: {agente.nome} | Caixa: {agente.saldo:.2f} | "
+                    f"Carteira: {dict(zip(mercado.ativos, agente.carteira.tolist()))} | "
+                    f"Sentimento: {agente.sentimento} | "
+                    f"Expectativa: {agente.expectativa} | Conhecimento: {agente.conhecimento}"
+                    for agente in agentes
+                )
+                # Preço atualizado de cada ativo
+                linhas.extend(
+                    f"Ativo: {ativo} | Preço Atual: {preco:.2f}"
+                    for ativo, preco in mercado.ativos.items()
+                )
+                log.debug("\n".join(linhas))
 
     # Gráficos
-    plt.figure(figsize=(12, 8))
-    for ativo, precos in historico_precos.items():
-        plt.plot(range(num_rodadas), precos, label=ativo)
-    plt.xlabel("Rodadas")
-    plt.ylabel("Preços")
-    plt.title("Evolução dos Preços dos Ativos")
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+    plotar_precos(list(mercado.ativos), historico_precos, arquivo_grafico)
 
 
 if __name__ == "__main__":
+    # Exibe as mensagens da simulação no stdout
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    log.setLevel(logging.DEBUG)
     main()
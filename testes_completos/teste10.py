@@ -1,13 +1,28 @@
-import random
-import math
-import matplotlib.pyplot as plt
+import logging
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
 
+from livro_ordens import OrderBook
+from vetorizacao import (
+    NUMBA_DISPONIVEL,
+    media_vizinhos,
+    njit,
+    prange,
+    sortear_vizinhos,
+    variacao_patrimonio,
+)
 
-@dataclass
+log = logging.getLogger(__name__)
+
+# Código de cada nível de conhecimento no vetor `PoolAgentes.conhecimento`
+NIVEIS_CONHECIMENTO = {"alto": 0, "médio": 1, "baixo": 2}
+
+
+@dataclass(slots=True)
 class Ativo:
     nome: str
     preco_atual: float
@@ -18,109 +33,67 @@ class Ativo:
         self.preco_atual = novo_preco
 
 
-@dataclass
-class FundoImobiliario:
-    nome: str
-    preco_cota: float
-    historico_precos: List[float] = field(default_factory=list)
-    rendimento_mensal: float = (
-        0.05  # Percentual fixo do rendimento mensal, por exemplo, 5%
-    )
-
-    def atualizar_preco(self, novo_preco: float) -> None:
-        self.historico_precos.append(self.preco_cota)
-        self.preco_cota = novo_preco
-
-    def calcular_dividendos(self, num_cotas: int) -> float:
-        return num_cotas * self.preco_cota * self.rendimento_mensal
-
-
-@dataclass
-class Ordem:
-    tipo: str
-    agente: "Agente"
-    ativo: str
-    preco_limite: float
-    quantidade: int
+@njit(parallel=True, cache=True)
+def decidir_ordens(
+    preco_mercado: float,
+    l_privada: np.ndarray,
+    l_social: np.ndarray,
+    news: np.ndarray,
+    choque_preco: np.ndarray,
+    literacia: np.ndarray,
+    especulador: np.ndarray,
+    ruido: np.ndarray,
+    expectativa_inflacao: np.ndarray,
+    volatilidade: np.ndarray,
+    sentimento: np.ndarray,
+):
+    """
+    Kernel da decisão de todos os agentes para um ativo, paralelo sobre os
+    agentes: atualiza `sentimento` no lugar e retorna a máscara de compra,
+    os preços limite e as quantidades. Equivale a `PoolAgentes.gerar_ordens`
+    no caminho vetorizado.
+    """
+    num_agentes = len(literacia)
+    compra = np.empty(num_agentes, dtype=np.bool_)
+    precos = np.empty(num_agentes)
+    quantidades = np.empty(num_agentes, dtype=np.int64)
+    for i in prange(num_agentes):
+        s = 0.2 * l_privada[i] + 0.3 * l_social[i] + 0.05 * news[i]
+        s = min(max(s, -1.0), 1.0)
+        sentimento[i] = s
+        compra[i] = s > 0
+
+        # Traços float32 convertidos para float64 antes das contas: o JIT já
+        # promove, e assim o kernel interpretado (NUMBA_DISABLE_JIT) dá o mesmo
+        # resultado em vez de fazer a aritmética em float32
+        lit = float(literacia[i])
+        esp = float(especulador[i])
+        rui = float(ruido[i])
+        confianca = max(0.5, lit - rui)
+        preco_ajustado = preco_mercado * (
+            1 + float(expectativa_inflacao[i]) * confianca
+        )
+        ajuste = (s + lit * 0.1 - esp * 0.15) / 10
+        precos[i] = preco_ajustado * np.exp(ajuste) + choque_preco[i] * rui
 
+        vol = float(volatilidade[i])
+        risco = (s + 1) * vol / (2 + lit) + esp * 0.2
+        risco -= rui * 0.1
+        razao = np.trunc(risco / vol) if vol > 0 else 0.0
+        quantidades[i] = max(1, int(razao))
+    return compra, precos, quantidades
 
-@dataclass
-class Transacao:
-    comprador: "Agente"
-    vendedor: "Agente"
-    ativo: str
-    quantidade: int
-    preco_execucao: float
 
-    def executar(self):
-        valor_total = self.quantidade * self.preco_execucao
-        self.comprador.saldo -= valor_total
-        self.vendedor.saldo += valor_total
+@dataclass(slots=True)
+class Agente:
+    """
+    Representa um agente participante do mercado.
 
-        # Atualiza a carteira do comprador
-        self.comprador.carteira[self.ativo] = (
-            self.comprador.carteira.get(self.ativo, 0) + self.quantidade
-        )
+    Durante a simulação o saldo, a carteira e o estado de decisão do agente
+    vivem nos vetores do `PoolAgentes`; os atributos abaixo guardam o estado
+    inicial e são sincronizados ao final da simulação.
+    """
 
-        # Atualiza a carteira do vendedor
-        if self.ativo in self.vendedor.carteira:
-            self.vendedor.carteira[self.ativo] -= self.quantidade
-            if self.vendedor.carteira[self.ativo] == 0:
-                del self.vendedor.carteira[self.ativo]
-
-
-@dataclass
-class OrderBook:
-    ordens_compra: Dict[str, List[Ordem]] = field(default_factory=dict)
-    ordens_venda: Dict[str, List[Ordem]] = field(default_factory=dict)
-
-    def adicionar_ordem(self, ordem: Ordem):
-        if ordem.tipo == "compra":
-            self.ordens_compra.setdefault(ordem.ativo, []).append(ordem)
-        elif ordem.tipo == "venda":
-            self.ordens_venda.setdefault(ordem.ativo, []).append(ordem)
-
-    def executar_ordens(self, ativo, mercado):
-        if ativo in self.ordens_compra and ativo in self.ordens_venda:
-            self.ordens_compra[ativo].sort(key=lambda x: x.preco_limite, reverse=True)
-            self.ordens_venda[ativo].sort(key=lambda x: x.preco_limite)
-
-            while self.ordens_compra[ativo] and self.ordens_venda[ativo]:
-                ordem_compra = self.ordens_compra[ativo][0]
-                ordem_venda = self.ordens_venda[ativo][0]
-
-                if ordem_compra.preco_limite >= ordem_venda.preco_limite:
-                    preco_execucao = (
-                        ordem_compra.preco_limite + ordem_venda.preco_limite
-                    ) / 2
-                    quantidade_exec = min(
-                        ordem_compra.quantidade, ordem_venda.quantidade
-                    )
-
-                    transacao = Transacao(
-                        comprador=ordem_compra.agente,
-                        vendedor=ordem_venda.agente,
-                        ativo=ativo,
-                        quantidade=quantidade_exec,
-                        preco_execucao=preco_execucao,
-                    )
-                    transacao.executar()
-
-                    mercado.ativos[ativo] = preco_execucao
-
-                    ordem_compra.quantidade -= quantidade_exec
-                    ordem_venda.quantidade -= quantidade_exec
-
-                    if ordem_compra.quantidade == 0:
-                        self.ordens_compra[ativo].pop(0)
-                    if ordem_venda.quantidade == 0:
-                        self.ordens_venda[ativo].pop(0)
-                else:
-                    break
-
-
-@dataclass
-class Agente:
     nome: str
     saldo: float
     carteira: Dict[str, int]
@@ -135,141 +108,221 @@ class Agente:
     )
     comportamento_ruido: float  # Entre 0 e 1, maior valor indica maior impacto de ruído
     expectativa_inflacao: float  # Expectativa do agente em relação à inflação
+    tau: int  # Tempo observado, sorteado pelo gerador da simulação
     patrimonio: List[float] = field(default_factory=list)
-    tau: int = field(init=False)
+    indice: int = 0  # Posição do agente na lista de agentes da simulação
     volatilidade_percebida: float = field(default=0.0, init=False)
 
-    def __post_init__(self):
-        self.tau = random.randint(22, 252)  # Sorteio do tempo observado.
-
-    def calcular_volatilidade_percebida(self, historico_precos: List[float]):
-        if len(historico_precos) >= self.tau:
-            retornos = [
-                math.log(historico_precos[i] / historico_precos[i - 1])
-                for i in range(1, self.tau)
-            ]
-            self.volatilidade_percebida = np.std(retornos)
-        else:
-            self.volatilidade_percebida = 0.0
-
-    def calcular_risco_desejado(self) -> float:
-        risco_base = (
-            (self.sentimento + 1)
-            * self.volatilidade_percebida
-            / (2 + self.literacia_financeira)
-        )
-        fator_especulacao = self.comportamento_especulador * 0.2
-        fator_ruido = self.comportamento_ruido * 0.1
-        return risco_base + fator_especulacao - fator_ruido
-
-    def ajustar_preco_por_inflacao(self, preco: float) -> float:
-        confianca = max(0.5, self.literacia_financeira - self.comportamento_ruido)
-        return preco * (1 + self.expectativa_inflacao * confianca)
-
-    def calcular_quantidade_baseada_em_risco(self, risco_desejado: float) -> float:
-        if self.volatilidade_percebida > 0:
-            return risco_desejado / self.volatilidade_percebida
-        return 0.0
-
-    def tomar_decisao(self, mercado, order_book):
-        for ativo, preco in mercado.ativos.items():
-            self.calcular_volatilidade_percebida(mercado.historico_precos[ativo])
-            risco_desejado = self.calcular_risco_desejado()
-
-            # Ajusta a decisão com base na expectativa de inflação
-            if self.expectativa_inflacao > 0.03:  # Exemplo: inflação > 3% ao mês
-                print(
-                    f"[DECISÃO] {self.nome} hesitou devido à alta inflação ({self.expectativa_inflacao:.2%})"
-                )
-                continue  # Pula a decisão para ativos específicos
 
-            quantidade = max(
-                1, int(self.calcular_quantidade_baseada_em_risco(risco_desejado))
-            )
-            prob_compra = random.uniform(0, 1)
+@dataclass(slots=True)
+class PoolAgentes:
+    """
+    Estado de todos os agentes como estrutura de vetores (SoA): a posição i
+    de cada vetor corresponde a `agentes[i]`, e as decisões de uma rodada são
+    calculadas com expressões vetorizadas sobre todos os agentes. A coluna k
+    de `carteiras` guarda as cotas do papel `papeis[k]`.
 
-            if prob_compra > 0.5:  # Compra
-                preco_limite = preco * random.uniform(
-                    0.9, 1.1 + self.comportamento_especulador * 0.1
-                )
-                ordem = Ordem("compra", self, ativo, preco_limite, quantidade)
-            else:  # Venda
-                quantidade = random.randint(1, self.carteira.get(ativo, 0))
-                preco_limite = preco * random.uniform(
-                    0.9, 1.1 + self.comportamento_especulador * 0.1
-                )
-                ordem = Ordem("venda", self, ativo, preco_limite, quantidade)
-            order_book.adicionar_ordem(ordem)
-
-    def calcula_l_privada(self) -> float:
-        if len(self.patrimonio) > 22:
-            patrimonio_t = self.patrimonio[-1]
-            patrimonio_t_22 = self.patrimonio[-22]
-            return (patrimonio_t / patrimonio_t_22) - 1
-        return 0.0
-
-    def calcula_l_social(self) -> float:
-        if self.vizinhos:
-            return sum(vizinho.calcula_l_privada() for vizinho in self.vizinhos) / len(
-                self.vizinhos
-            )
-        return 0.0
+    Os traços de comportamento usam float32 e os contadores int32; saldo e
+    valores monetários continuam em float64.
+    """
 
-    def sorteia_news(self) -> float:
-        return random.gauss(0, 1)
+    agentes: List[Agente]
+    papeis: List[str]
+    max_vizinhos: int = 3
+    usar_numba: bool = NUMBA_DISPONIVEL
+    saldo: np.ndarray = field(init=False)
+    carteiras: np.ndarray = field(init=False)
+    sentimento: np.ndarray = field(init=False)
+    literacia: np.ndarray = field(init=False)
+    especulador: np.ndarray = field(init=False)
+    ruido: np.ndarray = field(init=False)
+    expectativa_inflacao: np.ndarray = field(init=False)
+    tau: np.ndarray = field(init=False)
+    conhecimento: np.ndarray = field(init=False)
+    volatilidade_percebida: np.ndarray = field(init=False)
+    vizinhos: np.ndarray = field(init=False)
 
-    def atualiza_sentimento(self) -> None:
-        l_privada = self.calcula_l_privada()
-        l_social = self.calcula_l_social()
-        news = self.sorteia_news()
-        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
-        self.sentimento = max(-1, min(1, sentimento_bruto))
+    def __post_init__(self):
+        def coluna(atributo: str, dtype=np.float32) -> np.ndarray:
+            return np.array([getattr(a, atributo) for a in self.agentes], dtype=dtype)
+
+        self.saldo = coluna("saldo", np.float64)
+        self.carteiras = np.array(
+            [[a.carteira.get(papel, 0) for papel in self.papeis] for a in self.agentes],
+            dtype=np.int32,
+        ).reshape(len(self.agentes), len(self.papeis))
+        self.sentimento = coluna("sentimento")
+        self.literacia = coluna("literacia_financeira")
+        self.especulador = coluna("comportamento_especulador")
+        self.ruido = coluna("comportamento_ruido")
+        self.expectativa_inflacao = coluna("expectativa_inflacao")
+        self.tau = coluna("tau", np.int32)
+        self.conhecimento = np.array(
+            [NIVEIS_CONHECIMENTO[a.conhecimento] for a in self.agentes],
+            dtype=np.uint8,
+        )
+        self.volatilidade_percebida = np.zeros(len(self.agentes), dtype=np.float32)
+        self.vizinhos = np.empty(
+            (len(self.agentes), min(len(self.agentes), self.max_vizinhos)),
+            dtype=np.int64,
+        )
 
-    def calcula_preco_expectativa(self, preco_mercado: float) -> float:
-        ajuste_literacia = self.literacia_financeira * 0.1
-        ajuste_comportamento = self.comportamento_especulador * 0.15
-        return preco_mercado * math.exp(
+    def atualiza_vizinhos(self, rng: np.random.Generator) -> None:
+        """
+        Sorteia, para cada agente, os índices de seus vizinhos, sem repetição.
+        """
+        sortear_vizinhos(self.vizinhos, rng)
+
+    def calcular_volatilidade_percebida(self, retornos_log: np.ndarray) -> np.ndarray:
+        """
+        Desvio padrão dos log-retornos dos últimos `tau` preços observados por
+        cada agente (zero para quem ainda não tem `tau` observações).
+        `retornos_log` é calculado uma vez por ativo e rodada e compartilhado
+        entre os agentes (ver `calcular_retornos_log`).
+
+        Como cada agente usa uma janela diferente, as somas de cada janela
+        saem de somas acumuladas dos retornos e de seus quadrados.
+        """
+        n = len(retornos_log)
+        janela = self.tau - 1
+        observou = janela <= n
+        soma = np.concatenate(([0.0], np.cumsum(retornos_log)))
+        soma_quadrados = np.concatenate(([0.0], np.cumsum(retornos_log**2)))
+        inicio = np.where(observou, n - janela, n)
+        janela = np.where(observou, janela, 1)
+        media = (soma[n] - soma[inicio]) / janela
+        variancia = (soma_quadrados[n] - soma_quadrados[inicio]) / janela - media**2
+        self.volatilidade_percebida[:] = np.where(
+            observou, np.sqrt(np.maximum(variancia, 0.0)), 0.0
+        )
+        return self.volatilidade_percebida
+
+    def calcula_l_privada(
+        self, historico_patrimonios: np.ndarray, rodada: int
+    ) -> np.ndarray:
+        """
+        Variação do patrimônio de cada agente em 22 períodos, a partir das
+        rodadas anteriores a `rodada` (zero enquanto não há 22 períodos).
+        """
+        return variacao_patrimonio(historico_patrimonios, rodada - 1)
+
+    def calcula_l_social(self, l_privada: np.ndarray) -> np.ndarray:
+        """
+        Média do l_privada dos vizinhos de cada agente.
+        """
+        return media_vizinhos(l_privada, self.vizinhos)
+
+    def calcular_risco_desejado(self) -> np.ndarray:
+        risco_base = (
+            (self.sentimento + 1) * self.volatilidade_percebida / (2 + self.literacia)
+        )
+        return risco_base + self.especulador * 0.2 - self.ruido * 0.1
+
+    def ajustar_preco_por_inflacao(self, preco: float) -> np.ndarray:
+        confianca = np.maximum(0.5, self.literacia - self.ruido)
+        # O preço fica em float64 mesmo com os traços em float32
+        return np.float64(preco) * (1 + self.expectativa_inflacao * confianca)
+
+    def calcular_quantidade_baseada_em_risco(
+        self, risco_desejado: np.ndarray
+    ) -> np.ndarray:
+        vol = self.volatilidade_percebida
+        # Quantidade = risco / volatilidade (zero sem volatilidade), no mínimo 1
+        razao = np.divide(risco_desejado, vol, out=np.zeros_like(vol), where=vol > 0)
+        return np.maximum(1, np.trunc(razao)).astype(np.int64)
+
+    def calcula_preco_expectativa(self, preco_mercado: np.ndarray) -> np.ndarray:
+        ajuste_literacia = self.literacia * 0.1
+        ajuste_comportamento = self.especulador * 0.15
+        return preco_mercado * np.exp(
             (self.sentimento + ajuste_literacia - ajuste_comportamento) / 10
         )
 
-    def gerar_ordem(self, ativo: str, preco_mercado: float) -> Ordem:
-        self.atualiza_sentimento()
+    def gerar_ordens(
+        self,
+        preco_mercado: float,
+        l_privada: np.ndarray,
+        l_social: np.ndarray,
+        news: np.ndarray,
+        choque_preco: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gera a ordem de cada agente para um ativo, com base no sentimento, na
+        inflação esperada e no risco desejado. `volatilidade_percebida` deve
+        estar calculada para o ativo; `news` e `choque_preco` são sorteios
+        normais padrão, um por agente. Com `usar_numba`, roda no kernel
+        paralelo `decidir_ordens`.
+
+        :return: Máscara de compra, preços limite e quantidades, por agente.
+        """
+        if self.usar_numba:
+            return decidir_ordens(
+                preco_mercado,
+                l_privada,
+                l_social,
+                news,
+                choque_preco,
+                self.literacia,
+                self.especulador,
+                self.ruido,
+                self.expectativa_inflacao,
+                self.volatilidade_percebida,
+                self.sentimento,
+            )
+
+        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
+        np.clip(sentimento_bruto, -1, 1, out=self.sentimento)
+
         preco_ajustado = self.ajustar_preco_por_inflacao(preco_mercado)
         preco_expectativa = self.calcula_preco_expectativa(preco_ajustado)
-        preco_expectativa += random.gauss(0, self.comportamento_ruido)
-        quantidade = max(
-            1,
-            int(
-                self.calcular_quantidade_baseada_em_risco(
-                    self.calcular_risco_desejado()
-                )
-            ),
+        preco_expectativa += choque_preco * self.ruido
+        quantidade = self.calcular_quantidade_baseada_em_risco(
+            self.calcular_risco_desejado()
         )
-        tipo_ordem = "compra" if self.sentimento > 0 else "venda"
-        return Ordem(tipo_ordem, self, ativo, preco_expectativa, quantidade)
+        return self.sentimento > 0, preco_expectativa, quantidade
 
-    def atualiza_vizinhos(self, agentes: List["Agente"], max_vizinhos: int = 3) -> None:
-        self.vizinhos = random.sample(agentes, min(len(agentes), max_vizinhos))
-
-    def atualiza_patrimonio(
+    def liquidar(
         self,
-        precos_mercado: Dict[str, float],
-        fundos_imobiliarios: Dict[str, FundoImobiliario],
+        papel: int,
+        compradores: np.ndarray,
+        vendedores: np.ndarray,
+        quantidades: np.ndarray,
+        precos: np.ndarray,
     ) -> None:
-        valor_ativos = sum(
-            precos_mercado.get(ativo, 0) * quantidade
-            for ativo, quantidade in self.carteira.items()
-        )
-        valor_fundos = sum(
-            fundo.preco_cota * quantidade
-            for fundo_nome, fundo in fundos_imobiliarios.items()
-            for ativo, quantidade in self.carteira.items()
-            if fundo_nome == ativo
-        )
-        self.patrimonio.append(self.saldo + valor_ativos + valor_fundos)
-
-
-@dataclass
+        """
+        Aplica de uma vez os negócios de um papel aos saldos e às carteiras.
+        `np.add.at` acumula os índices repetidos (um agente com vários negócios).
+        """
+        valores = quantidades * precos
+        np.add.at(self.saldo, compradores, -valores)
+        np.add.at(self.saldo, vendedores, valores)
+        cotas = self.carteiras[:, papel]
+        np.add.at(cotas, compradores, quantidades)
+        np.add.at(cotas, vendedores, -quantidades)
+
+    def carteira(self, i: int) -> Dict[str, int]:
+        """
+        Carteira do agente i como dicionário, só com os papéis em posse.
+        """
+        return {
+            papel: quantidade
+            for papel, quantidade in zip(self.papeis, self.carteiras[i].tolist())
+            if quantidade
+        }
+
+    def sincroniza_agentes(self, historico_patrimonios: np.ndarray) -> None:
+        """
+        Copia o estado final dos vetores para os objetos `Agente`.
+        """
+        for i, agente in enumerate(self.agentes):
+            agente.saldo = float(self.saldo[i])
+            agente.carteira = self.carteira(i)
+            agente.patrimonio = historico_patrimonios[i].tolist()
+            agente.sentimento = float(self.sentimento[i])
+            agente.volatilidade_percebida = float(self.volatilidade_percebida[i])
+
+
+@dataclass(slots=True)
 class FundoImobiliario:
     nome: str
     preco_cota: float
@@ -284,29 +337,66 @@ class FundoImobiliario:
         return num_cotas * self.preco_cota * self.rendimento_mensal
 
 
-@dataclass
+@dataclass(slots=True)
 class Mercado:
+    """
+    Mercado com ativos tradicionais e fundos imobiliários.
+
+    Durante a simulação os preços de todos os papéis vivem num único vetor
+    `precos`, indexado por `indices` (ativos primeiro, depois os fundos);
+    `ativos` e `FundoImobiliario.preco_cota` são atualizados a partir dele
+    em `sincroniza_precos`.
+    """
+
     ativos: Dict[str, float]
     fundos_imobiliarios: Dict[str, FundoImobiliario] = field(default_factory=dict)
     historico_inflacao: List[float] = field(default_factory=list)
+    nomes: List[str] = field(init=False)
+    indices: Dict[str, int] = field(init=False)
+    precos: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.nomes = [*self.ativos, *self.fundos_imobiliarios]
+        self.indices = {nome: i for i, nome in enumerate(self.nomes)}
+        self.precos = np.array(
+            [
+                *self.ativos.values(),
+                *(fii.preco_cota for fii in self.fundos_imobiliarios.values()),
+            ],
+            dtype=np.float64,
+        )
+
+    def __getitem__(self, nome: str) -> float:
+        return float(self.precos[self.indices[nome]])
+
+    def __setitem__(self, nome: str, preco: float) -> None:
+        self.precos[self.indices[nome]] = preco
+
+    def sincroniza_precos(self) -> None:
+        """
+        Copia os preços do vetor para `ativos` e para as cotas dos fundos.
+        """
+        num_ativos = len(self.ativos)
+        for nome, preco in zip(self.nomes[:num_ativos], self.precos.tolist()):
+            self.ativos[nome] = preco
+        for fii, preco in zip(
+            self.fundos_imobiliarios.values(), self.precos[num_ativos:].tolist()
+        ):
+            fii.preco_cota = preco
 
     def registrar_inflacao(self, taxa_inflacao):
         self.historico_inflacao.append(taxa_inflacao)
-        print(f"[MERCADO] Registrada inflação de {taxa_inflacao:.4%} na rodada.")
-
-    def pagar_dividendos(self, agentes: List["Agente"]) -> None:
-        for fundo in self.fundos_imobiliarios.values():
-            for agente in agentes:
-                num_cotas = agente.carteira.get(fundo.nome, 0)
-                if num_cotas > 0:
-                    dividendos = fundo.calcular_dividendos(num_cotas)
-                    agente.caixa += dividendos
-                    print(
-                        f"[DIVIDENDOS] {agente.nome} recebeu {dividendos:.2f} de dividendos do fundo {fundo.nome}."
-                    )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                f"[MERCADO] Registrada inflação de {taxa_inflacao:.4%} na rodada."
+            )
 
 
-def main() -> None:
+def main(
+    seed: Optional[int] = None,
+    reconectar_a_cada: int = 22,
+    arquivo_grafico: Optional[str] = None,
+) -> None:
     """
     Função principal que executa a simulação do mercado financeiro.
 
@@ -324,11 +414,12 @@ def main() -> None:
         5. Atualização do patrimônio dos agentes.
         6. Cálculo do valor total do mercado em cada rodada.
         7. Pagamento de dividendos em intervalos definidos.
-        8. Normalização dos históricos para consistência.
-        9. Geração de gráficos para análise dos resultados.
+        8. Geração de gráficos para análise dos resultados.
 
     Parâmetros:
-        Nenhum.
+        seed: Semente do gerador de números aleatórios da simulação.
+        reconectar_a_cada: Intervalo, em rodadas, entre os sorteios da rede de vizinhos.
+        arquivo_grafico: Se informado, salva os gráficos nesse arquivo em vez de exibi-los.
 
     Retorno:
         None
@@ -344,75 +435,110 @@ def main() -> None:
             "FII_B": FundoImobiliario(nome="FII_B", preco_cota=150.0),
         },
     )
-    order_book = OrderBook()
+
+    # Fluxo único de números aleatórios, sorteados em lote
+    rng = np.random.default_rng(seed)
+    saldos = rng.uniform(1000, 5000, num_agentes).tolist()
+    carteiras = rng.integers(0, 50, size=(num_agentes, 2), endpoint=True).tolist()
+    sentimentos = rng.uniform(-1, 1, num_agentes).tolist()
+    conhecimentos = rng.choice(["alto", "médio", "baixo"], num_agentes).tolist()
+    # Colunas: literacia financeira, comportamento especulador e de ruído
+    perfis = rng.random((num_agentes, 3)).tolist()
+    expectativas_inflacao = rng.uniform(-0.02, 0.05, num_agentes).tolist()
+    taus = rng.integers(22, 252, num_agentes, endpoint=True).tolist()
 
     agentes = [
         Agente(
             nome=f"Agente {i+1}",
-            saldo=random.uniform(1000, 5000),
-            carteira={"PETR4": random.randint(0, 50), "VALE3": random.randint(0, 50)},
-            sentimento=random.uniform(-1, 1),
+            saldo=saldos[i],
+            carteira={"PETR4": carteiras[i][0], "VALE3": carteiras[i][1]},
+            sentimento=sentimentos[i],
             expectativa=[40.0, 50.0, 60.0],
-            conhecimento=random.choice(["alto", "médio", "baixo"]),
-            literacia_financeira=random.uniform(0, 1),
-            comportamento_especulador=random.uniform(0, 1),
-            comportamento_ruido=random.uniform(0, 1),
-            expectativa_inflacao=random.uniform(-0.02, 0.05),
+            conhecimento=conhecimentos[i],
+            literacia_financeira=perfis[i][0],
+            comportamento_especulador=perfis[i][1],
+            comportamento_ruido=perfis[i][2],
+            expectativa_inflacao=expectativas_inflacao[i],
+            indice=i,
+            tau=taus[i],
         )
         for i in range(num_agentes)
     ]
 
-    historico_precos = {ativo: [] for ativo in mercado.ativos.keys()}
-    historico_precos.update(
-        {fii.nome: [] for fii in mercado.fundos_imobiliarios.values()}
-    )
-    historico_patrimonios = {agente.nome: [] for agente in agentes}
-    historico_valor_mercado = []  # Novo histórico para o valor total do mercado
-
-    for rodada in range(num_rodadas):
-        print(f"\n--- RODADA {rodada + 1} ---")
-
-        # Definir a inflação para a rodada
-        taxa_inflacao_mensal = random.gauss(
-            0.005, 0.002
-        )  # Média de 0.5% ao mês com desvio padrão de 0.2%
-        mercado.registrar_inflacao(taxa_inflacao_mensal)
-        aplicar_inflacao(mercado, taxa_inflacao_mensal)
-
-        # Atualiza vizinhos e gera ordens
-        for agente in agentes:
-            agente.atualiza_vizinhos(agentes)
-            gerar_e_adicionar_ordens(agente, mercado, order_book)
+    order_book = OrderBook()
+    pool = PoolAgentes(agentes, mercado.nomes)
+
+    # Inflação mensal de cada rodada: média de 0.5% com desvio padrão de 0.2%
+    taxas_inflacao = rng.normal(0.005, 0.002, num_rodadas)
+    # Taxa diária equivalente de cada rodada, (1 + m) ** (1 / 30) - 1, calculada
+    # de uma vez; expm1/log1p não perdem precisão com taxas pequenas
+    taxas_diarias = np.expm1(np.log1p(taxas_inflacao) / 30).tolist()
+    taxas_inflacao = taxas_inflacao.tolist()
+
+    # Históricos preenchidos por índice: coluna t = valores na rodada t, uma
+    # linha por papel (na ordem de `mercado.nomes`) ou por agente
+    historico_precos = np.empty((len(mercado.nomes), num_rodadas))
+    historico_patrimonios = np.empty((num_agentes, num_rodadas))
+    historico_valor_mercado = np.empty(num_rodadas)
+
+    # Os livros de cada papel são casados em paralelo, um por thread
+    with ThreadPoolExecutor(max_workers=len(mercado.nomes)) as executor:
+        for rodada in range(num_rodadas):
+            log.debug("\n--- RODADA %d ---", rodada + 1)
+
+            # Definir a inflação para a rodada
+            taxa_inflacao_mensal = taxas_inflacao[rodada]
+            mercado.registrar_inflacao(taxa_inflacao_mensal)
+            aplicar_inflacao(mercado, taxa_inflacao_mensal, taxas_diarias[rodada])
+
+            # Log-retornos das rodadas anteriores, de todos os papéis de uma vez
+            retornos_log = calcular_retornos_log(historico_precos[:, :rodada])
+
+            # A rede de vizinhos muda só periodicamente; as ordens, a cada rodada
+            if rodada % reconectar_a_cada == 0:
+                pool.atualiza_vizinhos(rng)
+            l_privada = pool.calcula_l_privada(historico_patrimonios, rodada)
+            gerar_e_adicionar_ordens(
+                pool, mercado, order_book, retornos_log, l_privada, rng
+            )
 
-        # Executa ordens para ativos tradicionais e FIIs
-        executar_ordens_e_atualizar_precos(mercado, order_book, historico_precos)
+            # Executa ordens para ativos tradicionais e FIIs
+            executar_ordens_e_atualizar_precos(
+                mercado, order_book, pool, historico_precos, rodada, executor
+            )
+            mercado.sincroniza_precos()
 
-        # Atualiza patrimônio dos agentes
-        atualizar_patrimonio_agentes(agentes, mercado, historico_patrimonios, rodada)
+            # Atualiza patrimônio dos agentes
+            atualizar_patrimonio_agentes(pool, mercado, historico_patrimonios, rodada)
 
-        # Calcula o valor total do mercado
-        valor_total_mercado = calcular_valor_total_mercado(mercado, agentes)
-        historico_valor_mercado.append(valor_total_mercado)
+            # Calcula o valor total do mercado
+            historico_valor_mercado[rodada] = calcular_valor_total_mercado(
+                mercado, pool
+            )
 
-        # Pagamento de dividendos no dia 22
-        if (rodada + 1) % 22 == 0:
-            print(f"[DIVIDENDOS] Pagamento de dividendos no dia {rodada + 1}")
-            pagar_dividendos(mercado, agentes)
+            # Pagamento de dividendos no dia 22
+            if (rodada + 1) % 22 == 0:
+                log.debug("[DIVIDENDOS] Pagamento de dividendos no dia %d", rodada + 1)
+                pagar_dividendos(mercado, pool)
 
-    # Garante que todos os históricos estejam consistentes
-    normalizar_historicos(historico_precos, historico_patrimonios, num_rodadas)
+    pool.sincroniza_agentes(historico_patrimonios)
 
     # Cálculo de volatilidade e gráficos
     plotar_resultados(
+        mercado.nomes,
         historico_precos,
+        [agente.nome for agente in agentes],
         historico_patrimonios,
         historico_valor_mercado,
         num_rodadas,
         mercado.historico_inflacao,
+        arquivo_grafico,
     )
 
 
-def aplicar_inflacao(mercado: Mercado, taxa_inflacao_mensal: float) -> None:
+def aplicar_inflacao(
+    mercado: Mercado, taxa_inflacao_mensal: float, taxa_inflacao_diaria: float
+) -> None:
     """
     Aplica a taxa de inflação diária, derivada da taxa mensal, aos preços dos ativos e fundos imobiliários.
 
@@ -421,92 +547,124 @@ def aplicar_inflacao(mercado: Mercado, taxa_inflacao_mensal: float) -> None:
 
     :param mercado: Objeto do mercado contendo ativos e fundos imobiliários.
     :param taxa_inflacao_mensal: Taxa de inflação mensal (ex.: 0.005 para 0.5%).
+    :param taxa_inflacao_diaria: Taxa diária equivalente, (1 + mensal) ** (1 / 30) - 1.
     :return: None
     """
-    taxa_inflacao_diaria = (1 + taxa_inflacao_mensal) ** (1 / 30) - 1
-    print(
-        f"[INFLAÇÃO] Aplicando taxa mensal de {taxa_inflacao_mensal:.2%} "
-        f"(diária: {taxa_inflacao_diaria:.4%}) aos ativos."
-    )
-    for ativo in mercado.ativos.keys():
-        preco_anterior = mercado.ativos[ativo]
-        mercado.ativos[ativo] *= 1 + taxa_inflacao_diaria
-        print(f" - {ativo}: {preco_anterior:.2f} -> {mercado.ativos[ativo]:.2f}")
-
-    for fii in mercado.fundos_imobiliarios.values():
-        preco_anterior = fii.preco_cota
-        fii.preco_cota *= 1 + taxa_inflacao_diaria
-        print(f" - {fii.nome}: {preco_anterior:.2f} -> {fii.preco_cota:.2f}")
-
-    print(
-        f"[INFLAÇÃO] Taxa mensal: {taxa_inflacao_mensal * 100:.2f}%, "
-        f"Taxa diária aplicada: {taxa_inflacao_diaria * 100:.4f}%"
-    )
+    # Ativos e fundos corrigidos de uma vez no vetor de preços
+    mercado.precos *= 1 + taxa_inflacao_diaria
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            f"[INFLAÇÃO] Taxa mensal: {taxa_inflacao_mensal:.2%}, "
+            f"Taxa diária aplicada: {taxa_inflacao_diaria:.4%}"
+        )
+
+
+def calcular_retornos_log(precos: np.ndarray) -> np.ndarray:
+    """
+    Calcula os log-retornos de uma série de preços (ou de uma série por linha).
+
+    :param precos: Série de preços em ordem cronológica no último eixo.
+    :return: log(p[t] / p[t-1]), um elemento a menos que `precos` no último eixo.
+    """
+    return np.diff(np.log(precos))
 
 
 def gerar_e_adicionar_ordens(
-    agente: Agente, mercado: Mercado, order_book: OrderBook
+    pool: PoolAgentes,
+    mercado: Mercado,
+    order_book: OrderBook,
+    retornos_log: np.ndarray,
+    l_privada: np.ndarray,
+    rng: np.random.Generator,
 ) -> None:
     """
     Gera ordens de compra ou venda para os ativos e fundos imobiliários e as adiciona ao order book.
 
-    Esta função reflete as decisões de negociação de um agente em relação ao mercado,
-    levando em consideração os preços atuais e as expectativas do agente.
+    As decisões de todos os agentes para um ativo são calculadas de uma vez
+    pelo `PoolAgentes`, levando em consideração os preços atuais e as
+    expectativas de cada agente.
 
-    :param agente: O agente que está realizando as ordens.
+    :param pool: Estado de decisão dos agentes.
     :param mercado: Objeto do mercado com os preços dos ativos e fundos.
     :param order_book: O order book onde as ordens serão registradas.
+    :param retornos_log: Log-retornos de cada ativo e fundo (uma linha por papel), usados na volatilidade percebida.
+    :param l_privada: Variação recente do patrimônio de cada agente.
+    :param rng: Gerador de números aleatórios da simulação.
     :return: None
     """
+    depurar = log.isEnabledFor(logging.DEBUG)
+    l_social = pool.calcula_l_social(l_privada)
+    # Choques de notícia e de preço de todos os papéis sorteados de uma vez
+    news, choques_preco = rng.standard_normal(
+        (2, len(mercado.nomes), len(pool.agentes))
+    )
 
-    for ativo, preco in mercado.ativos.items():
-        ordem = agente.gerar_ordem(ativo, preco)
-        order_book.adicionar_ordem(ordem)
-        print(
-            f"[DECISÃO] {agente.nome} {ordem.tipo.upper()} {ordem.quantidade} de {ativo} "
-            f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
-        )
-    for fii_nome, fii in mercado.fundos_imobiliarios.items():
-        ordem = agente.gerar_ordem(fii_nome, fii.preco_cota)
-        order_book.adicionar_ordem(ordem)
-        print(
-            f"[DECISÃO] {agente.nome} {ordem.tipo.upper()} {ordem.quantidade} de {fii_nome} "
-            f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
+    for k, (ativo, preco) in enumerate(zip(mercado.nomes, mercado.precos.tolist())):
+        pool.calcular_volatilidade_percebida(retornos_log[k])
+        compra, precos_limite, quantidades = pool.gerar_ordens(
+            preco, l_privada, l_social, news[k], choques_preco[k]
         )
+        order_book.adicionar_lote(ativo, compra, precos_limite, quantidades)
+        if depurar:
+            for agente, eh_compra, preco_limite, quantidade in zip(
+                pool.agentes,
+                compra.tolist(),
+                precos_limite.tolist(),
+                quantidades.tolist(),
+            ):
+                log.debug(
+                    f"[DECISÃO] {agente.nome} {'COMPRA' if eh_compra else 'VENDA'} {quantidade} de {ativo} "
+                    f"por {'até' if eh_compra else 'pelo menos'} {preco_limite:.2f}"
+                )
 
 
 def executar_ordens_e_atualizar_precos(
-    mercado: Mercado, order_book: OrderBook, historico_precos: Dict[str, List[float]]
+    mercado: Mercado,
+    order_book: OrderBook,
+    pool: PoolAgentes,
+    historico_precos: np.ndarray,
+    rodada: int,
+    executor: Executor,
 ) -> None:
     """
     Executa as ordens no order book e atualiza os preços dos ativos e fundos imobiliários.
 
-    Esta função realiza a execução das ordens registradas, ajusta os preços dos ativos
-    e registra os preços atualizados no histórico.
+    Os livros de todos os papéis são casados em paralelo no `executor` (cada
+    casamento só altera o livro do próprio papel); depois que todos terminam,
+    os negócios de cada papel são liquidados de uma vez nos saldos e
+    carteiras, na ordem dos papéis, os preços vão para o último negócio e são
+    registrados no histórico.
 
     :param mercado: Objeto do mercado onde os preços serão atualizados.
     :param order_book: O order book com as ordens a serem executadas.
-    :param historico_precos: Dicionário para registrar os preços históricos de cada ativo.
+    :param pool: Saldos e carteiras dos agentes.
+    :param historico_precos: Matriz papéis x rodadas com os preços históricos.
+    :param rodada: Rodada atual, posição em que os preços são registrados.
+    :param executor: Executor onde os livros de cada papel são casados.
     :return: None
     """
 
-    for ativo in mercado.ativos.keys():
-        print(f"[EXECUTANDO ORDENS] Para o ativo {ativo}")
-        order_book.executar_ordens(ativo, mercado)
-        historico_precos[ativo].append(mercado.ativos[ativo])
-        print(f"[PREÇO ATUALIZADO] {ativo}: {mercado.ativos[ativo]:.2f}")
+    num_ativos = len(mercado.ativos)
+    execucoes = executor.map(order_book.executar_ordens, mercado.nomes)
 
-    for fii_nome, fii in mercado.fundos_imobiliarios.items():
-        print(f"[EXECUTANDO ORDENS] Para o fundo imobiliário {fii_nome}")
-        order_book.executar_ordens(fii_nome, mercado)
-        historico_precos[fii_nome].append(fii.preco_cota)
-        print(f"[PREÇO ATUALIZADO] {fii_nome}: {fii.preco_cota:.2f}")
+    # Ponto de sincronização: só aqui saldos, carteiras e preços são alterados
+    for k, (ativo, negocios) in enumerate(zip(mercado.nomes, execucoes)):
+        tipo = "ativo" if k < num_ativos else "fundo imobiliário"
+        log.debug("[EXECUTANDO ORDENS] Para o %s %s", tipo, ativo)
+        compradores, vendedores, quantidades, precos = negocios
+        if len(precos):
+            pool.liquidar(k, compradores, vendedores, quantidades, precos)
+            mercado.precos[k] = precos[-1]
+        log.debug("[PREÇO ATUALIZADO] %s: %.2f", ativo, mercado.precos[k])
+
+    historico_precos[:, rodada] = mercado.precos
 
 
 def atualizar_patrimonio_agentes(
-    agentes: List[Agente],
+    pool: PoolAgentes,
     mercado: Mercado,
-    historico_patrimonios: Dict[str, List[float]],
+    historico_patrimonios: np.ndarray,
     rodada: int,
 ) -> None:
     """
@@ -514,183 +672,154 @@ def atualizar_patrimonio_agentes(
 
     Registra o patrimônio atualizado no histórico de patrimônio de cada agente.
 
-    :param agentes: Lista de agentes cujos patrimônios serão atualizados.
+    :param pool: Saldos e carteiras dos agentes.
     :param mercado: Objeto do mercado com os preços atuais dos ativos e fundos.
-    :param historico_patrimonios: Dicionário que armazena o histórico de patrimônio de cada agente.
+    :param historico_patrimonios: Matriz agentes x rodadas com o histórico de patrimônio.
     :param rodada: Número da rodada atual da simulação.
     :return: None
     """
 
-    print(f"\n[RESUMO DA RODADA {rodada + 1}]")
-    for agente in agentes:
-        agente.atualiza_patrimonio(mercado.ativos, mercado.fundos_imobiliarios)
-        historico_patrimonios[agente.nome].append(agente.patrimonio[-1])
-        print(
-            f"{agente.nome}: Patrimônio: {agente.patrimonio[-1]:.2f} | Saldo: {agente.saldo:.2f} | "
-            f"Carteira: {agente.carteira}"
-        )
+    patrimonios = historico_patrimonios[:, rodada]
+    patrimonios[:] = pool.saldo + pool.carteiras @ mercado.precos
+
+    # Resumo da rodada numa única mensagem, montada só em nível DEBUG
+    if log.isEnabledFor(logging.DEBUG):
+        linhas = [f"\n[RESUMO DA RODADA {rodada + 1}]"]
+        for i, (agente, patrimonio, saldo) in enumerate(
+            zip(pool.agentes, patrimonios.tolist(), pool.saldo.tolist())
+        ):
+            linhas.append(
+                f"{agente.nome}: Patrimônio: {patrimonio:.2f} | Saldo: {saldo:.2f} | "
+                f"Carteira: {pool.carteira(i)}"
+            )
+        log.debug("\n".join(linhas))
 
 
-def calcular_valor_total_mercado(mercado: Mercado, agentes: List[Agente]) -> float:
+def calcular_valor_total_mercado(mercado: Mercado, pool: PoolAgentes) -> float:
     """
     Calcula o valor total do mercado com base nos ativos e fundos imobiliários possuídos pelos agentes.
 
     :param mercado: Objeto do mercado contendo os preços dos ativos e fundos.
-    :param agentes: Lista de agentes com suas carteiras de ativos e fundos.
+    :param pool: Carteiras dos agentes, uma coluna por papel.
     :return: Valor total do mercado.
     """
-    valor_total_mercado = sum(
-        mercado.ativos[ativo] * sum(agente.carteira.get(ativo, 0) for agente in agentes)
-        for ativo in mercado.ativos.keys()
-    )
-    valor_total_mercado += sum(
-        mercado.fundos_imobiliarios[fii].preco_cota
-        * sum(agente.carteira.get(fii, 0) for agente in agentes)
-        for fii in mercado.fundos_imobiliarios.keys()
-    )
-    return valor_total_mercado
+    # Total de cotas em circulação de cada papel vezes o seu preço
+    return float(pool.carteiras.sum(axis=0) @ mercado.precos)
 
 
-def pagar_dividendos(mercado: Mercado, agentes: List[Agente]) -> None:
+def pagar_dividendos(mercado: Mercado, pool: PoolAgentes) -> None:
     """
     Realiza o pagamento de dividendos dos fundos imobiliários para os agentes que possuem cotas.
 
     :param mercado: Objeto do mercado contendo os fundos imobiliários.
-    :param agentes: Lista de agentes que receberão os dividendos.
+    :param pool: Saldos e carteiras dos agentes que receberão os dividendos.
     :return: None
     """
-    print("\n[DIVIDENDOS] Pagamento de dividendos!")
+    log.debug("\n[DIVIDENDOS] Pagamento de dividendos!")
+    depurar = log.isEnabledFor(logging.DEBUG)
     for fii_nome, fii in mercado.fundos_imobiliarios.items():
-        for agente in agentes:
-            num_cotas = agente.carteira.get(fii_nome, 0)
-            if num_cotas > 0:
-                dividendos = fii.calcular_dividendos(num_cotas)
-                agente.saldo += dividendos
-                print(
-                    f"{agente.nome} recebeu R${dividendos:.2f} de dividendos de {fii_nome} ({num_cotas} cotas)."
+        num_cotas = pool.carteiras[:, mercado.indices[fii_nome]]
+        cotistas = np.flatnonzero(num_cotas > 0)
+        dividendos = fii.calcular_dividendos(num_cotas[cotistas])
+        pool.saldo[cotistas] += dividendos
+        if depurar:
+            for i, valor in zip(cotistas.tolist(), dividendos.tolist()):
+                log.debug(
+                    "%s recebeu R$%.2f de dividendos de %s (%d cotas).",
+                    pool.agentes[i].nome,
+                    valor,
+                    fii_nome,
+                    num_cotas[i],
                 )
 
 
-def normalizar_historicos(
-    historico_precos: Dict[str, List[float]],
-    historico_patrimonios: Dict[str, List[float]],
-    num_rodadas: int,
-) -> None:
-    """
-    Normaliza os históricos de preços e patrimônios para garantir consistência com o número de rodadas.
-
-    :param historico_precos: Dicionário com os históricos de preços de cada ativo.
-    :param historico_patrimonios: Dicionário com os históricos de patrimônio de cada agente.
-    :param num_rodadas: Número total de rodadas da simulação.
-    :return: None
-    """
-    for ativo, precos in historico_precos.items():
-        historico_precos[ativo] = normalizar_tamanho(precos, num_rodadas)
-
-    for agente, patrimonios in historico_patrimonios.items():
-        historico_patrimonios[agente] = normalizar_tamanho(patrimonios, num_rodadas)
-
-
-def normalizar_tamanho(
-    lista: List[float], tamanho: int, valor_padrao: float = 0
-) -> List[float]:
-    """
-    Ajusta o tamanho de uma lista, preenchendo com um valor padrão se necessário.
-
-    :param lista: Lista a ser normalizada.
-    :param tamanho: Tamanho desejado da lista.
-    :param valor_padrao: Valor padrão a ser usado para preencher a lista.
-    :return: Lista normalizada.
-    """
-    while len(lista) < tamanho:
-        lista.append(lista[-1] if lista else valor_padrao)
-    if len(lista) > tamanho:
-        lista = lista[:tamanho]
-    return lista
-
-
 def plotar_resultados(
-    historico_precos: Dict[str, List[float]],
-    historico_patrimonios: Dict[str, List[float]],
-    historico_valor_mercado: List[float],
+    nomes_papeis: List[str],
+    historico_precos: np.ndarray,
+    nomes_agentes: List[str],
+    historico_patrimonios: np.ndarray,
+    historico_valor_mercado: np.ndarray,
     num_rodadas: int,
     historico_inflacao: List[float],
+    arquivo: Optional[str] = None,
 ) -> None:
     """
     Gera gráficos para visualizar os resultados da simulação, incluindo preços, patrimônio, valor total do mercado e inflação.
 
-    :param historico_precos: Dicionário com o histórico de preços dos ativos e fundos.
-    :param historico_patrimonios: Dicionário com o histórico de patrimônio de cada agente.
-    :param historico_valor_mercado: Lista com o valor total do mercado ao longo das rodadas.
+    :param nomes_papeis: Nomes dos ativos e fundos, na ordem das linhas de `historico_precos`.
+    :param historico_precos: Matriz papéis x rodadas com o histórico de preços.
+    :param nomes_agentes: Nomes dos agentes, na ordem das linhas de `historico_patrimonios`.
+    :param historico_patrimonios: Matriz agentes x rodadas com o histórico de patrimônio.
+    :param historico_valor_mercado: Valor total do mercado ao longo das rodadas.
     :param num_rodadas: Número total de rodadas da simulação.
     :param historico_inflacao: Lista com o histórico de inflação registrada em cada rodada.
+    :param arquivo: Se informado, salva a figura com o backend Agg (sem janela) em vez de exibi-la.
     :return: None
     """
+    # Importado só aqui para não pesar na inicialização da simulação
+    import matplotlib.pyplot as plt
 
-    plt.figure(figsize=(12, 12))
+    if arquivo is not None:
+        plt.switch_backend("Agg")
+
+    # Variações percentuais de todas as séries de uma vez (zero na 1ª rodada)
+    variacoes = np.zeros_like(historico_precos)
+    variacoes[:, 1:] = (
+        np.diff(historico_precos, axis=1) / historico_precos[:, :-1] * 100
+    )
+
+    # Cada gráfico desenha todas as séries numa única chamada, com as linhas
+    # rasterizadas para a figura não crescer com o número de agentes
+    plt.rcParams["agg.path.chunksize"] = 10000
+    fig, axes = plt.subplots(5, 1, figsize=(12, 12))
+    rodadas = np.arange(num_rodadas)  # Eixo x compartilhado por todos os gráficos
 
     # Gráfico 1: Evolução dos preços
-    plt.subplot(5, 1, 1)
-    for ativo, precos in historico_precos.items():
-        plt.plot(range(num_rodadas), precos, label=ativo)
-    plt.xlabel("Rodadas")
-    plt.ylabel("Preços")
-    plt.title("Evolução dos Preços dos Ativos e FIIs")
-    plt.legend()
-    plt.grid(True)
+    axes[0].plot(rodadas, historico_precos.T, label=nomes_papeis, rasterized=True)
+    axes[0].set_ylabel("Preços")
+    axes[0].set_title("Evolução dos Preços dos Ativos e FIIs")
 
     # Gráfico 2: Variações percentuais nos preços
-    plt.subplot(5, 1, 2)
-    for ativo, precos in historico_precos.items():
-        variacoes = [
-            100 * (precos[i] - precos[i - 1]) / precos[i - 1] if i > 0 else 0
-            for i in range(len(precos))
-        ]
-        plt.plot(range(num_rodadas), variacoes, label=f"Variação {ativo}")
-    plt.xlabel("Rodadas")
-    plt.ylabel("Variação Percentual (%)")
-    plt.title("Variações Percentuais nos Preços dos Ativos e FIIs")
-    plt.legend()
-    plt.grid(True)
+    axes[1].plot(
+        rodadas,
+        variacoes.T,
+        label=[f"Variação {ativo}" for ativo in nomes_papeis],
+        rasterized=True,
+    )
+    axes[1].set_ylabel("Variação Percentual (%)")
+    axes[1].set_title("Variações Percentuais nos Preços dos Ativos e FIIs")
 
     # Gráfico 3: Distribuição de patrimônio
-    plt.subplot(5, 1, 3)
-    for agente, patrimonios in historico_patrimonios.items():
-        plt.plot(range(num_rodadas), patrimonios, label=agente)
-    plt.xlabel("Rodadas")
-    plt.ylabel("Patrimônio")
-    plt.title("Distribuição de Patrimônio entre os Agentes")
-    plt.legend()
-    plt.grid(True)
+    axes[2].plot(rodadas, historico_patrimonios.T, label=nomes_agentes, rasterized=True)
+    axes[2].set_ylabel("Patrimônio")
+    axes[2].set_title("Distribuição de Patrimônio entre os Agentes")
 
     # Gráfico 4: Valor total do mercado
-    plt.subplot(5, 1, 4)
-    plt.plot(
-        range(num_rodadas), historico_valor_mercado, label="Valor Total do Mercado"
-    )
-    plt.xlabel("Rodadas")
-    plt.ylabel("Valor Total do Mercado")
-    plt.title("Evolução do Valor Total do Mercado")
-    plt.legend()
-    plt.grid(True)
+    axes[3].plot(rodadas, historico_valor_mercado, label="Valor Total do Mercado")
+    axes[3].set_ylabel("Valor Total do Mercado")
+    axes[3].set_title("Evolução do Valor Total do Mercado")
 
     # Gráfico 5: Inflação
-    plt.subplot(5, 1, 5)
-    plt.plot(
-        range(num_rodadas),
-        [inflacao * 100 for inflacao in historico_inflacao],
-        label="Inflação (%)",
-    )
-    plt.xlabel("Rodadas")
-    plt.ylabel("Inflação (%)")
-    plt.title("Evolução da Inflação")
-    plt.legend()
-    plt.grid(True)
+    axes[4].plot(rodadas, np.asarray(historico_inflacao) * 100, label="Inflação (%)")
+    axes[4].set_ylabel("Inflação (%)")
+    axes[4].set_title("Evolução da Inflação")
+
+    for ax in axes:
+        ax.set_xlabel("Rodadas")
+        ax.legend()
+        ax.grid(True)
 
     # Ajustar o layout do gráfico
-    plt.tight_layout(rect=[0, 0, 1, 0.96])  # Reduz o impacto de "overlap"
-    plt.show()
+    fig.tight_layout(rect=[0, 0, 1, 0.96])  # Reduz o impacto de "overlap"
+    if arquivo is not None:
+        fig.savefig(arquivo)
+        plt.close(fig)
+    else:
+        plt.show()
 
 
 if __name__ == "__main__":
+    # Exibe as mensagens da simulação no stdout
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    log.setLevel(logging.DEBUG)
     main()
@@ -1,11 +1,23 @@
-import random
-import math
-import matplotlib.pyplot as plt
+import logging
+import sys
+import numpy as np
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
 
+from livro_ordens import OrderBook
+from vetorizacao import (
+    NUMBA_DISPONIVEL,
+    PERIODOS_L_PRIVADA,
+    decidir_ordens,
+    media_vizinhos,
+    sortear_vizinhos,
+    variacao_patrimonio,
+)
 
-@dataclass
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
 class Ativo:
     nome: str
     preco_atual: float
@@ -16,245 +28,374 @@ class Ativo:
         self.preco_atual = novo_preco
 
 
-@dataclass
-class Ordem:
-    tipo: str
-    agente: "Agente"
-    ativo: str
-    preco_limite: float
-    quantidade: int
-
-
-@dataclass
-class Transacao:
-    comprador: "Agente"
-    vendedor: "Agente"
-    ativo: str
-    quantidade: int
-    preco_execucao: float
-
-    def executar(self):
-        valor_total = self.quantidade * self.preco_execucao
-        self.comprador.caixa -= valor_total
-        self.vendedor.caixa += valor_total
-        self.comprador.carteira[self.ativo] = (
-            self.comprador.carteira.get(self.ativo, 0) + self.quantidade
-        )
-        self.vendedor.carteira[self.ativo] -= self.quantidade
-
-
-@dataclass
-class OrderBook:
-    ordens_compra: Dict[str, List[Ordem]] = field(default_factory=dict)
-    ordens_venda: Dict[str, List[Ordem]] = field(default_factory=dict)
-
-    def adicionar_ordem(self, ordem: Ordem):
-        if ordem.tipo == "compra":
-            self.ordens_compra.setdefault(ordem.ativo, []).append(ordem)
-        elif ordem.tipo == "venda":
-            self.ordens_venda.setdefault(ordem.ativo, []).append(ordem)
-
-    def executar_ordens(self, ativo, mercado):
-        if ativo in self.ordens_compra and ativo in self.ordens_venda:
-            self.ordens_compra[ativo].sort(key=lambda x: x.preco_limite, reverse=True)
-            self.ordens_venda[ativo].sort(key=lambda x: x.preco_limite)
-
-            while self.ordens_compra[ativo] and self.ordens_venda[ativo]:
-                ordem_compra = self.ordens_compra[ativo][0]
-                ordem_venda = self.ordens_venda[ativo][0]
-
-                if ordem_compra.preco_limite >= ordem_venda.preco_limite:
-                    preco_execucao = (
-                        ordem_compra.preco_limite + ordem_venda.preco_limite
-                    ) / 2
-                    quantidade_exec = min(
-                        ordem_compra.quantidade, ordem_venda.quantidade
-                    )
-
-                    transacao = Transacao(
-                        comprador=ordem_compra.agente,
-                        vendedor=ordem_venda.agente,
-                        ativo=ativo,
-                        quantidade=quantidade_exec,
-                        preco_execucao=preco_execucao,
-                    )
-                    transacao.executar()
-
-                    mercado.ativos[ativo] = preco_execucao
-
-                    ordem_compra.quantidade -= quantidade_exec
-                    ordem_venda.quantidade -= quantidade_exec
-
-                    if ordem_compra.quantidade == 0:
-                        self.ordens_compra[ativo].pop(0)
-                    if ordem_venda.quantidade == 0:
-                        self.ordens_venda[ativo].pop(0)
-                else:
-                    break
-
-
 class Agente:
     """
     Representa um agente participante do mercado.
+
+    Durante a simulação o estado do agente (caixa, carteira, sentimento,
+    vizinhos e histórico de patrimônio) vive nos vetores do `PoolAgentes` e é
+    sincronizado ao final.
     """
 
-    def __init__(self, nome: str, saldo: float = 10000.0, carteira=None, precos_mercado=None):
+    def __init__(
+        self,
+        nome: str,
+        saldo: float = 10000.0,
+        carteira=None,
+        precos_mercado=None,
+        indice: int = 0,
+    ):
         """
-        Inicializa o agente com nome, saldo, carteira de ativos e os preços do mercado.
+        Inicializa o agente com nome, saldo, carteira de ativos e os preços do
+        mercado. `indice` é a posição do agente nos vetores do `PoolAgentes`.
         """
         self.nome: str = nome
+        self.indice: int = indice
         self.caixa: float = saldo
         self.carteira: Dict[str, int] = carteira or {}
         precos_mercado = precos_mercado or {}
-        
+
         # Calcula o patrimônio inicial com base nos preços de mercado
-        self.patrimonio: List[float] = [
-            saldo + sum(precos_mercado.get(ativo, 0) * quantidade for ativo, quantidade in self.carteira.items())
-        ]
+        self.patrimonio: List[float] = [self.calcula_patrimonio(precos_mercado)]
         self.vizinhos: List["Agente"] = []
         self.sentimento: float = 0.0
 
+    def calcula_patrimonio(self, preco_mercado: Dict[str, float]) -> float:
+        """
+        Calcula o patrimônio com base no preço atual de mercado.
+        """
+        valor_ativos = sum(
+            preco_mercado.get(ativo, 0) * quantidade
+            for ativo, quantidade in self.carteira.items()
+        )
+        return self.caixa + valor_ativos
+
+
+@dataclass(slots=True)
+class PoolAgentes:
+    """
+    Estado dos agentes como estrutura de vetores (SoA): a linha i corresponde
+    a `agentes[i]` e a coluna k de `carteiras` e de `sentimento` ao papel
+    `papeis[k]`. As decisões de uma rodada são calculadas com expressões
+    vetorizadas sobre todos os agentes.
+    """
+
+    agentes: List[Agente]
+    papeis: List[str]
+    max_vizinhos: int = 3
+    usar_numba: bool = NUMBA_DISPONIVEL
+    caixa: np.ndarray = field(init=False)
+    carteiras: np.ndarray = field(init=False)
+    sentimento: np.ndarray = field(init=False)
+    vizinhos: np.ndarray = field(init=False)
+    patrimonio: np.ndarray = field(init=False)
+    rodadas_registradas: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        num_agentes = len(self.agentes)
+        self.caixa = np.array([agente.caixa for agente in self.agentes])
+        self.carteiras = np.array(
+            [[a.carteira.get(papel, 0) for papel in self.papeis] for a in self.agentes],
+            dtype=np.int32,
+        ).reshape(num_agentes, len(self.papeis))
+        self.sentimento = np.zeros((num_agentes, len(self.papeis)))
+        self.vizinhos = np.empty(
+            (num_agentes, min(num_agentes, self.max_vizinhos)), dtype=np.int32
+        )
+        # Janela circular: o patrimônio ao fim da rodada t (t = 0 é o inicial)
+        # fica na coluna t % PERIODOS_L_PRIVADA, sobrescrevendo o de t - 22,
+        # que l_privada já não usa
+        self.patrimonio = np.empty((num_agentes, PERIODOS_L_PRIVADA))
+        self.patrimonio[:, 0] = [agente.patrimonio[0] for agente in self.agentes]
+
+    def atualiza_vizinhos(self, rng: np.random.Generator) -> None:
+        """
+        Sorteia, para cada agente, os índices de seus vizinhos, sem repetição.
+        """
+        sortear_vizinhos(self.vizinhos, rng)
 
-    def calcula_l_privada(self) -> float:
+    def calcula_l_privada(self, rodada: int) -> np.ndarray:
         """
         Calcula l_privada como a variação percentual do patrimônio em 22 períodos.
         """
-        if len(self.patrimonio) > 22:
-            patrimonio_t = self.patrimonio[-1]
-            patrimonio_t_22 = self.patrimonio[-22]
-            return (patrimonio_t / patrimonio_t_22) - 1
-        return 0.0
+        return variacao_patrimonio(self.patrimonio, rodada)
 
-    def calcula_l_social(self) -> float:
+    def calcula_l_social(self, l_privada: np.ndarray) -> np.ndarray:
         """
         Calcula l_social como a média aritmética do l_privada dos vizinhos.
         """
-        if self.vizinhos:
-            return sum(vizinho.calcula_l_privada() for vizinho in self.vizinhos) / len(
-                self.vizinhos
-            )
-        return 0.0
+        return media_vizinhos(l_privada, self.vizinhos)
 
-    def sorteia_news(self) -> float:
+    def calcula_influencia(self, rodada: int) -> Union[float, np.ndarray]:
         """
-        Sorteia um valor da distribuição normal com média 0 e desvio padrão 1.
+        Parte do sentimento que vem do patrimônio: 0.2 * l_privada + 0.3 * l_social.
+
+        Enquanto não há 22 períodos de histórico o l_privada de todos é zero:
+        retorna 0.0 sem ler a janela de patrimônio nem os vizinhos.
+        """
+        if rodada + 1 <= PERIODOS_L_PRIVADA:
+            return 0.0
+        l_privada = self.calcula_l_privada(rodada)
+        return 0.2 * l_privada + 0.3 * self.calcula_l_social(l_privada)
+
+    def gera_ordens(
+        self,
+        precos_mercado: np.ndarray,
+        influencia: Union[float, np.ndarray],
+        news: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Atualiza o sentimento de todos os agentes para todos os papéis, com
+        `precos_mercado` na ordem de `papeis` e `news` de formato agentes x
+        papéis. Com `usar_numba`, roda no kernel paralelo `decidir_ordens`.
+
+        :return: Máscara de compra e preços de expectativa, agentes x papéis.
         """
-        return random.gauss(0, 1)
+        if self.usar_numba:
+            return decidir_ordens(
+                precos_mercado,
+                np.full(len(self.agentes), influencia),
+                news,
+                self.sentimento,
+            )
 
-    def atualiza_sentimento(self) -> None:
+        influencia = np.reshape(influencia, (-1, 1))
+        np.clip(influencia + 0.05 * news, -1, 1, out=self.sentimento)
+        preco_expectativa = precos_mercado * np.exp(self.sentimento / 10)
+        return self.sentimento > 0, preco_expectativa
+
+    def liquidar(
+        self,
+        papel: int,
+        compradores: np.ndarray,
+        vendedores: np.ndarray,
+        quantidades: np.ndarray,
+        precos: np.ndarray,
+    ) -> None:
         """
-        Atualiza o sentimento com base em l_privada, l_social e news.
+        Aplica de uma vez os negócios de um papel aos caixas e às carteiras.
+        `np.add.at` acumula os índices repetidos (um agente com vários negócios).
         """
-        l_privada = self.calcula_l_privada()
-        l_social = self.calcula_l_social()
-        news = self.sorteia_news()
-        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
-        self.sentimento = max(
-            -1, min(1, sentimento_bruto)
-        )  # Garante que o sentimento está entre -1 e 1
-
-    def calcula_preco_expectativa(self, preco_mercado: float) -> float:
+        valores = quantidades * precos
+        np.add.at(self.caixa, compradores, -valores)
+        np.add.at(self.caixa, vendedores, valores)
+        cotas = self.carteiras[:, papel]
+        np.add.at(cotas, compradores, quantidades)
+        np.add.at(cotas, vendedores, -quantidades)
+
+    def carteira(self, i: int) -> Dict[str, int]:
         """
-        Calcula o preço de expectativa do agente com base no sentimento.
+        Carteira do agente i como dicionário, com todos os papéis.
         """
-        return preco_mercado * math.exp(self.sentimento / 10)
+        return dict(zip(self.papeis, self.carteiras[i].tolist()))
 
-    def gera_ordem(self, ativo: str, preco_mercado: float) -> Ordem:
+    def atualiza_patrimonio(self, rodada: int, precos: np.ndarray) -> None:
         """
-        Gera uma ordem de compra ou venda com base no sentimento.
+        Registra o patrimônio de cada agente ao fim da rodada, com `precos`
+        na mesma ordem de `papeis`.
         """
-        self.atualiza_sentimento()
-        preco_expectativa = self.calcula_preco_expectativa(preco_mercado)
-        quantidade = 1  # Quantidade fixa conforme regra
-        tipo_ordem = "compra" if self.sentimento > 0 else "venda"
-        return Ordem(tipo_ordem, self, ativo, preco_expectativa, quantidade)
+        coluna = (rodada + 1) % PERIODOS_L_PRIVADA
+        self.patrimonio[:, coluna] = self.caixa + self.carteiras @ precos
+        self.rodadas_registradas = rodada + 1
 
-    def atualiza_vizinhos(self, agentes: List["Agente"], max_vizinhos: int = 3) -> None:
+    def patrimonio_atual(self) -> np.ndarray:
         """
-        Seleciona vizinhos aleatórios.
+        Patrimônio de cada agente ao fim da última rodada registrada.
         """
-        self.vizinhos = random.sample(agentes, min(len(agentes), max_vizinhos))
+        return self.patrimonio[:, self.rodadas_registradas % PERIODOS_L_PRIVADA]
 
-    def atualiza_patrimonio(self, preco_mercado: Dict[str, float]) -> None:
+    def sincroniza_agentes(self) -> None:
         """
-        Atualiza o patrimônio com base no preço atual de mercado.
+        Copia o estado final dos vetores para os objetos `Agente`; o histórico
+        de patrimônio copiado é o da janela guardada, em ordem cronológica.
         """
-        valor_ativos = sum(
-            preco_mercado[ativo] * quantidade
-            for ativo, quantidade in self.carteira.items()
-        )
-        self.patrimonio.append(self.caixa + valor_ativos)
-
-
-@dataclass
+        fim = self.rodadas_registradas
+        janela = np.arange(max(0, fim - PERIODOS_L_PRIVADA + 1), fim + 1)
+        janela %= PERIODOS_L_PRIVADA
+        for i, agente in enumerate(self.agentes):
+            agente.caixa = float(self.caixa[i])
+            agente.carteira = self.carteira(i)
+            agente.vizinhos = [self.agentes[j] for j in self.vizinhos[i]]
+            agente.sentimento = float(self.sentimento[i, -1])
+            agente.patrimonio = self.patrimonio[i, janela].tolist()
+
+
+@dataclass(slots=True)
 class Mercado:
+    """
+    Mercado de ações. Durante a simulação os preços vivem no vetor `precos`,
+    indexado por `indices`; `ativos` é atualizado a partir dele em
+    `sincroniza_precos`.
+    """
+
     ativos: Dict[str, float]
+    nomes: List[str] = field(init=False)
+    indices: Dict[str, int] = field(init=False)
+    precos: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.nomes = list(self.ativos)
+        self.indices = {nome: i for i, nome in enumerate(self.nomes)}
+        self.precos = np.array(list(self.ativos.values()), dtype=np.float64)
+
+    def __getitem__(self, ativo: str) -> float:
+        return float(self.precos[self.indices[ativo]])
+
+    def __setitem__(self, ativo: str, preco: float) -> None:
+        self.precos[self.indices[ativo]] = preco
+
+    def sincroniza_precos(self) -> None:
+        """
+        Copia os preços do vetor para `ativos`.
+        """
+        self.ativos.update(zip(self.nomes, self.precos.tolist()))
 
 
 # Função Principal
-def main():
+def simular(seed: Optional[int] = None) -> Dict[str, List[float]]:
+    """
+    Roda a simulação e retorna o histórico de preços de cada ativo, sem
+    depender do matplotlib.
+    """
     num_agentes = 10
     num_rodadas = 20
 
     mercado = Mercado(ativos={"PETR4": 50.0, "VALE3": 45.0})
     order_book = OrderBook()
+    rng = np.random.default_rng(seed)
 
+    # Saldos e carteiras sorteados em lote, do mesmo gerador da simulação
+    saldos = rng.uniform(1000, 5000, num_agentes).tolist()
+    cotas = rng.integers(0, 51, (num_agentes, len(mercado.nomes))).tolist()
     agentes = [
         Agente(
+            indice=i,
             nome=f"Agente {i+1}",
-            saldo=random.uniform(1000, 5000),
-            carteira={ativo: random.randint(0, 50) for ativo in mercado.ativos.keys()},
+            saldo=saldos[i],
+            carteira=dict(zip(mercado.nomes, cotas[i])),
             precos_mercado=mercado.ativos,  # Passa os preços do mercado
         )
         for i in range(num_agentes)
     ]
+    pool = PoolAgentes(agentes, mercado.nomes)
 
     historico_precos = {ativo: [] for ativo in mercado.ativos.keys()}
 
     for rodada in range(num_rodadas):
-        print(f"\n--- Rodada {rodada + 1} ---")
-
-        for agente in agentes:
-            agente.atualiza_vizinhos(agentes)
-
-        for agente in agentes:
-            for ativo, preco in mercado.ativos.items():
-                ordem = agente.gera_ordem(ativo, preco)
-                order_book.adicionar_ordem(ordem)
-                print(
-                    f"[{ordem.tipo.upper()}] {agente.nome} deseja {ordem.tipo} {ordem.quantidade} de {ativo} "
-                    f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
+        depurar = log.isEnabledFor(logging.DEBUG)
+        if depurar:
+            log.debug(f"\n--- Rodada {rodada + 1} ---")
+
+        pool.atualiza_vizinhos(rng)
+        # O patrimônio só muda ao fim da rodada: a influência de l_privada e
+        # l_social vale para todos os papéis
+        influencia = pool.calcula_influencia(rodada)
+        # Notícias de todos os agentes para todos os papéis, num único sorteio
+        news = rng.standard_normal((num_agentes, len(pool.papeis)))
+
+        compra, precos = pool.gera_ordens(mercado.precos, influencia, news)
+        for coluna, ativo in enumerate(pool.papeis):
+            # Quantidade fixa conforme regra
+            quantidades = np.ones(num_agentes, dtype=np.int64)
+            order_book.adicionar_lote(
+                ativo, compra[:, coluna], precos[:, coluna], quantidades
+            )
+            if depurar:
+                log.debug(
+                    "\n".join(
+                        f"[{tipo.upper()}] {agente.nome} deseja {tipo} 1 de {ativo} "
+                        f"por {'até' if tipo == 'compra' else 'pelo menos'} {preco_limite:.2f}"
+                        for agente, tipo, preco_limite in zip(
+                            agentes,
+                            np.where(compra[:, coluna], "compra", "venda").tolist(),
+                            precos[:, coluna].tolist(),
+                        )
+                    )
+                )
+
+        # Executa as ordens, liquida os negócios e atualiza o histórico de preços
+        for coluna, ativo in enumerate(mercado.nomes):
+            compradores, vendedores, quantidades, precos = order_book.executar_ordens(
+                ativo
+            )
+            if len(precos):
+                pool.liquidar(coluna, compradores, vendedores, quantidades, precos)
+                mercado[ativo] = precos[-1]
+            historico_precos[ativo].append(mercado[ativo])
+        mercado.sincroniza_precos()
+
+        pool.atualiza_patrimonio(rodada, mercado.precos)
+
+        # Resumo da rodada, registrado como uma única mensagem
+        if depurar:
+            linhas = ["\nResumo após a rodada:"]
+            linhas.extend(
+                f"Agente: {agente.nome} | Caixa: {caixa:.2f} | "
+                f"Carteira: {pool.carteira(i)} | Sentimento: {sentimento:.2f} | "
+                f"Patrimônio: {patrimonio:.2f}"
+                for i, (agente, caixa, sentimento, patrimonio) in enumerate(
+                    zip(
+                        agentes,
+                        pool.caixa.tolist(),
+                        pool.sentimento[:, -1].tolist(),
+                        pool.patrimonio_atual().tolist(),
+                    )
                 )
+            )
+            # Preço atualizado de cada ativo
+            linhas.extend(
+                f"Ativo: {ativo} | Preço Atual: {preco:.2f}"
+                for ativo, preco in mercado.ativos.items()
+            )
+            log.debug("\n".join(linhas))
 
-        for ativo in mercado.ativos.keys():
-            order_book.executar_ordens(ativo, mercado)
-            historico_precos[ativo].append(mercado.ativos[ativo])
+    pool.sincroniza_agentes()
+    return historico_precos
 
-        for agente in agentes:
-            agente.atualiza_patrimonio(mercado.ativos)
 
-        print("\nResumo após a rodada:")
-        for agente in agentes:
-            print(
-                f"Agente: {agente.nome} | Caixa: {agente.caixa:.2f} | "
-                f"Carteira: {agente.carteira} | Sentimento: {agente.sentimento:.2f} | "
-                f"Patrimônio: {agente.patrimonio[-1]:.2f}"
-            )
+def plotar_precos(
+    historico_precos: Dict[str, List[float]], arquivo: Optional[str] = None
+) -> None:
+    """
+    Plota a evolução dos preços dos ativos. Com `arquivo`, salva a figura
+    usando o backend Agg (sem janela); caso contrário, exibe na tela.
+    """
+    # Importado só aqui para não pesar na inicialização da simulação
+    import matplotlib.pyplot as plt
 
-        # Exibe o preço atualizado de cada ativo
-        for ativo, preco in mercado.ativos.items():
-            print(f"Ativo: {ativo} | Preço Atual: {preco:.2f}")
+    if arquivo is not None:
+        plt.switch_backend("Agg")
 
     plt.figure(figsize=(12, 8))
     for ativo, precos in historico_precos.items():
-        plt.plot(range(num_rodadas), precos, label=ativo)
+        plt.plot(range(len(precos)), precos, label=ativo)
     plt.xlabel("Rodadas")
     plt.ylabel("Preços")
     plt.title("Evolução dos Preços dos Ativos")
     plt.legend()
     plt.grid(True)
-    plt.show()
+    if arquivo is not None:
+        plt.savefig(arquivo)
+        plt.close()
+    else:
+        plt.show()
+
+
+def main(seed: Optional[int] = None, arquivo_grafico: Optional[str] = None):
+    """
+    Roda a simulação e plota o resultado. Com `arquivo_grafico`, a figura é
+    salva nesse arquivo em vez de exibida na tela.
+    """
+    plotar_precos(simular(seed), arquivo_grafico)
 
 
 if __name__ == "__main__":
-    main()
+    # --headless: sem mensagens no stdout e sem janela; o gráfico é salvo
+    # em teste2.png
+    if "--headless" in sys.argv[1:]:
+        main(arquivo_grafico="teste2.png")
+    else:
+        # Exibe as mensagens da simulação no stdout
+        logging.basicConfig(format="%(message)s", stream=sys.stdout)
+        log.setLevel(logging.DEBUG)
+        main()
@@ -1,11 +1,23 @@
-import random
-import math
-import matplotlib.pyplot as plt
+import logging
+import sys
+import numpy as np
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
 
+from livro_ordens import OrderBook
+from vetorizacao import (
+    NUMBA_DISPONIVEL,
+    PERIODOS_L_PRIVADA,
+    decidir_ordens,
+    media_vizinhos,
+    sortear_vizinhos,
+    variacao_patrimonio,
+)
 
-@dataclass
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
 class Ativo:
     nome: str
     preco_atual: float
@@ -16,7 +28,7 @@ class Ativo:
         self.preco_atual = novo_preco
 
 
-@dataclass
+@dataclass(slots=True)
 class FundoImobiliario:
     nome: str
     preco_cota: float
@@ -39,218 +51,278 @@ class FundoImobiliario:
         return num_cotas * self.preco_cota * self.rendimento_mensal
 
 
-@dataclass
-class Ordem:
-    tipo: str
-    agente: "Agente"
-    ativo: str
-    preco_limite: float
-    quantidade: int
-
-
-@dataclass
-class Transacao:
-    comprador: "Agente"
-    vendedor: "Agente"
-    ativo: str
-    quantidade: int
-    preco_execucao: float
-
-    def executar(self):
-        valor_total = self.quantidade * self.preco_execucao
-        self.comprador.caixa -= valor_total
-        self.vendedor.caixa += valor_total
-        
-        # Atualiza a carteira do comprador
-        self.comprador.carteira[self.ativo] = (
-            self.comprador.carteira.get(self.ativo, 0) + self.quantidade
-        )
-        
-        # Atualiza a carteira do vendedor, com verificação para evitar o KeyError
-        if self.ativo in self.vendedor.carteira:
-            self.vendedor.carteira[self.ativo] -= self.quantidade
-            if self.vendedor.carteira[self.ativo] == 0:
-                del self.vendedor.carteira[self.ativo]  # Remove o ativo se a quantidade for zero
-
-
-@dataclass
-class OrderBook:
-    ordens_compra: Dict[str, List[Ordem]] = field(default_factory=dict)
-    ordens_venda: Dict[str, List[Ordem]] = field(default_factory=dict)
-
-    def adicionar_ordem(self, ordem: Ordem):
-        if ordem.tipo == "compra":
-            self.ordens_compra.setdefault(ordem.ativo, []).append(ordem)
-        elif ordem.tipo == "venda":
-            self.ordens_venda.setdefault(ordem.ativo, []).append(ordem)
-
-    def executar_ordens(self, ativo, mercado):
-        if ativo in self.ordens_compra and ativo in self.ordens_venda:
-            self.ordens_compra[ativo].sort(key=lambda x: x.preco_limite, reverse=True)
-            self.ordens_venda[ativo].sort(key=lambda x: x.preco_limite)
-
-            while self.ordens_compra[ativo] and self.ordens_venda[ativo]:
-                ordem_compra = self.ordens_compra[ativo][0]
-                ordem_venda = self.ordens_venda[ativo][0]
-
-                if ordem_compra.preco_limite >= ordem_venda.preco_limite:
-                    preco_execucao = (
-                        ordem_compra.preco_limite + ordem_venda.preco_limite
-                    ) / 2
-                    quantidade_exec = min(
-                        ordem_compra.quantidade, ordem_venda.quantidade
-                    )
-
-                    transacao = Transacao(
-                        comprador=ordem_compra.agente,
-                        vendedor=ordem_venda.agente,
-                        ativo=ativo,
-                        quantidade=quantidade_exec,
-                        preco_execucao=preco_execucao,
-                    )
-                    transacao.executar()
-
-                    mercado.ativos[ativo] = preco_execucao
-
-                    ordem_compra.quantidade -= quantidade_exec
-                    ordem_venda.quantidade -= quantidade_exec
-
-                    if ordem_compra.quantidade == 0:
-                        self.ordens_compra[ativo].pop(0)
-                    if ordem_venda.quantidade == 0:
-                        self.ordens_venda[ativo].pop(0)
-                else:
-                    break
-
-
 class Agente:
     """
     Representa um agente participante do mercado.
+
+    Durante a simulação o estado do agente (caixa, carteira, sentimento,
+    vizinhos e histórico de patrimônio) vive nos vetores do `PoolAgentes` e é
+    sincronizado ao final.
     """
 
     def __init__(
-        self, nome: str, saldo: float = 10000.0, carteira=None, precos_mercado=None
+        self,
+        nome: str,
+        saldo: float = 10000.0,
+        carteira=None,
+        precos_mercado=None,
+        indice: int = 0,
     ):
         """
-        Inicializa o agente com nome, saldo, carteira de ativos e os preços do mercado.
+        Inicializa o agente com nome, saldo, carteira de ativos e os preços do
+        mercado. `indice` é a posição do agente nos vetores do `PoolAgentes`.
         """
         self.nome: str = nome
+        self.indice: int = indice
         self.caixa: float = saldo
         self.carteira: Dict[str, int] = carteira or {}
         precos_mercado = precos_mercado or {}
 
         # Calcula o patrimônio inicial com base nos preços de mercado
-        self.patrimonio: List[float] = [
-            saldo
-            + sum(
-                precos_mercado.get(ativo, 0) * quantidade
-                for ativo, quantidade in self.carteira.items()
-            )
-        ]
+        self.patrimonio: List[float] = [self.calcula_patrimonio(precos_mercado)]
         self.vizinhos: List["Agente"] = []
         self.sentimento: float = 0.0
 
-    def calcula_l_privada(self) -> float:
+    def calcula_patrimonio(self, precos: Dict[str, float]) -> float:
+        """
+        Calcula o patrimônio com base no preço atual de mercado dos ativos e
+        fundos imobiliários, dados num único dicionário `precos`.
+        """
+        return self.caixa + sum(
+            precos.get(ativo, 0) * quantidade
+            for ativo, quantidade in self.carteira.items()
+        )
+
+
+@dataclass(slots=True)
+class PoolAgentes:
+    """
+    Estado dos agentes como estrutura de vetores (SoA): a linha i corresponde
+    a `agentes[i]` e a coluna k de `carteiras` e de `sentimento` ao papel
+    `papeis[k]`. As decisões de uma rodada são calculadas com expressões
+    vetorizadas sobre todos os agentes.
+    """
+
+    agentes: List[Agente]
+    papeis: List[str]
+    max_vizinhos: int = 3
+    usar_numba: bool = NUMBA_DISPONIVEL
+    caixa: np.ndarray = field(init=False)
+    carteiras: np.ndarray = field(init=False)
+    sentimento: np.ndarray = field(init=False)
+    vizinhos: np.ndarray = field(init=False)
+    patrimonio: np.ndarray = field(init=False)
+    rodadas_registradas: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        num_agentes = len(self.agentes)
+        self.caixa = np.array([agente.caixa for agente in self.agentes])
+        self.carteiras = np.array(
+            [[a.carteira.get(papel, 0) for papel in self.papeis] for a in self.agentes],
+            dtype=np.int32,
+        ).reshape(num_agentes, len(self.papeis))
+        self.sentimento = np.zeros((num_agentes, len(self.papeis)))
+        self.vizinhos = np.empty(
+            (num_agentes, min(num_agentes, self.max_vizinhos)), dtype=np.int32
+        )
+        # Janela circular: o patrimônio ao fim da rodada t (t = 0 é o inicial)
+        # fica na coluna t % PERIODOS_L_PRIVADA, sobrescrevendo o de t - 22,
+        # que l_privada já não usa
+        self.patrimonio = np.empty((num_agentes, PERIODOS_L_PRIVADA))
+        self.patrimonio[:, 0] = [agente.patrimonio[0] for agente in self.agentes]
+
+    def atualiza_vizinhos(self, rng: np.random.Generator) -> None:
+        """
+        Sorteia, para cada agente, os índices de seus vizinhos, sem repetição.
+        """
+        sortear_vizinhos(self.vizinhos, rng)
+
+    def calcula_l_privada(self, rodada: int) -> np.ndarray:
         """
         Calcula l_privada como a variação percentual do patrimônio em 22 períodos.
         """
-        if len(self.patrimonio) > 22:
-            patrimonio_t = self.patrimonio[-1]
-            patrimonio_t_22 = self.patrimonio[-22]
-            return (patrimonio_t / patrimonio_t_22) - 1
-        return 0.0
+        return variacao_patrimonio(self.patrimonio, rodada)
 
-    def calcula_l_social(self) -> float:
+    def calcula_l_social(self, l_privada: np.ndarray) -> np.ndarray:
         """
         Calcula l_social como a média aritmética do l_privada dos vizinhos.
         """
-        if self.vizinhos:
-            return sum(vizinho.calcula_l_privada() for vizinho in self.vizinhos) / len(
-                self.vizinhos
-            )
-        return 0.0
+        return media_vizinhos(l_privada, self.vizinhos)
 
-    def sorteia_news(self) -> float:
-        """
-        Sorteia um valor da distribuição normal com média 0 e desvio padrão 1.
+    def calcula_influencia(self, rodada: int) -> Union[float, np.ndarray]:
         """
-        return random.gauss(0, 1)
+        Parte do sentimento que vem do patrimônio: 0.2 * l_privada + 0.3 * l_social.
 
-    def atualiza_sentimento(self) -> None:
+        Enquanto não há 22 períodos de histórico o l_privada de todos é zero:
+        retorna 0.0 sem ler a janela de patrimônio nem os vizinhos.
         """
-        Atualiza o sentimento com base em l_privada, l_social e news.
+        if rodada + 1 <= PERIODOS_L_PRIVADA:
+            return 0.0
+        l_privada = self.calcula_l_privada(rodada)
+        return 0.2 * l_privada + 0.3 * self.calcula_l_social(l_privada)
+
+    def gera_ordens(
+        self,
+        precos_mercado: np.ndarray,
+        influencia: Union[float, np.ndarray],
+        news: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        l_privada = self.calcula_l_privada()
-        l_social = self.calcula_l_social()
-        news = self.sorteia_news()
-        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
-        self.sentimento = max(
-            -1, min(1, sentimento_bruto)
-        )  # Garante que o sentimento está entre -1 e 1
+        Atualiza o sentimento de todos os agentes para todos os papéis, com
+        `precos_mercado` na ordem de `papeis` e `news` de formato agentes x
+        papéis. Com `usar_numba`, roda no kernel paralelo `decidir_ordens`.
+
+        :return: Máscara de compra e preços de expectativa, agentes x papéis.
+        """
+        if self.usar_numba:
+            return decidir_ordens(
+                precos_mercado,
+                np.full(len(self.agentes), influencia),
+                news,
+                self.sentimento,
+            )
 
-    def calcula_preco_expectativa(self, preco_mercado: float) -> float:
+        influencia = np.reshape(influencia, (-1, 1))
+        np.clip(influencia + 0.05 * news, -1, 1, out=self.sentimento)
+        preco_expectativa = precos_mercado * np.exp(self.sentimento / 10)
+        return self.sentimento > 0, preco_expectativa
+
+    def liquidar(
+        self,
+        papel: int,
+        compradores: np.ndarray,
+        vendedores: np.ndarray,
+        quantidades: np.ndarray,
+        precos: np.ndarray,
+    ) -> None:
         """
-        Calcula o preço de expectativa do agente com base no sentimento.
+        Aplica de uma vez os negócios de um papel aos caixas e às carteiras.
+        `np.add.at` acumula os índices repetidos (um agente com vários negócios).
         """
-        return preco_mercado * math.exp(self.sentimento / 10)
+        valores = quantidades * precos
+        np.add.at(self.caixa, compradores, -valores)
+        np.add.at(self.caixa, vendedores, valores)
+        cotas = self.carteiras[:, papel]
+        np.add.at(cotas, compradores, quantidades)
+        np.add.at(cotas, vendedores, -quantidades)
+
+    def carteira(self, i: int) -> Dict[str, int]:
+        """
+        Carteira do agente i como dicionário, só com os papéis em posse.
+        """
+        return {
+            papel: quantidade
+            for papel, quantidade in zip(self.papeis, self.carteiras[i].tolist())
+            if quantidade
+        }
 
-    def gera_ordem(self, ativo: str, preco_mercado: float) -> Ordem:
+    def atualiza_patrimonio(self, rodada: int, precos: np.ndarray) -> None:
         """
-        Gera uma ordem de compra ou venda com base no sentimento.
+        Registra o patrimônio de cada agente ao fim da rodada, com `precos`
+        na mesma ordem de `papeis`.
         """
-        self.atualiza_sentimento()
-        preco_expectativa = self.calcula_preco_expectativa(preco_mercado)
-        quantidade = 1  # Quantidade fixa conforme regra
-        tipo_ordem = "compra" if self.sentimento > 0 else "venda"
-        return Ordem(tipo_ordem, self, ativo, preco_expectativa, quantidade)
+        coluna = (rodada + 1) % PERIODOS_L_PRIVADA
+        self.patrimonio[:, coluna] = self.caixa + self.carteiras @ precos
+        self.rodadas_registradas = rodada + 1
 
-    def atualiza_vizinhos(self, agentes: List["Agente"], max_vizinhos: int = 3) -> None:
+    def patrimonio_atual(self) -> np.ndarray:
         """
-        Seleciona vizinhos aleatórios.
+        Patrimônio de cada agente ao fim da última rodada registrada.
         """
-        self.vizinhos = random.sample(agentes, min(len(agentes), max_vizinhos))
+        return self.patrimonio[:, self.rodadas_registradas % PERIODOS_L_PRIVADA]
 
-    def atualiza_patrimonio(
-    self, precos_mercado: Dict[str, float], fundos_imobiliarios: Dict[str, FundoImobiliario]
-) -> None:
+    def sincroniza_agentes(self) -> None:
         """
-        Atualiza o patrimônio com base no preço atual de mercado dos ativos e fundos imobiliários.
+        Copia o estado final dos vetores para os objetos `Agente`; o histórico
+        de patrimônio copiado é o da janela guardada, em ordem cronológica.
         """
-        valor_ativos = sum(
-            precos_mercado.get(ativo, 0) * quantidade
-            for ativo, quantidade in self.carteira.items()
-        )
-        valor_fundos = sum(
-            fundo.preco_cota * quantidade
-            for fundo_nome, fundo in fundos_imobiliarios.items()
-            for ativo, quantidade in self.carteira.items()
-            if fundo_nome == ativo
-        )
-        self.patrimonio.append(self.caixa + valor_ativos + valor_fundos)
+        fim = self.rodadas_registradas
+        janela = np.arange(max(0, fim - PERIODOS_L_PRIVADA + 1), fim + 1)
+        janela %= PERIODOS_L_PRIVADA
+        for i, agente in enumerate(self.agentes):
+            agente.caixa = float(self.caixa[i])
+            agente.carteira = self.carteira(i)
+            agente.vizinhos = [self.agentes[j] for j in self.vizinhos[i]]
+            agente.sentimento = float(self.sentimento[i, -1])
+            agente.patrimonio = self.patrimonio[i, janela].tolist()
+
+
+@dataclass(slots=True)
+class Mercado:
+    """
+    Mercado com ações tradicionais e fundos imobiliários.
 
+    Durante a simulação todos os papéis formam uma única tabela de vetores,
+    indexada por `indices` (ações primeiro, depois os fundos): `precos`,
+    `eh_fundo` e `rendimentos` (zero para as ações). `ativos` e
+    `FundoImobiliario.preco_cota` são atualizados a partir de `precos` em
+    `sincroniza_precos`.
+    """
 
-@dataclass
-class Mercado:
     ativos: Dict[str, float]  # Ações tradicionais
     fundos_imobiliarios: Dict[str, FundoImobiliario] = field(default_factory=dict)
+    nomes: List[str] = field(init=False)
+    indices: Dict[str, int] = field(init=False)
+    precos: np.ndarray = field(init=False)
+    eh_fundo: np.ndarray = field(init=False)
+    rendimentos: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        fundos = self.fundos_imobiliarios.values()
+        self.nomes = [*self.ativos, *self.fundos_imobiliarios]
+        self.indices = {nome: i for i, nome in enumerate(self.nomes)}
+        self.precos = np.array(
+            [*self.ativos.values(), *(fundo.preco_cota for fundo in fundos)],
+            dtype=np.float64,
+        )
+        self.eh_fundo = np.arange(len(self.nomes)) >= len(self.ativos)
+        self.rendimentos = np.zeros(len(self.nomes))
+        self.rendimentos[self.eh_fundo] = [f.rendimento_mensal for f in fundos]
+
+    def __getitem__(self, nome: str) -> float:
+        return float(self.precos[self.indices[nome]])
 
-    def pagar_dividendos(self, agentes: List["Agente"]) -> None:
+    def __setitem__(self, nome: str, preco: float) -> None:
+        self.precos[self.indices[nome]] = preco
+
+    def sincroniza_precos(self) -> None:
+        """
+        Copia os preços do vetor para `ativos` e para as cotas dos fundos.
+        """
+        num_ativos = len(self.ativos)
+        for nome, preco in zip(self.nomes[:num_ativos], self.precos.tolist()):
+            self.ativos[nome] = preco
+        for fundo, preco in zip(
+            self.fundos_imobiliarios.values(), self.precos[num_ativos:].tolist()
+        ):
+            fundo.preco_cota = preco
+
+    def pagar_dividendos(self, pool: PoolAgentes) -> None:
         """
-        Paga os dividendos dos fundos imobiliários para os agentes.
+        Paga os dividendos dos fundos imobiliários para os agentes, com as
+        colunas de `pool.carteiras` na ordem de `nomes`.
         """
-        for fundo in self.fundos_imobiliarios.values():
-            for agente in agentes:
-                num_cotas = agente.carteira.get(fundo.nome, 0)
-                if num_cotas > 0:
-                    dividendos = fundo.calcular_dividendos(num_cotas)
-                    agente.caixa += dividendos
-                    print(
-                        f"[DIVIDENDOS] {agente.nome} recebeu {dividendos:.2f} de dividendos do fundo {fundo.nome}."
+        # Só quem tem cotas recebe; o dividendo por cota é preço x rendimento
+        cotas = np.maximum(pool.carteiras[:, self.eh_fundo], 0)
+        por_cota = (self.precos * self.rendimentos)[self.eh_fundo]
+        pool.caixa += cotas @ por_cota
+        if log.isEnabledFor(logging.DEBUG):
+            for k, fundo in enumerate(self.fundos_imobiliarios):
+                for i in np.flatnonzero(cotas[:, k]).tolist():
+                    log.debug(
+                        "[DIVIDENDOS] %s recebeu %.2f de dividendos do fundo %s.",
+                        pool.agentes[i].nome,
+                        cotas[i, k] * por_cota[k],
+                        fundo,
                     )
 
 
 # Função Principal
-def main():
+def simular(seed: Optional[int] = None) -> Dict[str, List[float]]:
+    """
+    Roda a simulação e retorna o histórico de preços de cada ativo, sem
+    depender do matplotlib.
+    """
     num_agentes = 10
     num_rodadas = 20
 
@@ -262,97 +334,118 @@ def main():
         },
     )
     order_book = OrderBook()
+    rng = np.random.default_rng(seed)
 
+    # Saldos e carteiras sorteados em lote, do mesmo gerador da simulação
+    saldos = rng.uniform(1000, 5000, num_agentes).tolist()
+    cotas = rng.integers(0, 51, (num_agentes, len(mercado.nomes))).tolist()
     agentes = [
         Agente(
+            indice=i,
             nome=f"Agente {i+1}",
-            saldo=random.uniform(1000, 5000),
-            carteira={
-                ativo: random.randint(0, 50)
-                for ativo in {**mercado.ativos, **mercado.fundos_imobiliarios}.keys()
-            },
-            precos_mercado={
-                **mercado.ativos,
-                **{
-                    fundo.nome: fundo.preco_cota
-                    for fundo in mercado.fundos_imobiliarios.values()
-                },
-            },
+            saldo=saldos[i],
+            carteira=dict(zip(mercado.nomes, cotas[i])),
+            precos_mercado=dict(zip(mercado.nomes, mercado.precos.tolist())),
         )
         for i in range(num_agentes)
     ]
+    pool = PoolAgentes(agentes, mercado.nomes)
 
-    historico_precos = {
-        ativo: []
-        for ativo in {
-            **mercado.ativos,
-            **{fundo.nome: fundo for fundo in mercado.fundos_imobiliarios.values()},
-        }
-    }
+    historico_precos = {ativo: [] for ativo in mercado.nomes}
 
     for rodada in range(num_rodadas):
-        print(f"\n--- Rodada {rodada + 1} ---")
+        depurar = log.isEnabledFor(logging.DEBUG)
+        if depurar:
+            log.debug(f"\n--- Rodada {rodada + 1} ---")
 
-        # Atualiza vizinhos para cada agente
-        for agente in agentes:
-            agente.atualiza_vizinhos(agentes)
+        pool.atualiza_vizinhos(rng)
+        # O patrimônio só muda ao fim da rodada: a influência de l_privada e
+        # l_social vale para todos os papéis
+        influencia = pool.calcula_influencia(rodada)
+        # Notícias de todos os agentes para todos os papéis, num único sorteio
+        news = rng.standard_normal((num_agentes, len(pool.papeis)))
 
         # Processa ordens de ações e fundos imobiliários
-        for agente in agentes:
-            for ativo, preco in mercado.ativos.items():
-                ordem = agente.gera_ordem(ativo, preco)
-                order_book.adicionar_ordem(ordem)
-                print(
-                    f"[{ordem.tipo.upper()}] {agente.nome} deseja {ordem.tipo} {ordem.quantidade} de {ativo} "
-                    f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
-                )
-            for fundo_nome, fundo in mercado.fundos_imobiliarios.items():
-                ordem = agente.gera_ordem(fundo_nome, fundo.preco_cota)
-                order_book.adicionar_ordem(ordem)
-                print(
-                    f"[{ordem.tipo.upper()}] {agente.nome} deseja {ordem.tipo} {ordem.quantidade} de {fundo_nome} "
-                    f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
+        compra, precos = pool.gera_ordens(mercado.precos, influencia, news)
+        for coluna, ativo in enumerate(pool.papeis):
+            # Quantidade fixa conforme regra
+            quantidades = np.ones(num_agentes, dtype=np.int64)
+            order_book.adicionar_lote(
+                ativo, compra[:, coluna], precos[:, coluna], quantidades
+            )
+            if depurar:
+                log.debug(
+                    "\n".join(
+                        f"[{tipo.upper()}] {agente.nome} deseja {tipo} 1 de {ativo} "
+                        f"por {'até' if tipo == 'compra' else 'pelo menos'} {preco_limite:.2f}"
+                        for agente, tipo, preco_limite in zip(
+                            agentes,
+                            np.where(compra[:, coluna], "compra", "venda").tolist(),
+                            precos[:, coluna].tolist(),
+                        )
+                    )
                 )
 
-        # Executa ordens de ações e atualiza o histórico de preços
-        for ativo in mercado.ativos.keys():
-            order_book.executar_ordens(ativo, mercado)
-
-            # Adiciona o preço atual ao histórico
-            if len(historico_precos[ativo]) < rodada + 1:
-                historico_precos[ativo].append(mercado.ativos[ativo])
-
-        # Executa ordens de fundos imobiliários e atualiza o histórico de preços
-        for fundo_nome, fundo in mercado.fundos_imobiliarios.items():
-            order_book.executar_ordens(fundo_nome, mercado)
-
-            # Adiciona o preço atual ao histórico
-            if len(historico_precos[fundo_nome]) < rodada + 1:
-                historico_precos[fundo_nome].append(fundo.preco_cota)
+        # Executa as ordens de ações e de fundos imobiliários, liquida os
+        # negócios e atualiza o histórico de preços
+        for coluna, ativo in enumerate(mercado.nomes):
+            compradores, vendedores, quantidades, precos = order_book.executar_ordens(
+                ativo
+            )
+            if len(precos):
+                pool.liquidar(coluna, compradores, vendedores, quantidades, precos)
+                mercado[ativo] = precos[-1]
+            historico_precos[ativo].append(mercado[ativo])
+        mercado.sincroniza_precos()
 
         # Paga dividendos dos fundos imobiliários
-        mercado.pagar_dividendos(agentes)
+        mercado.pagar_dividendos(pool)
 
         # Atualiza patrimônio dos agentes
-        for agente in agentes:
-            agente.atualiza_patrimonio(mercado.ativos, mercado.fundos_imobiliarios)
-
-        print("\nResumo após a rodada:")
-        for agente in agentes:
-            print(
-                f"Agente: {agente.nome} | Caixa: {agente.caixa:.2f} | "
-                f"Carteira: {agente.carteira} | Sentimento: {agente.sentimento:.2f} | "
-                f"Patrimônio: {agente.patrimonio[-1]:.2f}"
+        pool.atualiza_patrimonio(rodada, mercado.precos)
+
+        # Resumo da rodada, registrado como uma única mensagem
+        if depurar:
+            linhas = ["\nResumo após a rodada:"]
+            linhas.extend(
+                f"Agente: {agente.nome} | Caixa: {caixa:.2f} | "
+                f"Carteira: {pool.carteira(i)} | Sentimento: {sentimento:.2f} | "
+                f"Patrimônio: {patrimonio:.2f}"
+                for i, (agente, caixa, sentimento, patrimonio) in enumerate(
+                    zip(
+                        agentes,
+                        pool.caixa.tolist(),
+                        pool.sentimento[:, -1].tolist(),
+                        pool.patrimonio_atual().tolist(),
+                    )
+                )
+            )
+            # Preço atualizado de cada ativo
+            linhas.extend(
+                f"Ativo: {ativo} | Preço Atual: {preco:.2f}"
+                for ativo, preco in mercado.ativos.items()
             )
+            log.debug("\n".join(linhas))
 
-        # Exibe o preço atualizado de cada ativo
-        for ativo, preco in mercado.ativos.items():
-            print(f"Ativo: {ativo} | Preço Atual: {preco:.2f}")
+    pool.sincroniza_agentes()
+    return historico_precos
 
-    # Garante que todas as listas de preços tenham o mesmo comprimento que o número de rodadas
-    for ativo, precos in historico_precos.items():
-        while len(precos) < num_rodadas:
-            precos.append(precos[-1])  # Preenche com o último preço registrado
+
+def plotar_precos(
+    historico_precos: Dict[str, List[float]], arquivo: Optional[str] = None
+) -> None:
+    """
+    Plota a evolução dos preços dos ativos e suas variações percentuais.
+    Com `arquivo`, salva a figura usando o backend Agg (sem janela); caso
+    contrário, exibe na tela.
+    """
+    # Importado só aqui para não pesar na inicialização da simulação
+    import matplotlib.pyplot as plt
+
+    if arquivo is not None:
+        plt.switch_backend("Agg")
+
+    num_rodadas = len(next(iter(historico_precos.values())))
 
     # Gráficos de evolução e variações
     plt.figure(figsize=(12, 8))
@@ -388,8 +481,28 @@ def main():
 
     # Exibe os gráficos
     plt.tight_layout()
-    plt.show()
+    if arquivo is not None:
+        plt.savefig(arquivo)
+        plt.close()
+    else:
+        plt.show()
+
+
+def main(seed: Optional[int] = None, arquivo_grafico: Optional[str] = None):
+    """
+    Roda a simulação e plota o resultado. Com `arquivo_grafico`, a figura é
+    salva nesse arquivo em vez de exibida na tela.
+    """
+    plotar_precos(simular(seed), arquivo_grafico)
 
 
 if __name__ == "__main__":
-    main()
+    # --headless: sem mensagens no stdout e sem janela; o gráfico é salvo
+    # em teste3.png
+    if "--headless" in sys.argv[1:]:
+        main(arquivo_grafico="teste3.png")
+    else:
+        # Exibe as mensagens da simulação no stdout
+        logging.basicConfig(format="%(message)s", stream=sys.stdout)
+        log.setLevel(logging.DEBUG)
+        main()
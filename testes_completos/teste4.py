@@ -1,12 +1,23 @@
-import random
-import math
+import logging
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
+from livro_ordens import OrderBook
+from vetorizacao import (
+    NUMBA_DISPONIVEL,
+    decidir_ordens,
+    media_vizinhos,
+    sortear_vizinhos,
+    variacao_patrimonio,
+)
 
-@dataclass
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
 class Ativo:
     nome: str
     preco_atual: float
@@ -17,7 +28,7 @@ class Ativo:
         self.preco_atual = novo_preco
 
 
-@dataclass
+@dataclass(slots=True)
 class FundoImobiliario:
     nome: str
     preco_cota: float
@@ -34,181 +45,227 @@ class FundoImobiliario:
         return num_cotas * self.preco_cota * self.rendimento_mensal
 
 
-@dataclass
-class Ordem:
-    tipo: str
-    agente: "Agente"
-    ativo: str
-    preco_limite: float
-    quantidade: int
-
-
-@dataclass
-class Transacao:
-    comprador: "Agente"
-    vendedor: "Agente"
-    ativo: str
-    quantidade: int
-    preco_execucao: float
-
-    def executar(self):
-        valor_total = self.quantidade * self.preco_execucao
-        self.comprador.caixa -= valor_total
-        self.vendedor.caixa += valor_total
-
-        # Atualiza a carteira do comprador
-        self.comprador.carteira[self.ativo] = (
-            self.comprador.carteira.get(self.ativo, 0) + self.quantidade
-        )
-
-        # Atualiza a carteira do vendedor
-        if self.ativo in self.vendedor.carteira:
-            self.vendedor.carteira[self.ativo] -= self.quantidade
-            if self.vendedor.carteira[self.ativo] == 0:
-                del self.vendedor.carteira[self.ativo]
-
-
-@dataclass
-class OrderBook:
-    ordens_compra: Dict[str, List[Ordem]] = field(default_factory=dict)
-    ordens_venda: Dict[str, List[Ordem]] = field(default_factory=dict)
-
-    def adicionar_ordem(self, ordem: Ordem):
-        if ordem.tipo == "compra":
-            self.ordens_compra.setdefault(ordem.ativo, []).append(ordem)
-        elif ordem.tipo == "venda":
-            self.ordens_venda.setdefault(ordem.ativo, []).append(ordem)
-
-    def executar_ordens(self, ativo, mercado):
-        if ativo in self.ordens_compra and ativo in self.ordens_venda:
-            self.ordens_compra[ativo].sort(key=lambda x: x.preco_limite, reverse=True)
-            self.ordens_venda[ativo].sort(key=lambda x: x.preco_limite)
-
-            while self.ordens_compra[ativo] and self.ordens_venda[ativo]:
-                ordem_compra = self.ordens_compra[ativo][0]
-                ordem_venda = self.ordens_venda[ativo][0]
-
-                if ordem_compra.preco_limite >= ordem_venda.preco_limite:
-                    preco_execucao = (
-                        ordem_compra.preco_limite + ordem_venda.preco_limite
-                    ) / 2
-                    quantidade_exec = min(
-                        ordem_compra.quantidade, ordem_venda.quantidade
-                    )
-
-                    transacao = Transacao(
-                        comprador=ordem_compra.agente,
-                        vendedor=ordem_venda.agente,
-                        ativo=ativo,
-                        quantidade=quantidade_exec,
-                        preco_execucao=preco_execucao,
-                    )
-                    transacao.executar()
-
-                    mercado.ativos[ativo] = preco_execucao
-
-                    ordem_compra.quantidade -= quantidade_exec
-                    ordem_venda.quantidade -= quantidade_exec
-
-                    if ordem_compra.quantidade == 0:
-                        self.ordens_compra[ativo].pop(0)
-                    if ordem_venda.quantidade == 0:
-                        self.ordens_venda[ativo].pop(0)
-                else:
-                    break
+class Agente:
+    """
+    Durante a simulação o estado do agente (caixa, carteira, sentimento,
+    vizinhos e histórico de patrimônio) vive no `PoolAgentes` e é
+    sincronizado ao final.
+    """
 
+    __slots__ = (
+        "nome",
+        "indice",
+        "caixa",
+        "carteira",
+        "patrimonio",
+        "vizinhos",
+        "sentimento",
+    )
 
-class Agente:
     def __init__(
-        self, nome: str, saldo: float = 10000.0, carteira=None, precos_mercado=None
+        self,
+        nome: str,
+        saldo: float = 10000.0,
+        carteira=None,
+        precos_mercado=None,
+        indice: int = 0,
     ):
+        # `indice` é a posição do agente nos vetores do `PoolAgentes`
         self.nome: str = nome
+        self.indice: int = indice
         self.caixa: float = saldo
         self.carteira: Dict[str, int] = carteira or {}
         precos_mercado = precos_mercado or {}
-        self.patrimonio: List[float] = [
-            saldo
-            + sum(
-                precos_mercado.get(ativo, 0) * quantidade
-                for ativo, quantidade in self.carteira.items()
-            )
-        ]
+        self.patrimonio: List[float] = [self.calcula_patrimonio(precos_mercado)]
         self.vizinhos: List["Agente"] = []
         self.sentimento: float = 0.0
 
-    def calcula_l_privada(self) -> float:
-        if len(self.patrimonio) > 22:
-            patrimonio_t = self.patrimonio[-1]
-            patrimonio_t_22 = self.patrimonio[-22]
-            return (patrimonio_t / patrimonio_t_22) - 1
-        return 0.0
-
-    def calcula_l_social(self) -> float:
-        if self.vizinhos:
-            return sum(vizinho.calcula_l_privada() for vizinho in self.vizinhos) / len(
-                self.vizinhos
-            )
-        return 0.0
-
-    def sorteia_news(self) -> float:
-        return random.gauss(0, 1)
-
-    def atualiza_sentimento(self) -> None:
-        l_privada = self.calcula_l_privada()
-        l_social = self.calcula_l_social()
-        news = self.sorteia_news()
-        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
-        self.sentimento = max(-1, min(1, sentimento_bruto))
-
-    def calcula_preco_expectativa(self, preco_mercado: float) -> float:
-        return preco_mercado * math.exp(self.sentimento / 10)
+    def calcula_patrimonio(self, precos: Dict[str, float]) -> float:
+        """
+        Patrimônio a preços de mercado, com ações e cotas de FIIs num único
+        dicionário `precos`.
+        """
+        return self.caixa + sum(
+            precos.get(ativo, 0) * quantidade
+            for ativo, quantidade in self.carteira.items()
+        )
 
-    def gera_ordem(self, ativo: str, preco_mercado: float) -> Ordem:
-        self.atualiza_sentimento()
-        preco_expectativa = self.calcula_preco_expectativa(preco_mercado)
-        quantidade = 1
-        tipo_ordem = "compra" if self.sentimento > 0 else "venda"
-        return Ordem(tipo_ordem, self, ativo, preco_expectativa, quantidade)
 
-    def atualiza_vizinhos(self, agentes: List["Agente"], max_vizinhos: int = 3) -> None:
-        self.vizinhos = random.sample(agentes, min(len(agentes), max_vizinhos))
+@dataclass(slots=True)
+class PoolAgentes:
+    """
+    Estado de comportamento dos agentes como estrutura de vetores (SoA): a
+    linha i corresponde a `agentes[i]` e a coluna k de `sentimento` ao papel
+    `papeis[k]`. As decisões de uma rodada são calculadas com expressões
+    vetorizadas sobre todos os agentes.
+    """
 
-    def atualiza_patrimonio(
-        self,
-        precos_mercado: Dict[str, float],
-        fundos_imobiliarios: Dict[str, FundoImobiliario],
-    ) -> None:
-        valor_ativos = sum(
-            precos_mercado.get(ativo, 0) * quantidade
-            for ativo, quantidade in self.carteira.items()
+    agentes: List[Agente]
+    papeis: List[str]
+    num_rodadas: int
+    max_vizinhos: int = 3
+    usar_numba: bool = NUMBA_DISPONIVEL
+    sentimento: np.ndarray = field(init=False)
+    vizinhos: np.ndarray = field(init=False)
+    caixa: np.ndarray = field(init=False)
+    carteiras: np.ndarray = field(init=False)
+    patrimonio: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        num_agentes = len(self.agentes)
+        self.caixa = np.array([agente.caixa for agente in self.agentes])
+        # Coluna k: quantidade de `papeis[k]` na carteira de cada agente
+        self.carteiras = np.array(
+            [
+                [agente.carteira.get(papel, 0) for papel in self.papeis]
+                for agente in self.agentes
+            ],
+            dtype=np.int64,
         )
-        valor_fundos = sum(
-            fundo.preco_cota * quantidade
-            for fundo_nome, fundo in fundos_imobiliarios.items()
-            for ativo, quantidade in self.carteira.items()
-            if fundo_nome == ativo
+        self.sentimento = np.zeros((num_agentes, len(self.papeis)))
+        self.vizinhos = np.empty(
+            (num_agentes, min(num_agentes, self.max_vizinhos)), dtype=np.int64
         )
-        self.patrimonio.append(self.caixa + valor_ativos + valor_fundos)
-
-
-@dataclass
+        # Coluna t: patrimônio de cada agente ao fim da rodada t (coluna 0 = inicial)
+        self.patrimonio = np.empty((num_agentes, self.num_rodadas + 1))
+        self.patrimonio[:, 0] = [agente.patrimonio[0] for agente in self.agentes]
+
+    def atualiza_vizinhos(self, rng: np.random.Generator) -> None:
+        """
+        Sorteia, para cada agente, os índices de seus vizinhos, sem repetição.
+        """
+        sortear_vizinhos(self.vizinhos, rng)
+
+    def calcula_l_privada(self, rodada: int) -> np.ndarray:
+        """
+        Variação percentual do patrimônio em 22 períodos.
+        """
+        return variacao_patrimonio(self.patrimonio, rodada)
+
+    def calcula_l_social(self, l_privada: np.ndarray) -> np.ndarray:
+        """
+        Média do l_privada dos vizinhos.
+        """
+        return media_vizinhos(l_privada, self.vizinhos)
+
+    def gera_ordens(
+        self,
+        precos_mercado: np.ndarray,
+        influencia: np.ndarray,
+        news: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Atualiza o sentimento de todos os agentes para todos os papéis, com
+        `precos_mercado` na ordem de `papeis` e `news` de formato agentes x
+        papéis. Com `usar_numba`, roda no kernel paralelo `decidir_ordens`.
+
+        :return: Máscara de compra e preços de expectativa, agentes x papéis.
+        """
+        if self.usar_numba:
+            return decidir_ordens(precos_mercado, influencia, news, self.sentimento)
+
+        np.clip(influencia[:, None] + 0.05 * news, -1, 1, out=self.sentimento)
+        preco_expectativa = precos_mercado * np.exp(self.sentimento / 10)
+        return self.sentimento > 0, preco_expectativa
+
+    def liquidar(
+        self,
+        papel: int,
+        compradores: np.ndarray,
+        vendedores: np.ndarray,
+        quantidades: np.ndarray,
+        precos: np.ndarray,
+    ) -> None:
+        """
+        Aplica de uma vez os negócios de um papel aos caixas e às carteiras.
+        `np.add.at` acumula os índices repetidos (um agente com vários negócios).
+        """
+        valores = quantidades * precos
+        np.add.at(self.caixa, compradores, -valores)
+        np.add.at(self.caixa, vendedores, valores)
+        cotas = self.carteiras[:, papel]
+        np.add.at(cotas, compradores, quantidades)
+        np.add.at(cotas, vendedores, -quantidades)
+
+    def carteira(self, i: int) -> Dict[str, int]:
+        """
+        Carteira do agente i como dicionário, sem as posições zeradas.
+        """
+        return {
+            papel: quantidade
+            for papel, quantidade in zip(self.papeis, self.carteiras[i].tolist())
+            if quantidade
+        }
+
+    def atualiza_patrimonio(self, rodada: int, precos: np.ndarray) -> None:
+        """
+        Registra o patrimônio de cada agente ao fim da rodada, com `precos`
+        na mesma ordem de `papeis`.
+        """
+        self.patrimonio[:, rodada + 1] = self.caixa + self.carteiras @ precos
+
+    def sincroniza_agentes(self) -> None:
+        """
+        Copia o estado final dos vetores para os objetos `Agente`; o
+        histórico de patrimônio de cada agente passa a ser uma visão da sua
+        linha em `patrimonio`, sem cópia.
+        """
+        for i, agente in enumerate(self.agentes):
+            agente.caixa = float(self.caixa[i])
+            agente.carteira = self.carteira(i)
+            agente.vizinhos = [self.agentes[j] for j in self.vizinhos[i]]
+            agente.sentimento = float(self.sentimento[i, -1])
+            agente.patrimonio = self.patrimonio[i]
+
+
+@dataclass(slots=True)
 class Mercado:
     ativos: Dict[str, float]
     fundos_imobiliarios: Dict[str, FundoImobiliario] = field(default_factory=dict)
 
-    def pagar_dividendos(self, agentes: List["Agente"]) -> None:
+    def __getitem__(self, ativo: str) -> float:
+        if ativo in self.fundos_imobiliarios:
+            return self.fundos_imobiliarios[ativo].preco_cota
+        return self.ativos[ativo]
+
+    def __setitem__(self, ativo: str, preco: float) -> None:
+        # Cotas de fundos são negociadas no mesmo livro, mas o preço fica no fundo
+        if ativo in self.fundos_imobiliarios:
+            self.fundos_imobiliarios[ativo].preco_cota = preco
+        else:
+            self.ativos[ativo] = preco
+
+    def pagar_dividendos(self, pool: "PoolAgentes") -> None:
         for fundo in self.fundos_imobiliarios.values():
-            for agente in agentes:
-                num_cotas = agente.carteira.get(fundo.nome, 0)
-                if num_cotas > 0:
-                    dividendos = fundo.calcular_dividendos(num_cotas)
-                    agente.caixa += dividendos
-                    print(
-                        f"[DIVIDENDOS] {agente.nome} recebeu {dividendos:.2f} de dividendos do fundo {fundo.nome}."
-                    )
+            cotas = pool.carteiras[:, pool.papeis.index(fundo.nome)]
+            for i in np.flatnonzero(cotas > 0).tolist():
+                agente = pool.agentes[i]
+                dividendos = fundo.calcular_dividendos(int(cotas[i]))
+                pool.caixa[i] += dividendos
+                log.debug(
+                    "[DIVIDENDOS] %s recebeu %.2f de dividendos do fundo %s.",
+                    agente.nome,
+                    dividendos,
+                    fundo.nome,
+                )
+
+
+def executar_negocios(
+    order_book: OrderBook, ativo: str, mercado: Mercado, pool: PoolAgentes
+) -> None:
+    """
+    Casa as ordens de `ativo`, acumula os negócios no `pool` e registra no
+    mercado o preço do último negócio.
+    """
+    compradores, vendedores, quantidades, precos = order_book.executar_ordens(ativo)
+    pool.liquidar(
+        pool.papeis.index(ativo), compradores, vendedores, quantidades, precos
+    )
+    if len(precos):
+        mercado[ativo] = float(precos[-1])
 
 
-def main():
+def main(seed: Optional[int] = None):
     num_agentes = 10
     num_rodadas = 20
 
@@ -221,131 +278,165 @@ def main():
         },
     )
     order_book = OrderBook()
+    rng = np.random.default_rng(seed)
 
-    # Criação dos agentes
+    # Criação dos agentes; os preços iniciais são os mesmos para todos
+    precos_iniciais = {
+        **mercado.ativos,
+        **{f.nome: f.preco_cota for f in mercado.fundos_imobiliarios.values()},
+    }
+    # Saldos e carteiras sorteados em lote, do mesmo gerador da simulação
+    saldos = rng.uniform(1000, 5000, num_agentes).tolist()
+    cotas = rng.integers(0, 51, (num_agentes, len(mercado.ativos))).tolist()
     agentes = [
         Agente(
+            indice=i,
             nome=f"Agente {i+1}",
-            saldo=random.uniform(1000, 5000),
-            carteira={ativo: random.randint(0, 50) for ativo in mercado.ativos.keys()},
-            precos_mercado={
-                **mercado.ativos,
-                **{f.nome: f.preco_cota for f in mercado.fundos_imobiliarios.values()},
-            },
+            saldo=saldos[i],
+            carteira=dict(zip(mercado.ativos, cotas[i])),
+            precos_mercado=precos_iniciais,
         )
         for i in range(num_agentes)
     ]
-
-    historico_precos = {ativo: [] for ativo in mercado.ativos.keys()}
-    historico_precos.update(
-        {fii.nome: [] for fii in mercado.fundos_imobiliarios.values()}
+    pool = PoolAgentes(
+        agentes,
+        list(mercado.ativos) + list(mercado.fundos_imobiliarios),
+        num_rodadas,
     )
-    historico_patrimonios = {agente.nome: [] for agente in agentes}
+
+    # Linha k: preço de `pool.papeis[k]` ao fim de cada rodada
+    historico_precos = np.empty((len(pool.papeis), num_rodadas))
 
     for rodada in range(num_rodadas):
-        print(f"\n--- RODADA {rodada + 1} ---")
-
-        # Atualiza vizinhos e gera ordens
-        for agente in agentes:
-            agente.atualiza_vizinhos(agentes)
-            for ativo, preco in mercado.ativos.items():
-                ordem = agente.gera_ordem(ativo, preco)
-                order_book.adicionar_ordem(ordem)
-                print(
-                    f"[DECISÃO] {agente.nome} {ordem.tipo.upper()} {ordem.quantidade} de {ativo} "
-                    f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
-                )
-            for fii_nome, fii in mercado.fundos_imobiliarios.items():
-                ordem = agente.gera_ordem(fii_nome, fii.preco_cota)
-                order_book.adicionar_ordem(ordem)
-                print(
-                    f"[DECISÃO] {agente.nome} {ordem.tipo.upper()} {ordem.quantidade} de {fii_nome} "
-                    f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
+        depurar = log.isEnabledFor(logging.DEBUG)
+        if depurar:
+            log.debug(f"\n--- RODADA {rodada + 1} ---")
+
+        pool.atualiza_vizinhos(rng)
+        # O patrimônio só muda ao fim da rodada: l_privada e l_social valem
+        # para todos os papéis
+        l_privada = pool.calcula_l_privada(rodada)
+        influencia = 0.2 * l_privada + 0.3 * pool.calcula_l_social(l_privada)
+
+        # Notícias de todos os agentes para todos os papéis, num único sorteio
+        news = rng.standard_normal((num_agentes, len(pool.papeis)))
+
+        # Gera ordens de ações e FIIs, decididas para todos os papéis de uma vez
+        precos_mercado = np.array([mercado[papel] for papel in pool.papeis])
+        decisoes, expectativas = pool.gera_ordens(precos_mercado, influencia, news)
+        for coluna, ativo in enumerate(pool.papeis):
+            compra, precos = decisoes[:, coluna], expectativas[:, coluna]
+            # Quantidade fixa de 1 por ordem
+            quantidades = np.ones(num_agentes, dtype=np.int64)
+            order_book.adicionar_lote(ativo, compra, precos, quantidades)
+            if depurar:
+                log.debug(
+                    "\n".join(
+                        f"[DECISÃO] {agente.nome} {tipo.upper()} 1 de {ativo} "
+                        f"por {'até' if tipo == 'compra' else 'pelo menos'} {preco_limite:.2f}"
+                        for agente, tipo, preco_limite in zip(
+                            agentes,
+                            np.where(compra, "compra", "venda").tolist(),
+                            precos.tolist(),
+                        )
+                    )
                 )
 
         # Executa ordens para ativos tradicionais
         for ativo in mercado.ativos.keys():
-            print(f"[EXECUTANDO ORDENS] Para o ativo {ativo}")
-            order_book.executar_ordens(ativo, mercado)
-            historico_precos[ativo].append(mercado.ativos[ativo])
-            print(f"[PREÇO ATUALIZADO] {ativo}: {mercado.ativos[ativo]:.2f}")
+            executar_negocios(order_book, ativo, mercado, pool)
+            if depurar:
+                log.debug(
+                    f"[EXECUTANDO ORDENS] Para o ativo {ativo}\n"
+                    f"[PREÇO ATUALIZADO] {ativo}: {mercado.ativos[ativo]:.2f}"
+                )
 
         # Executa ordens para FIIs
         for fii_nome, fii in mercado.fundos_imobiliarios.items():
-            print(f"[EXECUTANDO ORDENS] Para o fundo imobiliário {fii_nome}")
-            order_book.executar_ordens(fii_nome, mercado)
-            historico_precos[fii_nome].append(fii.preco_cota)
-            print(f"[PREÇO ATUALIZADO] {fii_nome}: {fii.preco_cota:.2f}")
+            executar_negocios(order_book, fii_nome, mercado, pool)
+            if depurar:
+                log.debug(
+                    f"[EXECUTANDO ORDENS] Para o fundo imobiliário {fii_nome}\n"
+                    f"[PREÇO ATUALIZADO] {fii_nome}: {fii.preco_cota:.2f}"
+                )
+
+        historico_precos[:, rodada] = [mercado[papel] for papel in pool.papeis]
 
         # Atualiza patrimônio dos agentes
-        print(f"\n[RESUMO DA RODADA {rodada + 1}]")
-        for agente in agentes:
-            agente.atualiza_patrimonio(mercado.ativos, mercado.fundos_imobiliarios)
-            historico_patrimonios[agente.nome].append(agente.patrimonio[-1])
-            print(
-                f"{agente.nome}: Patrimônio: {agente.patrimonio[-1]:.2f} | Caixa: {agente.caixa:.2f} | "
-                f"Carteira: {agente.carteira}"
+        pool.atualiza_patrimonio(rodada, historico_precos[:, rodada])
+
+        # Resumo da rodada, registrado como uma única mensagem
+        if depurar:
+            linhas = [f"\n[RESUMO DA RODADA {rodada + 1}]"]
+            linhas.extend(
+                f"{agente.nome}: Patrimônio: {patrimonio:.2f} | Caixa: {caixa:.2f} | "
+                f"Carteira: {pool.carteira(i)}"
+                for i, (agente, patrimonio, caixa) in enumerate(
+                    zip(
+                        agentes,
+                        pool.patrimonio[:, rodada + 1].tolist(),
+                        pool.caixa.tolist(),
+                    )
+                )
             )
+            log.debug("\n".join(linhas))
 
-    # Garante que todos os históricos estejam consistentes
-    for ativo, precos in historico_precos.items():
-        historico_precos[ativo] = normalizar_tamanho(precos, num_rodadas)
+    pool.sincroniza_agentes()
+    # Histórico de patrimônio por agente, sem a coluna inicial
+    historico_patrimonios = {agente.nome: agente.patrimonio[1:] for agente in agentes}
 
+    # Garante que todos os históricos estejam consistentes
     for agente, patrimonios in historico_patrimonios.items():
         historico_patrimonios[agente] = normalizar_tamanho(patrimonios, num_rodadas)
 
     # Cálculo de volatilidade e gráficos
-    plotar_resultados(historico_precos, historico_patrimonios, num_rodadas)
+    plotar_resultados(pool.papeis, historico_precos, historico_patrimonios, num_rodadas)
 
 
 def normalizar_tamanho(lista, tamanho, valor_padrao=0):
     """
-    Normaliza o tamanho de uma lista para o valor especificado.
+    Normaliza o tamanho de uma lista (ou vetor NumPy) para o valor especificado.
     Preenche com o último valor conhecido ou um valor padrão.
     """
-    while len(lista) < tamanho:
-        lista.append(lista[-1] if lista else valor_padrao)
-    if len(lista) > tamanho:
-        lista = lista[:tamanho]
-    return lista
-
-
-def plotar_resultados(historico_precos, historico_patrimonios, num_rodadas):
-    # Garantir que todos os históricos estejam normalizados
-    for ativo, precos in historico_precos.items():
-        historico_precos[ativo] = normalizar_tamanho(precos, num_rodadas)
-    for agente, patrimonios in historico_patrimonios.items():
-        historico_patrimonios[agente] = normalizar_tamanho(patrimonios, num_rodadas)
-
-    # Cálculo de volatilidade
-    volatilidade = {
-        ativo: [
-            (
-                100
-                * (historico_precos[ativo][i] - historico_precos[ativo][i - 1])
-                / historico_precos[ativo][i - 1]
-                if i > 0
-                else 0
-            )
-            for i in range(len(historico_precos[ativo]))
-        ]
-        for ativo in historico_precos.keys()
-    }
-    volatilidade_media = {
-        ativo: round(np.std(var), 2) for ativo, var in volatilidade.items()
-    }
+    faltam = tamanho - len(lista)
+    if faltam > 0:
+        preenchimento = lista[-1] if len(lista) else valor_padrao
+        if isinstance(lista, np.ndarray):
+            return np.pad(lista, (0, faltam), constant_values=preenchimento)
+        lista.extend([preenchimento] * faltam)
+    return lista[:tamanho]
+
+
+def plotar_resultados(
+    papeis: List[str],
+    historico_precos: np.ndarray,
+    historico_patrimonios: Dict[str, List[float]],
+    num_rodadas: int,
+) -> None:
+    """
+    Plota preços, variações percentuais e patrimônios. A linha k de
+    `historico_precos` corresponde a `papeis[k]`.
+    """
+    # `main` já normaliza os históricos; aqui só se confere (ignorado com -O)
+    assert historico_precos.shape[1] == num_rodadas
+    assert all(len(p) == num_rodadas for p in historico_patrimonios.values())
+
+    # Variação percentual rodada a rodada (zero na primeira) e volatilidade
+    variacoes = np.zeros_like(historico_precos)
+    variacoes[:, 1:] = (
+        100 * np.diff(historico_precos, axis=1) / historico_precos[:, :-1]
+    )
+    volatilidade_media = np.round(np.std(variacoes, axis=1), 2)
 
     # Gráficos
     plt.figure(figsize=(12, 8))
 
     # Gráfico 1: Evolução dos preços
     plt.subplot(3, 1, 1)
-    for ativo, precos in historico_precos.items():
-        plt.plot(
-            range(num_rodadas),
-            precos,
-            label=f"{ativo} (Vol: {volatilidade_media[ativo]}%)",
-        )
+    for ativo, precos, volatilidade in zip(
+        papeis, historico_precos, volatilidade_media.tolist()
+    ):
+        plt.plot(range(num_rodadas), precos, label=f"{ativo} (Vol: {volatilidade}%)")
     plt.xlabel("Rodadas")
     plt.ylabel("Preços")
     plt.title("Evolução dos Preços dos Ativos e FIIs")
@@ -354,8 +445,8 @@ def plotar_resultados(historico_precos, historico_patrimonios, num_rodadas):
 
     # Gráfico 2: Variações percentuais nos preços
     plt.subplot(3, 1, 2)
-    for ativo, variacoes in volatilidade.items():
-        plt.plot(range(num_rodadas), variacoes, label=f"Variação {ativo}")
+    for ativo, variacao in zip(papeis, variacoes):
+        plt.plot(range(num_rodadas), variacao, label=f"Variação {ativo}")
     plt.xlabel("Rodadas")
     plt.ylabel("Variação Percentual (%)")
     plt.title("Variações Percentuais nos Preços dos Ativos e FIIs")
@@ -377,4 +468,7 @@ def plotar_resultados(historico_precos, historico_patrimonios, num_rodadas):
 
 
 if __name__ == "__main__":
+    # Exibe as mensagens da simulação no stdout
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    log.setLevel(logging.DEBUG)
     main()
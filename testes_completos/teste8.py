@@ -1,11 +1,16 @@
-import random
-import math
+import logging
+import sys
 import matplotlib.pyplot as plt
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
 
+from livro_ordens import OrderBook
+from vetorizacao import media_vizinhos, sortear_vizinhos, variacao_patrimonio
+
+log = logging.getLogger(__name__)
+
 
 @dataclass
 class Ativo:
@@ -35,92 +40,14 @@ class FundoImobiliario:
         return num_cotas * self.preco_cota * self.rendimento_mensal
 
 
-@dataclass
-class Ordem:
-    tipo: str
-    agente: "Agente"
-    ativo: str
-    preco_limite: float
-    quantidade: int
-
-
-@dataclass
-class Transacao:
-    comprador: "Agente"
-    vendedor: "Agente"
-    ativo: str
-    quantidade: int
-    preco_execucao: float
-
-    def executar(self):
-        valor_total = self.quantidade * self.preco_execucao
-        self.comprador.saldo -= valor_total
-        self.vendedor.saldo += valor_total
-
-        # Atualiza a carteira do comprador
-        self.comprador.carteira[self.ativo] = (
-            self.comprador.carteira.get(self.ativo, 0) + self.quantidade
-        )
-
-        # Atualiza a carteira do vendedor
-        if self.ativo in self.vendedor.carteira:
-            self.vendedor.carteira[self.ativo] -= self.quantidade
-            if self.vendedor.carteira[self.ativo] == 0:
-                del self.vendedor.carteira[self.ativo]
-
-
-@dataclass
-class OrderBook:
-    ordens_compra: Dict[str, List[Ordem]] = field(default_factory=dict)
-    ordens_venda: Dict[str, List[Ordem]] = field(default_factory=dict)
-
-    def adicionar_ordem(self, ordem: Ordem):
-        if ordem.tipo == "compra":
-            self.ordens_compra.setdefault(ordem.ativo, []).append(ordem)
-        elif ordem.tipo == "venda":
-            self.ordens_venda.setdefault(ordem.ativo, []).append(ordem)
-
-    def executar_ordens(self, ativo, mercado):
-        if ativo in self.ordens_compra and ativo in self.ordens_venda:
-            self.ordens_compra[ativo].sort(key=lambda x: x.preco_limite, reverse=True)
-            self.ordens_venda[ativo].sort(key=lambda x: x.preco_limite)
-
-            while self.ordens_compra[ativo] and self.ordens_venda[ativo]:
-                ordem_compra = self.ordens_compra[ativo][0]
-                ordem_venda = self.ordens_venda[ativo][0]
-
-                if ordem_compra.preco_limite >= ordem_venda.preco_limite:
-                    preco_execucao = (
-                        ordem_compra.preco_limite + ordem_venda.preco_limite
-                    ) / 2
-                    quantidade_exec = min(
-                        ordem_compra.quantidade, ordem_venda.quantidade
-                    )
-
-                    transacao = Transacao(
-                        comprador=ordem_compra.agente,
-                        vendedor=ordem_venda.agente,
-                        ativo=ativo,
-                        quantidade=quantidade_exec,
-                        preco_execucao=preco_execucao,
-                    )
-                    transacao.executar()
-
-                    mercado.ativos[ativo] = preco_execucao
-
-                    ordem_compra.quantidade -= quantidade_exec
-                    ordem_venda.quantidade -= quantidade_exec
-
-                    if ordem_compra.quantidade == 0:
-                        self.ordens_compra[ativo].pop(0)
-                    if ordem_venda.quantidade == 0:
-                        self.ordens_venda[ativo].pop(0)
-                else:
-                    break
-
-
 @dataclass
 class Agente:
+    """
+    Os parâmetros de comportamento, o saldo e a carteira são copiados para o
+    `PoolAgentes`, onde as decisões e os negócios são calculados; o estado
+    final é sincronizado de volta ao término da simulação.
+    """
+
     nome: str
     saldo: float
     carteira: Dict[str, int]
@@ -135,109 +62,19 @@ class Agente:
     )
     comportamento_ruido: float  # Entre 0 e 1, maior valor indica maior impacto de ruído
     expectativa_inflacao: float  # Expectativa do agente em relação à inflação
+    tau: int  # Tempo observado, sorteado pelo gerador da simulação
     patrimonio: List[float] = field(default_factory=list)
-    tau: int = field(init=False)
     volatilidade_percebida: float = field(default=0.0, init=False)
+    indice: int = 0  # Posição do agente nos vetores do `PoolAgentes`
 
     def __post_init__(self):
-        self.tau = random.randint(22, 252)  # Sorteio do tempo observado.
-
-    def calcular_volatilidade_percebida(self, historico_precos: List[float]):
-        if len(historico_precos) >= self.tau:
-            retornos = [
-                math.log(historico_precos[i] / historico_precos[i - 1])
-                for i in range(1, self.tau)
-            ]
-            self.volatilidade_percebida = np.std(retornos)
-        else:
-            self.volatilidade_percebida = 0.0
-
-    def calcular_risco_desejado(self) -> float:
-        risco_base = (self.sentimento + 1) * self.volatilidade_percebida / 2
-        fator_especulacao = self.comportamento_especulador * 0.2
-        fator_ruido = self.comportamento_ruido * 0.1
-        return risco_base + fator_especulacao - fator_ruido
-
-    def ajustar_preco_por_inflacao(self, preco: float) -> float:
-        return preco * (1 + self.expectativa_inflacao)
-
-    def calcular_quantidade_baseada_em_risco(self, risco_desejado: float) -> float:
-        if self.volatilidade_percebida > 0:
-            return risco_desejado / self.volatilidade_percebida
-        return 0.0
-
-    def tomar_decisao(self, mercado, order_book):
-        for ativo, preco in mercado.ativos.items():
-            self.calcular_volatilidade_percebida(mercado.historico_precos[ativo])
-            risco_desejado = self.calcular_risco_desejado()
-            quantidade = max(
-                1, int(self.calcular_quantidade_baseada_em_risco(risco_desejado))
-            )
+        self.vizinhos: List["Agente"] = []
 
-            prob_compra = random.uniform(0, 1)
-            if prob_compra > 0.5:  # Compra
-                preco_limite = preco * random.uniform(0.98, 1.02)
-                ordem = Ordem("compra", self, ativo, preco_limite, quantidade)
-            else:  # Venda
-                quantidade = random.randint(1, self.carteira.get(ativo, 0))
-                preco_limite = preco * random.uniform(0.98, 1.02)
-                ordem = Ordem("venda", self, ativo, preco_limite, quantidade)
-            order_book.adicionar_ordem(ordem)
-
-    def calcula_l_privada(self) -> float:
-        if len(self.patrimonio) > 22:
-            patrimonio_t = self.patrimonio[-1]
-            patrimonio_t_22 = self.patrimonio[-22]
-            return (patrimonio_t / patrimonio_t_22) - 1
-        return 0.0
-
-    def calcula_l_social(self) -> float:
-        if self.vizinhos:
-            return sum(vizinho.calcula_l_privada() for vizinho in self.vizinhos) / len(
-                self.vizinhos
-            )
-        return 0.0
-
-    def sorteia_news(self) -> float:
-        return random.gauss(0, 1)
-
-    def atualiza_sentimento(self) -> None:
-        l_privada = self.calcula_l_privada()
-        l_social = self.calcula_l_social()
-        news = self.sorteia_news()
-        sentimento_bruto = 0.2 * l_privada + 0.3 * l_social + 0.05 * news
-        self.sentimento = max(-1, min(1, sentimento_bruto))
-
-    def calcula_preco_expectativa(self, preco_mercado: float) -> float:
-        ajuste_literacia = self.literacia_financeira * 0.1
-        ajuste_comportamento = self.comportamento_especulador * 0.15
-        return preco_mercado * math.exp(
-            (self.sentimento + ajuste_literacia - ajuste_comportamento) / 10
-        )
-
-    def gerar_ordem(self, ativo: str, preco_mercado: float) -> Ordem:
-        self.atualiza_sentimento()
-        preco_ajustado = self.ajustar_preco_por_inflacao(preco_mercado)
-        preco_expectativa = self.calcula_preco_expectativa(preco_ajustado)
-        quantidade = max(
-            1,
-            int(
-                self.calcular_quantidade_baseada_em_risco(
-                    self.calcular_risco_desejado()
-                )
-            ),
-        )
-        tipo_ordem = "compra" if self.sentimento > 0 else "venda"
-        return Ordem(tipo_ordem, self, ativo, preco_expectativa, quantidade)
-
-    def atualiza_vizinhos(self, agentes: List["Agente"], max_vizinhos: int = 3) -> None:
-        self.vizinhos = random.sample(agentes, min(len(agentes), max_vizinhos))
-
-    def atualiza_patrimonio(
+    def calcula_patrimonio(
         self,
         precos_mercado: Dict[str, float],
         fundos_imobiliarios: Dict[str, FundoImobiliario],
-    ) -> None:
+    ) -> float:
         valor_ativos = sum(
             precos_mercado.get(ativo, 0) * quantidade
             for ativo, quantidade in self.carteira.items()
@@ -248,7 +85,184 @@ class Agente:
             for ativo, quantidade in self.carteira.items()
             if fundo_nome == ativo
         )
-        self.patrimonio.append(self.saldo + valor_ativos + valor_fundos)
+        return self.saldo + valor_ativos + valor_fundos
+
+
+@dataclass
+class PoolAgentes:
+    """
+    Parâmetros e estado de comportamento dos agentes como estrutura de
+    vetores (SoA): a linha i corresponde a `agentes[i]` e a coluna k de
+    `sentimento` ao papel `papeis[k]`. As decisões de uma rodada são
+    calculadas com expressões vetorizadas sobre todos os agentes.
+    """
+
+    agentes: List[Agente]
+    papeis: List[str]
+    num_rodadas: int
+    max_vizinhos: int = 3
+    literacia: np.ndarray = field(init=False)
+    especulador: np.ndarray = field(init=False)
+    ruido: np.ndarray = field(init=False)
+    inflacao: np.ndarray = field(init=False)
+    tau: np.ndarray = field(init=False)
+    volatilidade_percebida: np.ndarray = field(init=False)
+    sentimento: np.ndarray = field(init=False)
+    vizinhos: np.ndarray = field(init=False)
+    saldo: np.ndarray = field(init=False)
+    carteiras: np.ndarray = field(init=False)
+    patrimonio: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        num_agentes = len(self.agentes)
+        self.saldo = np.array([agente.saldo for agente in self.agentes])
+        # Coluna k: quantidade de `papeis[k]` na carteira de cada agente
+        self.carteiras = np.array(
+            [
+                [agente.carteira.get(papel, 0) for papel in self.papeis]
+                for agente in self.agentes
+            ],
+            dtype=np.int64,
+        )
+        self.literacia = np.array([a.literacia_financeira for a in self.agentes])
+        self.especulador = np.array([a.comportamento_especulador for a in self.agentes])
+        self.ruido = np.array([a.comportamento_ruido for a in self.agentes])
+        self.inflacao = np.array([a.expectativa_inflacao for a in self.agentes])
+        self.tau = np.array([a.tau for a in self.agentes], dtype=np.int64)
+        self.volatilidade_percebida = np.array(
+            [a.volatilidade_percebida for a in self.agentes]
+        )
+        self.sentimento = np.zeros((num_agentes, len(self.papeis)))
+        self.vizinhos = np.empty(
+            (num_agentes, min(num_agentes, self.max_vizinhos)), dtype=np.int64
+        )
+        # Coluna t: patrimônio de cada agente ao fim da rodada t
+        self.patrimonio = np.empty((num_agentes, self.num_rodadas))
+
+    def atualiza_vizinhos(self, rng: np.random.Generator) -> None:
+        """
+        Sorteia, para cada agente, os índices de seus vizinhos, sem repetição.
+        """
+        sortear_vizinhos(self.vizinhos, rng)
+
+    def calcula_l_privada(self, rodada: int) -> np.ndarray:
+        """
+        Variação percentual do patrimônio em 22 períodos, para todos os agentes
+        de uma vez, a partir das rodadas já encerradas.
+        """
+        return variacao_patrimonio(self.patrimonio, rodada - 1)
+
+    def calcula_l_social(self, l_privada: np.ndarray) -> np.ndarray:
+        """
+        Média do l_privada dos vizinhos.
+        """
+        return media_vizinhos(l_privada, self.vizinhos)
+
+    def calcula_volatilidade_percebida(self, log_precos: np.ndarray) -> None:
+        """
+        Desvio padrão dos log-retornos dos últimos `tau` preços, por agente;
+        zero para quem ainda não observou `tau` preços. Recebe o histórico
+        já em logaritmo (`Mercado.log_precos`).
+        """
+        self.volatilidade_percebida = np.zeros(len(self.agentes))
+        observou = self.tau <= len(log_precos)
+        if observou.any():
+            retornos = np.diff(log_precos)
+            # Somas acumuladas dão média e variância de cada janela de uma vez
+            soma = np.concatenate(([0.0], np.cumsum(retornos)))
+            soma_quadrados = np.concatenate(([0.0], np.cumsum(retornos**2)))
+            n = self.tau[observou] - 1
+            fim = len(retornos)
+            media = (soma[fim] - soma[fim - n]) / n
+            variancia = (soma_quadrados[fim] - soma_quadrados[fim - n]) / n - media**2
+            self.volatilidade_percebida[observou] = np.sqrt(np.maximum(variancia, 0))
+
+    def calcula_risco_desejado(self, sentimento: np.ndarray) -> np.ndarray:
+        risco_base = (sentimento + 1) * self.volatilidade_percebida / 2
+        return risco_base + self.especulador * 0.2 - self.ruido * 0.1
+
+    def calcula_quantidades(self, risco_desejado: np.ndarray) -> np.ndarray:
+        """
+        Quantidade proporcional ao risco desejado, com mínimo de 1; sem
+        volatilidade percebida, só o mínimo.
+        """
+        quantidades = np.zeros(len(self.agentes), dtype=np.int64)
+        com_volatilidade = self.volatilidade_percebida > 0
+        # `astype` trunca em direção a zero, como `int()`
+        quantidades[com_volatilidade] = (
+            risco_desejado[com_volatilidade]
+            / self.volatilidade_percebida[com_volatilidade]
+        ).astype(np.int64)
+        return np.maximum(quantidades, 1)
+
+    def gera_ordens(
+        self,
+        coluna: int,
+        preco_mercado: float,
+        l_privada: np.ndarray,
+        l_social: np.ndarray,
+        news: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Atualiza o sentimento de todos os agentes para o papel `papeis[coluna]`
+        e retorna a máscara de compras, os preços de expectativa e as quantidades.
+        """
+        sentimento = np.clip(0.2 * l_privada + 0.3 * l_social + 0.05 * news, -1, 1)
+        self.sentimento[:, coluna] = sentimento
+        preco_ajustado = preco_mercado * (1 + self.inflacao)
+        preco_expectativa = preco_ajustado * np.exp(
+            (sentimento + self.literacia * 0.1 - self.especulador * 0.15) / 10
+        )
+        quantidades = self.calcula_quantidades(self.calcula_risco_desejado(sentimento))
+        return sentimento > 0, preco_expectativa, quantidades
+
+    def liquidar(
+        self,
+        papel: int,
+        compradores: np.ndarray,
+        vendedores: np.ndarray,
+        quantidades: np.ndarray,
+        precos: np.ndarray,
+    ) -> None:
+        """
+        Aplica de uma vez os negócios de um papel aos saldos e às carteiras.
+        `np.add.at` acumula os índices repetidos (um agente com vários negócios).
+        """
+        valores = quantidades * precos
+        np.add.at(self.saldo, compradores, -valores)
+        np.add.at(self.saldo, vendedores, valores)
+        cotas = self.carteiras[:, papel]
+        np.add.at(cotas, compradores, quantidades)
+        np.add.at(cotas, vendedores, -quantidades)
+
+    def carteira(self, i: int) -> Dict[str, int]:
+        """
+        Carteira do agente i como dicionário, sem as posições zeradas.
+        """
+        return {
+            papel: quantidade
+            for papel, quantidade in zip(self.papeis, self.carteiras[i].tolist())
+            if quantidade
+        }
+
+    def atualiza_patrimonio(self, rodada: int, precos: np.ndarray) -> None:
+        """
+        Registra o patrimônio de cada agente ao fim da rodada, com `precos`
+        na mesma ordem de `papeis`.
+        """
+        self.patrimonio[:, rodada] = self.saldo + self.carteiras @ precos
+
+    def sincroniza_agentes(self) -> None:
+        """
+        Copia o estado final dos vetores para os objetos `Agente`.
+        """
+        for i, agente in enumerate(self.agentes):
+            agente.saldo = float(self.saldo[i])
+            agente.carteira = self.carteira(i)
+            agente.vizinhos = [self.agentes[j] for j in self.vizinhos[i]]
+            agente.sentimento = float(self.sentimento[i, -1])
+            agente.volatilidade_percebida = float(self.volatilidade_percebida[i])
+            agente.patrimonio = self.patrimonio[i]
 
 
 @dataclass
@@ -270,20 +284,61 @@ class FundoImobiliario:
 class Mercado:
     ativos: Dict[str, float]
     fundos_imobiliarios: Dict[str, FundoImobiliario] = field(default_factory=dict)
+    num_rodadas: int = 0
+    papeis: List[str] = field(init=False)
+    historico_precos: np.ndarray = field(init=False)
+    historico_log_precos: np.ndarray = field(init=False)
+    rodadas_registradas: int = field(default=0, init=False)
 
-    def pagar_dividendos(self, agentes: List["Agente"]) -> None:
-        for fundo in self.fundos_imobiliarios.values():
-            for agente in agentes:
-                num_cotas = agente.carteira.get(fundo.nome, 0)
-                if num_cotas > 0:
-                    dividendos = fundo.calcular_dividendos(num_cotas)
-                    agente.caixa += dividendos
-                    print(
-                        f"[DIVIDENDOS] {agente.nome} recebeu {dividendos:.2f} de dividendos do fundo {fundo.nome}."
-                    )
+    def __post_init__(self):
+        self.papeis = list(self.ativos) + list(self.fundos_imobiliarios)
+        # Linha k: preço de fechamento de `papeis[k]` em cada rodada, alocado
+        # de uma vez; o logaritmo é guardado junto para a volatilidade
+        self.historico_precos = np.empty((len(self.papeis), self.num_rodadas))
+        self.historico_log_precos = np.empty_like(self.historico_precos)
+
+    def registra_precos(self) -> None:
+        coluna = self.rodadas_registradas
+        self.historico_precos[:, coluna] = [self[papel] for papel in self.papeis]
+        self.historico_log_precos[:, coluna] = np.log(self.historico_precos[:, coluna])
+        self.rodadas_registradas += 1
+
+    def log_precos(self, papel: str) -> np.ndarray:
+        """
+        Logaritmo dos preços de fechamento já registrados de `papel` (uma view).
+        """
+        linha = self.papeis.index(papel)
+        return self.historico_log_precos[linha, : self.rodadas_registradas]
+
+    def __getitem__(self, ativo: str) -> float:
+        if ativo in self.fundos_imobiliarios:
+            return self.fundos_imobiliarios[ativo].preco_cota
+        return self.ativos[ativo]
+
+    def __setitem__(self, ativo: str, preco: float) -> None:
+        # Cotas de fundos são negociadas no mesmo livro, mas o preço fica no fundo
+        if ativo in self.fundos_imobiliarios:
+            self.fundos_imobiliarios[ativo].preco_cota = preco
+        else:
+            self.ativos[ativo] = preco
 
 
-def main():
+def executar_negocios(
+    order_book: OrderBook, ativo: str, mercado: Mercado, pool: PoolAgentes
+) -> None:
+    """
+    Casa as ordens de `ativo`, liquida os negócios no `pool` e registra no
+    mercado o preço do último negócio.
+    """
+    compradores, vendedores, quantidades, precos = order_book.executar_ordens(ativo)
+    pool.liquidar(
+        pool.papeis.index(ativo), compradores, vendedores, quantidades, precos
+    )
+    if len(precos):
+        mercado[ativo] = float(precos[-1])
+
+
+def main(seed: Optional[int] = None):
     num_agentes = 10
     num_rodadas = 23
 
@@ -294,60 +349,75 @@ def main():
             "FII_A": FundoImobiliario(nome="FII_A", preco_cota=100.0),
             "FII_B": FundoImobiliario(nome="FII_B", preco_cota=150.0),
         },
+        num_rodadas=num_rodadas,
     )
     order_book = OrderBook()
+    rng = np.random.default_rng(seed)
+
+    # Perfis dos agentes sorteados em lote, do mesmo gerador da simulação
+    saldos = rng.uniform(1000, 5000, num_agentes).tolist()
+    cotas = rng.integers(0, 51, (num_agentes, 2)).tolist()
+    sentimentos = rng.uniform(-1, 1, num_agentes).tolist()
+    conhecimentos = rng.choice(["alto", "médio", "baixo"], num_agentes).tolist()
+    literacias = rng.uniform(0, 1, num_agentes).tolist()
+    especuladores = rng.uniform(0, 1, num_agentes).tolist()
+    ruidos = rng.uniform(0, 1, num_agentes).tolist()
+    inflacoes = rng.uniform(-0.02, 0.05, num_agentes).tolist()
+    taus = rng.integers(22, 253, num_agentes).tolist()
 
     agentes = [
         Agente(
+            indice=i,
             nome=f"Agente {i+1}",
-            saldo=random.uniform(1000, 5000),
-            carteira={"PETR4": random.randint(0, 50), "VALE3": random.randint(0, 50)},
-            sentimento=random.uniform(-1, 1),
+            saldo=saldos[i],
+            carteira={"PETR4": cotas[i][0], "VALE3": cotas[i][1]},
+            sentimento=sentimentos[i],
             expectativa=[40.0, 50.0, 60.0],
-            conhecimento=random.choice(["alto", "médio", "baixo"]),
-            literacia_financeira=random.uniform(0, 1),
-            comportamento_especulador=random.uniform(0, 1),
-            comportamento_ruido=random.uniform(0, 1),
-            expectativa_inflacao=random.uniform(-0.02, 0.05),
+            conhecimento=conhecimentos[i],
+            literacia_financeira=literacias[i],
+            comportamento_especulador=especuladores[i],
+            comportamento_ruido=ruidos[i],
+            expectativa_inflacao=inflacoes[i],
+            tau=taus[i],
         )
         for i in range(num_agentes)
     ]
+    pool = PoolAgentes(agentes, mercado.papeis, num_rodadas)
 
-    historico_precos = {ativo: [] for ativo in mercado.ativos.keys()}
-    historico_precos.update(
-        {fii.nome: [] for fii in mercado.fundos_imobiliarios.values()}
-    )
-    historico_patrimonios = {agente.nome: [] for agente in agentes}
     historico_valor_mercado = []  # Novo histórico para o valor total do mercado
 
     for rodada in range(num_rodadas):
-        print(f"\n--- RODADA {rodada + 1} ---")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"\n--- RODADA {rodada + 1} ---")
 
         # Definir a inflação para a rodada
-        taxa_inflacao = random.gauss(
+        taxa_inflacao = rng.normal(
             0.005, 0.002
         )  # Média de 0.5% ao mês com desvio padrão de 0.2%
         aplicar_inflacao(mercado, taxa_inflacao)
 
         # Atualiza vizinhos e gera ordens
-        for agente in agentes:
-            agente.atualiza_vizinhos(agentes)
-            gerar_e_adicionar_ordens(agente, mercado, order_book)
+        pool.atualiza_vizinhos(rng)
+        gerar_e_adicionar_ordens(pool, mercado, order_book, rng, rodada)
 
         # Executa ordens para ativos tradicionais e FIIs
-        executar_ordens_e_atualizar_precos(mercado, order_book, historico_precos)
+        executar_ordens_e_atualizar_precos(mercado, order_book, pool)
 
         # Atualiza patrimônio dos agentes
-        atualizar_patrimonio_agentes(agentes, mercado, historico_patrimonios, rodada)
+        atualizar_patrimonio_agentes(pool, mercado, rodada)
 
         # Calcula o valor total do mercado
-        valor_total_mercado = calcular_valor_total_mercado(mercado, agentes)
+        valor_total_mercado = calcular_valor_total_mercado(mercado, pool)
         historico_valor_mercado.append(valor_total_mercado)
 
         # Pagamento de dividendos no dia 22
         if (rodada + 1) % 22 == 0:
-            print(f"[DIVIDENDOS] Pagamento de dividendos no dia {rodada + 1}")
-            pagar_dividendos(mercado, agentes)
+            log.debug("[DIVIDENDOS] Pagamento de dividendos no dia %d", rodada + 1)
+            pagar_dividendos(mercado, pool)
+
+    pool.sincroniza_agentes()
+    historico_precos = dict(zip(mercado.papeis, mercado.historico_precos))
+    historico_patrimonios = {agente.nome: agente.patrimonio for agente in agentes}
 
     # Garante que todos os históricos estejam consistentes
     normalizar_historicos(historico_precos, historico_patrimonios, num_rodadas)
@@ -368,75 +438,103 @@ def aplicar_inflacao(mercado, taxa_inflacao):
     for fii in mercado.fundos_imobiliarios.values():
         fii.preco_cota *= 1 + taxa_inflacao
 
-    print(f"[INFLAÇÃO] Taxa aplicada: {taxa_inflacao * 100:.2f}%")
-
-
-def gerar_e_adicionar_ordens(agente, mercado, order_book):
-    for ativo, preco in mercado.ativos.items():
-        ordem = agente.gerar_ordem(ativo, preco)
-        order_book.adicionar_ordem(ordem)
-        print(
-            f"[DECISÃO] {agente.nome} {ordem.tipo.upper()} {ordem.quantidade} de {ativo} "
-            f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
-        )
-    for fii_nome, fii in mercado.fundos_imobiliarios.items():
-        ordem = agente.gerar_ordem(fii_nome, fii.preco_cota)
-        order_book.adicionar_ordem(ordem)
-        print(
-            f"[DECISÃO] {agente.nome} {ordem.tipo.upper()} {ordem.quantidade} de {fii_nome} "
-            f"por {'até' if ordem.tipo == 'compra' else 'pelo menos'} {ordem.preco_limite:.2f}"
+    log.debug("[INFLAÇÃO] Taxa aplicada: %.2f%%", taxa_inflacao * 100)
+
+
+def gerar_e_adicionar_ordens(pool, mercado, order_book, rng, rodada):
+    # O patrimônio só muda ao fim da rodada: l_privada e l_social valem para
+    # todos os papéis
+    l_privada = pool.calcula_l_privada(rodada)
+    l_social = pool.calcula_l_social(l_privada)
+    news = rng.standard_normal((len(pool.agentes), len(pool.papeis)))
+    depurar = log.isEnabledFor(logging.DEBUG)
+    for coluna, ativo in enumerate(pool.papeis):
+        # A volatilidade percebida define o tamanho das ordens de cada papel
+        pool.calcula_volatilidade_percebida(mercado.log_precos(ativo))
+        compra, precos, quantidades = pool.gera_ordens(
+            coluna, mercado[ativo], l_privada, l_social, news[:, coluna]
         )
+        order_book.adicionar_lote(ativo, compra, precos, quantidades)
+        # Uma mensagem por papel, montada só quando o nível DEBUG está ativo
+        if depurar:
+            log.debug(
+                "\n".join(
+                    f"[DECISÃO] {agente.nome} {'COMPRA' if eh_compra else 'VENDA'} {quantidade} de {ativo} "
+                    f"por {'até' if eh_compra else 'pelo menos'} {preco_limite:.2f}"
+                    for agente, eh_compra, preco_limite, quantidade in zip(
+                        pool.agentes,
+                        compra.tolist(),
+                        precos.tolist(),
+                        quantidades.tolist(),
+                    )
+                )
+            )
 
 
-def executar_ordens_e_atualizar_precos(mercado, order_book, historico_precos):
+def executar_ordens_e_atualizar_precos(mercado, order_book, pool):
+    depurar = log.isEnabledFor(logging.DEBUG)
     for ativo in mercado.ativos.keys():
-        print(f"[EXECUTANDO ORDENS] Para o ativo {ativo}")
-        order_book.executar_ordens(ativo, mercado)
-        historico_precos[ativo].append(mercado.ativos[ativo])
-        print(f"[PREÇO ATUALIZADO] {ativo}: {mercado.ativos[ativo]:.2f}")
+        executar_negocios(order_book, ativo, mercado, pool)
+        if depurar:
+            log.debug(
+                f"[EXECUTANDO ORDENS] Para o ativo {ativo}\n"
+                f"[PREÇO ATUALIZADO] {ativo}: {mercado.ativos[ativo]:.2f}"
+            )
 
     for fii_nome, fii in mercado.fundos_imobiliarios.items():
-        print(f"[EXECUTANDO ORDENS] Para o fundo imobiliário {fii_nome}")
-        order_book.executar_ordens(fii_nome, mercado)
-        historico_precos[fii_nome].append(fii.preco_cota)
-        print(f"[PREÇO ATUALIZADO] {fii_nome}: {fii.preco_cota:.2f}")
-
-
-def atualizar_patrimonio_agentes(agentes, mercado, historico_patrimonios, rodada):
-    print(f"\n[RESUMO DA RODADA {rodada + 1}]")
-    for agente in agentes:
-        agente.atualiza_patrimonio(mercado.ativos, mercado.fundos_imobiliarios)
-        historico_patrimonios[agente.nome].append(agente.patrimonio[-1])
-        print(
-            f"{agente.nome}: Patrimônio: {agente.patrimonio[-1]:.2f} | Saldo: {agente.saldo:.2f} | "
-            f"Carteira: {agente.carteira}"
+        executar_negocios(order_book, fii_nome, mercado, pool)
+        if depurar:
+            log.debug(
+                f"[EXECUTANDO ORDENS] Para o fundo imobiliário {fii_nome}\n"
+                f"[PREÇO ATUALIZADO] {fii_nome}: {fii.preco_cota:.2f}"
+            )
+
+    mercado.registra_precos()
+
+
+def atualizar_patrimonio_agentes(pool, mercado, rodada):
+    pool.atualiza_patrimonio(rodada, mercado.historico_precos[:, rodada])
+    # Resumo da rodada, registrado como uma única mensagem
+    if log.isEnabledFor(logging.DEBUG):
+        linhas = [f"\n[RESUMO DA RODADA {rodada + 1}]"]
+        linhas.extend(
+            f"{agente.nome}: Patrimônio: {patrimonio:.2f} | Saldo: {saldo:.2f} | "
+            f"Carteira: {pool.carteira(i)}"
+            for i, (agente, patrimonio, saldo) in enumerate(
+                zip(
+                    pool.agentes,
+                    pool.patrimonio[:, rodada].tolist(),
+                    pool.saldo.tolist(),
+                )
+            )
         )
+        log.debug("\n".join(linhas))
 
 
-def calcular_valor_total_mercado(mercado, agentes):
-    valor_total_mercado = sum(
-        mercado.ativos[ativo] * sum(agente.carteira.get(ativo, 0) for agente in agentes)
-        for ativo in mercado.ativos.keys()
-    )
-    valor_total_mercado += sum(
-        mercado.fundos_imobiliarios[fii].preco_cota
-        * sum(agente.carteira.get(fii, 0) for agente in agentes)
-        for fii in mercado.fundos_imobiliarios.keys()
-    )
-    return valor_total_mercado
+def calcular_valor_total_mercado(mercado, pool):
+    """
+    Valor de todas as ações e cotas em carteira, aos preços de fechamento
+    registrados na rodada: um único produto escalar com o total de cada papel.
+    """
+    precos = mercado.historico_precos[:, mercado.rodadas_registradas - 1]
+    return float(precos @ pool.carteiras.sum(axis=0))
 
 
-def pagar_dividendos(mercado, agentes):
-    print("\n[DIVIDENDOS] Pagamento de dividendos!")
+def pagar_dividendos(mercado, pool):
+    log.debug("\n[DIVIDENDOS] Pagamento de dividendos!")
     for fii_nome, fii in mercado.fundos_imobiliarios.items():
-        for agente in agentes:
-            num_cotas = agente.carteira.get(fii_nome, 0)
-            if num_cotas > 0:
-                dividendos = fii.calcular_dividendos(num_cotas)
-                agente.saldo += dividendos
-                print(
-                    f"{agente.nome} recebeu R${dividendos:.2f} de dividendos de {fii_nome} ({num_cotas} cotas)."
-                )
+        cotas = pool.carteiras[:, pool.papeis.index(fii_nome)]
+        for i in np.flatnonzero(cotas > 0).tolist():
+            num_cotas = int(cotas[i])
+            dividendos = fii.calcular_dividendos(num_cotas)
+            pool.saldo[i] += dividendos
+            log.debug(
+                "%s recebeu R$%.2f de dividendos de %s (%d cotas).",
+                pool.agentes[i].nome,
+                dividendos,
+                fii_nome,
+                num_cotas,
+            )
 
 
 def normalizar_historicos(historico_precos, historico_patrimonios, num_rodadas):
@@ -515,4 +613,6 @@ def plotar_resultados(
 
 
 if __name__ == "__main__":
+    logging.basicConfig(format="%(message)s", stream=sys.stdout)
+    log.setLevel(logging.DEBUG)
     main()
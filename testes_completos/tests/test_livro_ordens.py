@@ -0,0 +1,112 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Adicionar caminho do projeto para importações relativas
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from livro_ordens import OrderBook, casar_ordens, cruzar_ordens
+
+
+def sortear_livro(rng: np.random.Generator):
+    """
+    Sorteia um livro já em ordem de prioridade: compras em ordem decrescente
+    de preço e vendas em ordem crescente. Os preços são arredondados para
+    produzir empates e cruzamentos parciais.
+    """
+    n_compra, n_venda = rng.integers(1, 120, size=2)
+    precos_compra = -np.sort(-np.round(rng.uniform(95, 105, n_compra), 1))
+    precos_venda = np.sort(np.round(rng.uniform(95, 105, n_venda), 1))
+    quantidades_compra = rng.integers(1, 21, n_compra)
+    quantidades_venda = rng.integers(1, 21, n_venda)
+    return precos_compra, quantidades_compra, precos_venda, quantidades_venda
+
+
+class TestCruzarOrdens(unittest.TestCase):
+    """
+    Classe de testes do cruzamento vetorizado contra o laço de `casar_ordens`.
+    """
+
+    def test_mesmo_resultado_que_casar_ordens(self):
+        """
+        Testa se os dois kernels produzem os mesmos negócios e consomem as
+        mesmas quantidades em livros sorteados.
+        """
+        rng = np.random.default_rng(0)
+        for _ in range(2000):
+            precos_compra, qtd_compra, precos_venda, qtd_venda = sortear_livro(rng)
+            qtd_compra_laco, qtd_venda_laco = qtd_compra.copy(), qtd_venda.copy()
+
+            laco = casar_ordens(
+                precos_compra, qtd_compra_laco, precos_venda, qtd_venda_laco
+            )
+            vetor = cruzar_ordens(precos_compra, qtd_compra, precos_venda, qtd_venda)
+
+            n = laco[0]
+            self.assertEqual(vetor[0], n)
+            for esperado, obtido in zip(laco[1:5], vetor[1:5]):
+                np.testing.assert_array_equal(obtido[:n], esperado[:n])
+            self.assertEqual(vetor[5:], laco[5:])
+            np.testing.assert_array_equal(qtd_compra, qtd_compra_laco)
+            np.testing.assert_array_equal(qtd_venda, qtd_venda_laco)
+
+
+class TestOrderBook(unittest.TestCase):
+    """
+    Classe de testes para a classe OrderBook.
+    """
+
+    def executar_rodadas(self, usar_numba: bool, num_agentes: int):
+        """
+        Roda algumas rodadas de ordens sorteadas, com sobras entre rodadas, e
+        retorna todos os negócios.
+        """
+        rng = np.random.default_rng(1)
+        order_book = OrderBook(usar_numba=usar_numba)
+        negocios = []
+        for _ in range(5):
+            compra = rng.random(num_agentes) > 0.5
+            precos = np.round(rng.uniform(95, 105, num_agentes), 1)
+            quantidades = rng.integers(0, 11, num_agentes)
+            order_book.adicionar_lote("PETR4", compra, precos, quantidades)
+            negocios.append(order_book.executar_ordens("PETR4"))
+        return negocios
+
+    def test_cruzamento_vetorizado_igual_ao_laco(self):
+        """
+        Testa se o livro casa igual com o laço e com o cruzamento vetorizado,
+        usado sem numba em livros com pelo menos `MIN_ORDENS_CRUZAMENTO` ordens.
+        """
+        laco = self.executar_rodadas(usar_numba=True, num_agentes=200)
+        vetor = self.executar_rodadas(usar_numba=False, num_agentes=200)
+        for esperado, obtido in zip(laco, vetor):
+            for a, b in zip(esperado, obtido):
+                np.testing.assert_array_equal(b, a)
+
+    def test_descarta_ordens_zeradas(self):
+        """
+        Testa se ordens de quantidade zero não entram no livro nem geram negócios.
+        """
+        order_book = OrderBook()
+        order_book.adicionar_lote(
+            "PETR4",
+            np.array([True, True, False, False]),
+            np.array([101.0, 100.0, 99.0, 98.0]),
+            np.array([0, 5, 0, 3]),
+        )
+        self.assertEqual(order_book.ordens_compra["PETR4"].tamanho, 1)
+        self.assertEqual(order_book.ordens_venda["PETR4"].tamanho, 1)
+
+        compradores, vendedores, quantidades, precos = order_book.executar_ordens(
+            "PETR4"
+        )
+        np.testing.assert_array_equal(compradores, [1])
+        np.testing.assert_array_equal(vendedores, [3])
+        np.testing.assert_array_equal(quantidades, [3])
+        np.testing.assert_array_equal(precos, [99.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import numpy as np
+
+try:
+    from numba import njit, prange
+
+    NUMBA_DISPONIVEL = True
+except ImportError:  # numba é opcional: sem ele os kernels rodam em Python puro
+    NUMBA_DISPONIVEL = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        return lambda funcao: funcao
+
+
+# Horizonte de l_privada, em rodadas
+PERIODOS_L_PRIVADA = 22
+
+
+@njit(parallel=True, cache=True)
+def decidir_ordens(
+    precos_mercado: np.ndarray,
+    influencia: np.ndarray,
+    news: np.ndarray,
+    sentimento: np.ndarray,
+):
+    """
+    Kernel da decisão de todos os agentes para todos os papéis, paralelo
+    sobre os agentes: preenche `sentimento` (agentes x papéis) no lugar e
+    retorna a máscara de compra e os preços de expectativa, no mesmo formato.
+    Equivale ao caminho vetorizado de `PoolAgentes.gera_ordens`.
+    """
+    num_agentes, num_papeis = news.shape
+    compra = np.empty((num_agentes, num_papeis), dtype=np.bool_)
+    precos = np.empty((num_agentes, num_papeis))
+    for i in prange(num_agentes):
+        for k in range(num_papeis):
+            s = influencia[i] + 0.05 * news[i, k]
+            s = min(max(s, -1.0), 1.0)
+            sentimento[i, k] = s
+            compra[i, k] = s > 0
+            precos[i, k] = precos_mercado[k] * np.exp(s / 10)
+    return compra, precos
+
+
+def sortear_vizinhos(vizinhos: np.ndarray, rng: np.random.Generator) -> None:
+    """
+    Sorteia no lugar, para cada agente (linha de `vizinhos`), os índices de
+    seus vizinhos, sem repetição.
+
+    Usa o algoritmo de Floyd, vetorizado sobre os agentes: são feitos só
+    k sorteios por agente, sem montar a lista de candidatos.
+    """
+    num_agentes, k = vizinhos.shape
+    for coluna, j in enumerate(range(num_agentes - k, num_agentes)):
+        sorteio = rng.integers(0, j + 1, size=num_agentes)
+        repetido = (vizinhos[:, :coluna] == sorteio[:, None]).any(axis=1)
+        vizinhos[:, coluna] = np.where(repetido, j, sorteio)
+
+
+def variacao_patrimonio(patrimonio: np.ndarray, ultima: int) -> np.ndarray:
+    """
+    l_privada: variação percentual do patrimônio de cada agente ao longo de
+    `PERIODOS_L_PRIVADA` registros, terminando no registro `ultima` (zero
+    enquanto não há registros suficientes).
+
+    `patrimonio` tem uma linha por agente e é o histórico completo (coluna t
+    = registro t) ou uma janela circular (coluna t % largura da janela).
+    """
+    if ultima < PERIODOS_L_PRIVADA:
+        return np.zeros(len(patrimonio))
+    largura = patrimonio.shape[1]
+    atual = patrimonio[:, ultima % largura]
+    anterior = patrimonio[:, (ultima + 1 - PERIODOS_L_PRIVADA) % largura]
+    return atual / anterior - 1
+
+
+def media_vizinhos(l_privada: np.ndarray, vizinhos: np.ndarray) -> np.ndarray:
+    """
+    l_social: média aritmética do l_privada dos vizinhos de cada agente.
+    """
+    if vizinhos.shape[1]:
+        return l_privada[vizinhos].mean(axis=1)
+    return np.zeros(len(vizinhos))